@@ -4,9 +4,11 @@
 # Github: https://github.com/kelvinBen/AppInfoScanner
 
 import click
+import config
 
 from libs.core import Bootstrapper
 from libs.task.base_task import BaseTask
+from libs.task.batch_task import BatchTask
 
 
 @click.group(help="Python script for automatically retrieving key information in app.")
@@ -31,15 +33,49 @@ def cli():
 @click.option("-t", '--threads', required=False, type=int, default=10,
               help="Set the number of concurrency. The larger the concurrency, the faster the speed. The default value is 10.")
 @click.option("-o", '--output', required=False, type=str, default=None, help="Specify the result set output directory.")
+@click.option("-b", '--backend', required=False, type=click.Choice(["thread", "process"]), default="thread",
+              help="Set the scanning backend. The process backend uses multiple CPU cores. The default value is thread.")
+@click.option("-w", '--workers', required=False, type=int, default=None,
+              help="Set the number of processes used by the process backend. The default value is the number of CPU cores.")
+@click.option('--no-cache', is_flag=True, default=False,
+              help="Disable the scan cache of unchanged files and the decompiled APK cache. It is not enabled by default.")
+@click.option('--sniffer-engine', required=False, type=click.Choice(["async", "thread"]), default="async",
+              help="Set the network sniffer engine. The async engine probes many URLs concurrently. The default value is async.")
+@click.option('--sniffer-mode', required=False, type=click.Choice(["url", "host"]), default="url",
+              help="Set the network sniffer mode. The host mode probes each scheme and host once and fills IP, Server and CDN for all of its URLs. The default value is url.")
+@click.option("-f", '--format', 'output_format', required=False, type=click.Choice(["txt", "jsonl"]), default="txt",
+              help="Set the output format. The jsonl format additionally streams one record per finding while scanning. The default value is txt.")
+@click.option('--entropy', is_flag=True, default=False,
+              help="Additionally report high-entropy hex or base64 strings as suspected secrets. It is not enabled by default.")
+@click.option('--profile', is_flag=True, default=False,
+              help="Record stage timings and counters, print a summary and write a JSON report. It is not enabled by default.")
+@click.option('--profile-hook', required=False, type=click.Choice(["cprofile", "pyinstrument"]), default=None,
+              help="Additionally run cProfile or pyinstrument on the main thread and save its output. Implies --profile.")
+@click.option('--resume', is_flag=True, default=False,
+              help="Record scan checkpoints in the output directory. When the scan is interrupted, run it again with --resume to reuse its decompiled files and skip the files and URLs that were already scanned and sniffed. It is not enabled by default.")
+@click.option("-j", '--decode-jobs', required=False, type=int, default=None,
+              help="Set the number of APK or DEX files decompiled at the same time when the input is a directory. The default value is 4.")
 @click.option("-p", '--package', required=False, type=str, default="",
-              help="Specifies the package name information that needs to be scanned.")
-def android(inputs: str, rules: str, sniffer: bool, no_resource: bool, all: bool, threads: int, output,
-            package: str) -> None:
+              help="Specifies the package name information that needs to be scanned. Multiple package names are separated by commas.")
+@click.option("-e", '--exclude-package', required=False, type=str, default="",
+              help="Specifies the package names that are skipped during scanning. Multiple package names are separated by commas.")
+@click.option("-x", '--exclude-sdk', is_flag=True, default=False,
+              help="Skip the common third-party SDK packages configured in config.exclude_packages. It is not enabled by default.")
+@click.option('--decoder', required=False, type=click.Choice(["apktool", "zip"]), default="apktool",
+              help="Set the APK decoder. The zip decoder reads DEX string tables, the binary manifest, resources.arsc and assets directly from the APK without Java. The default value is apktool.")
+def android(inputs: str, rules: str, sniffer: bool, no_resource: bool, all: bool, threads: int, output, backend: str,
+            workers: int, no_cache: bool, sniffer_engine: str, sniffer_mode: str, output_format: str, entropy: bool,
+            profile: bool, profile_hook: str, decode_jobs: int, package: str, exclude_package: str, exclude_sdk: bool,
+            decoder: str, resume: bool) -> None:
     try:
-        bootstrapper = Bootstrapper(__file__, output, all, no_resource)
+        bootstrapper = Bootstrapper(__file__, output, all, no_resource, no_cache, profile, profile_hook or "", resume)
         bootstrapper.init()
 
-        BaseTask("Android", inputs, rules, sniffer, threads, package).start()
+        if exclude_sdk:
+            exclude_package = ",".join(config.exclude_packages + [exclude_package])
+
+        BaseTask("Android", inputs, rules, sniffer, threads, package, backend, workers, decode_jobs,
+                 exclude_package, sniffer_engine, sniffer_mode, output_format, entropy, decoder).start()
     except Exception as e:
         raise e
 
@@ -58,12 +94,36 @@ def android(inputs: str, rules: str, sniffer: bool, no_resource: bool, all: bool
 @click.option("-t", '--threads', required=False, type=int, default=10,
               help="Set the number of concurrency. The larger the concurrency, the faster the speed. The default value is 10.")
 @click.option("-o", '--output', required=False, type=str, default=None, help="Specify the result set output directory.")
-def ios(inputs: str, rules: str, sniffer: bool, no_resource: bool, all: bool, threads: int, output: str) -> None:
+@click.option("-b", '--backend', required=False, type=click.Choice(["thread", "process"]), default="thread",
+              help="Set the scanning backend. The process backend uses multiple CPU cores. The default value is thread.")
+@click.option("-w", '--workers', required=False, type=int, default=None,
+              help="Set the number of processes used by the process backend. The default value is the number of CPU cores.")
+@click.option('--no-cache', is_flag=True, default=False,
+              help="Disable the scan cache of unchanged files and the decompiled APK cache. It is not enabled by default.")
+@click.option('--sniffer-engine', required=False, type=click.Choice(["async", "thread"]), default="async",
+              help="Set the network sniffer engine. The async engine probes many URLs concurrently. The default value is async.")
+@click.option('--sniffer-mode', required=False, type=click.Choice(["url", "host"]), default="url",
+              help="Set the network sniffer mode. The host mode probes each scheme and host once and fills IP, Server and CDN for all of its URLs. The default value is url.")
+@click.option("-f", '--format', 'output_format', required=False, type=click.Choice(["txt", "jsonl"]), default="txt",
+              help="Set the output format. The jsonl format additionally streams one record per finding while scanning. The default value is txt.")
+@click.option('--entropy', is_flag=True, default=False,
+              help="Additionally report high-entropy hex or base64 strings as suspected secrets. It is not enabled by default.")
+@click.option('--profile', is_flag=True, default=False,
+              help="Record stage timings and counters, print a summary and write a JSON report. It is not enabled by default.")
+@click.option('--profile-hook', required=False, type=click.Choice(["cprofile", "pyinstrument"]), default=None,
+              help="Additionally run cProfile or pyinstrument on the main thread and save its output. Implies --profile.")
+@click.option('--resume', is_flag=True, default=False,
+              help="Record scan checkpoints in the output directory. When the scan is interrupted, run it again with --resume to reuse its decompiled files and skip the files and URLs that were already scanned and sniffed. It is not enabled by default.")
+def ios(inputs: str, rules: str, sniffer: bool, no_resource: bool, all: bool, threads: int, output: str, backend: str,
+        workers: int, no_cache: bool, sniffer_engine: str, sniffer_mode: str, output_format: str, entropy: bool,
+        profile: bool, profile_hook: str, resume: bool) -> None:
     try:
-        bootstrapper = Bootstrapper(__file__, output, all, no_resource)
+        bootstrapper = Bootstrapper(__file__, output, all, no_resource, no_cache, profile, profile_hook or "", resume)
         bootstrapper.init()
 
-        BaseTask("iOS", inputs, rules, sniffer, threads).start()
+        BaseTask("iOS", inputs, rules, sniffer, threads, backend=backend, workers=workers,
+                 sniffer_engine=sniffer_engine, sniffer_mode=sniffer_mode,
+                 output_format=output_format, entropy=entropy).start()
     except Exception as e:
         raise e
 
@@ -82,12 +142,99 @@ def ios(inputs: str, rules: str, sniffer: bool, no_resource: bool, all: bool, th
 @click.option("-t", '--threads', required=False, type=int, default=10,
               help="Set the number of concurrency. The larger the concurrency, the faster the speed. The default value is 10.")
 @click.option("-o", '--output', required=False, type=str, default=None, help="Specify the result set output directory.")
-def web(inputs: str, rules: str, sniffer: bool, no_resource: bool, all: bool, threads: int, output: str) -> None:
+@click.option("-b", '--backend', required=False, type=click.Choice(["thread", "process"]), default="thread",
+              help="Set the scanning backend. The process backend uses multiple CPU cores. The default value is thread.")
+@click.option("-w", '--workers', required=False, type=int, default=None,
+              help="Set the number of processes used by the process backend. The default value is the number of CPU cores.")
+@click.option('--no-cache', is_flag=True, default=False,
+              help="Disable the scan cache of unchanged files and the decompiled APK cache. It is not enabled by default.")
+@click.option('--sniffer-engine', required=False, type=click.Choice(["async", "thread"]), default="async",
+              help="Set the network sniffer engine. The async engine probes many URLs concurrently. The default value is async.")
+@click.option('--sniffer-mode', required=False, type=click.Choice(["url", "host"]), default="url",
+              help="Set the network sniffer mode. The host mode probes each scheme and host once and fills IP, Server and CDN for all of its URLs. The default value is url.")
+@click.option("-f", '--format', 'output_format', required=False, type=click.Choice(["txt", "jsonl"]), default="txt",
+              help="Set the output format. The jsonl format additionally streams one record per finding while scanning. The default value is txt.")
+@click.option('--entropy', is_flag=True, default=False,
+              help="Additionally report high-entropy hex or base64 strings as suspected secrets. It is not enabled by default.")
+@click.option('--profile', is_flag=True, default=False,
+              help="Record stage timings and counters, print a summary and write a JSON report. It is not enabled by default.")
+@click.option('--profile-hook', required=False, type=click.Choice(["cprofile", "pyinstrument"]), default=None,
+              help="Additionally run cProfile or pyinstrument on the main thread and save its output. Implies --profile.")
+@click.option('--resume', is_flag=True, default=False,
+              help="Record scan checkpoints in the output directory. When the scan is interrupted, run it again with --resume to reuse its decompiled files and skip the files and URLs that were already scanned and sniffed. It is not enabled by default.")
+def web(inputs: str, rules: str, sniffer: bool, no_resource: bool, all: bool, threads: int, output: str, backend: str,
+        workers: int, no_cache: bool, sniffer_engine: str, sniffer_mode: str, output_format: str, entropy: bool,
+        profile: bool, profile_hook: str, resume: bool) -> None:
+    try:
+        bootstrapper = Bootstrapper(__file__, output, all, no_resource, no_cache, profile, profile_hook or "", resume)
+        bootstrapper.init()
+
+        BaseTask("Web", inputs, rules, sniffer, threads, backend=backend, workers=workers,
+                 sniffer_engine=sniffer_engine, sniffer_mode=sniffer_mode,
+                 output_format=output_format, entropy=entropy).start()
+    except Exception as e:
+        raise e
+
+
+@cli.command(help="Scan a manifest of apps (Android, iOS and Web, local paths or download addresses) in one process.")
+@click.option("-i", "--inputs", required=True, type=click.Path(exists=True, dir_okay=False),
+              help="Please enter the manifest file. One path or download address per line, optionally prefixed with android, ios or web.")
+@click.option("-r", "--rules", required=False, type=str, default="",
+              help="Please enter a rule for temporary scanning of file contents.")
+@click.option("-s", "--sniffer", is_flag=True, default=False,
+              help="Enable the network sniffer function. It is on by default.")
+@click.option("-n", '--no-resource', is_flag=True, default=False,
+              help="Ignore all resource files, including network sniffing. It is not enabled by default.")
+@click.option("-a", '--all', is_flag=True, default=False,
+              help="Output the string content that conforms to the scan rules.It is on by default.")
+@click.option("-t", '--threads', required=False, type=int, default=10,
+              help="Set the number of scanning threads shared by all apps. The default value is 10.")
+@click.option("-o", '--output', required=False, type=str, default=None, help="Specify the result set output directory.")
+@click.option("-b", '--backend', required=False, type=click.Choice(["thread", "process"]), default="thread",
+              help="Set the scanning backend. The process backend uses multiple CPU cores. The default value is thread.")
+@click.option("-w", '--workers', required=False, type=int, default=None,
+              help="Set the number of processes used by the process backend. The default value is the number of CPU cores.")
+@click.option('--no-cache', is_flag=True, default=False,
+              help="Disable the scan cache of unchanged files and the decompiled APK cache. It is not enabled by default.")
+@click.option('--sniffer-engine', required=False, type=click.Choice(["async", "thread"]), default="async",
+              help="Set the network sniffer engine. The async engine probes many URLs concurrently. The default value is async.")
+@click.option('--sniffer-mode', required=False, type=click.Choice(["url", "host"]), default="url",
+              help="Set the network sniffer mode. The host mode probes each scheme and host once and fills IP, Server and CDN for all of its URLs. The default value is url.")
+@click.option("-f", '--format', 'output_format', required=False, type=click.Choice(["txt", "jsonl"]), default="txt",
+              help="Set the output format. The jsonl format additionally streams one record per finding while scanning. The default value is txt.")
+@click.option('--entropy', is_flag=True, default=False,
+              help="Additionally report high-entropy hex or base64 strings as suspected secrets. It is not enabled by default.")
+@click.option('--profile', is_flag=True, default=False,
+              help="Record stage timings and counters, print a summary and write a JSON report. It is not enabled by default.")
+@click.option('--profile-hook', required=False, type=click.Choice(["cprofile", "pyinstrument"]), default=None,
+              help="Additionally run cProfile or pyinstrument on the main thread and save its output. Implies --profile.")
+@click.option("-j", '--decode-jobs', required=False, type=int, default=None,
+              help="Set the number of apps decompiled at the same time. The default value is 4.")
+@click.option('--download-jobs', required=False, type=int, default=None,
+              help="Set the number of apps downloaded at the same time. The default value is 4.")
+@click.option('--sniffer-jobs', required=False, type=int, default=None,
+              help="Set the number of apps sniffed at the same time. The default value is 2.")
+@click.option("-p", '--package', required=False, type=str, default="",
+              help="Specifies the Android package name information that needs to be scanned. Multiple package names are separated by commas.")
+@click.option("-e", '--exclude-package', required=False, type=str, default="",
+              help="Specifies the Android package names that are skipped during scanning. Multiple package names are separated by commas.")
+@click.option("-x", '--exclude-sdk', is_flag=True, default=False,
+              help="Skip the common third-party SDK packages configured in config.exclude_packages. It is not enabled by default.")
+@click.option('--decoder', required=False, type=click.Choice(["apktool", "zip"]), default="apktool",
+              help="Set the APK decoder. The zip decoder reads DEX string tables, the binary manifest, resources.arsc and assets directly from the APK without Java. The default value is apktool.")
+def batch(inputs: str, rules: str, sniffer: bool, no_resource: bool, all: bool, threads: int, output: str, backend: str,
+          workers: int, no_cache: bool, sniffer_engine: str, sniffer_mode: str, output_format: str, entropy: bool,
+          profile: bool, profile_hook: str, decode_jobs: int, download_jobs: int, sniffer_jobs: int, package: str,
+          exclude_package: str, exclude_sdk: bool, decoder: str) -> None:
     try:
-        bootstrapper = Bootstrapper(__file__, output, all, no_resource)
+        bootstrapper = Bootstrapper(__file__, output, all, no_resource, no_cache, profile, profile_hook or "")
         bootstrapper.init()
 
-        BaseTask("Web", inputs, rules, sniffer, threads).start()
+        if exclude_sdk:
+            exclude_package = ",".join(config.exclude_packages + [exclude_package])
+
+        BatchTask(inputs, rules, sniffer, threads, package, backend, workers, decode_jobs, exclude_package,
+                  sniffer_engine, sniffer_mode, output_format, entropy, decoder, download_jobs, sniffer_jobs).start()
     except Exception as e:
         raise e
 
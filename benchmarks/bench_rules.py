@@ -0,0 +1,83 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+"""
+规则匹配微基准测试: 对比原有逐字符串编译规则的方式与预编译规则引擎。
+
+使用方式: python -m benchmarks.bench_rules [字符串数量]
+"""
+import re
+import sys
+import time
+import random
+
+import config
+from libs.core.rules import RuleEngine
+
+
+def legacy_match(result):
+    """原有ParsesThreads.__parse_string__与__filter__的逐条处理逻辑"""
+    results = []
+    for filter_str in config.filter_strs:
+        filter_resl = re.compile(filter_str).findall(result)
+        if len(filter_resl) == 0:
+            continue
+        resl_str = filter_resl[0]
+
+        return_flag = 1
+        clean_str = resl_str.replace("\r", "").replace("\n", "").replace(" ", "")
+        if len(clean_str) == 0:
+            continue
+        for filte in set(config.filter_no):
+            clean_str = clean_str.replace(filte, "")
+            if len(clean_str) == 0:
+                return_flag = 0
+                continue
+            if re.match(filte, clean_str):
+                return_flag = 0
+                continue
+        if return_flag:
+            results.append(resl_str)
+    return results
+
+
+def build_strings(count, seed=20201010):
+    rnd = random.Random(seed)
+    words = ["onCreate", "Landroid/os/Bundle;", "getString", "user_id", "Ljava/lang/String;",
+             "setContentView", "toString", "application/json", "UTF-8", "%s=%s"]
+    hosts = ["api.example.com", "cdn.example.net", "www.w3.org", "127.0.0.1", "10.0.2.15",
+             "log.umeng.com", "pay.example.cn"]
+    strings = []
+    for _ in range(count):
+        if rnd.random() < 0.05:
+            strings.append("%s://%s/%s" % (rnd.choice(["http", "https"]), rnd.choice(hosts),
+                                           rnd.choice(words)))
+        else:
+            strings.append(rnd.choice(words) + str(rnd.randint(0, 1000)))
+    return strings
+
+
+def run(count):
+    strings = build_strings(count)
+    engine = RuleEngine(config.filter_strs, config.filter_no)
+
+    start = time.perf_counter()
+    legacy = [legacy_match(string) for string in strings]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    current = [[value for _, value in engine.match(string)] for string in strings]
+    engine_time = time.perf_counter() - start
+
+    if legacy != current:
+        raise Exception("Rule engine results differ from the legacy implementation.")
+
+    print("[*] Strings: %d" % count)
+    print("[*] Legacy per-string loop : %.3fs (%.0f strings/s)" % (legacy_time, count / legacy_time))
+    print("[*] Precompiled rule engine: %.3fs (%.0f strings/s)" % (engine_time, count / engine_time))
+    print("[*] Speedup: %.1fx" % (legacy_time / engine_time))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
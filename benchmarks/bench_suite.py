@@ -0,0 +1,194 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+"""
+扫描流程基准测试: 在合成样本上测试目录遍历、规则过滤、ParsesThreads扫描流程(多线程与多进程)以及结果输出，
+报告吞吐量(MB/s、files/s)与峰值内存(RSS)。样本由benchmarks.fixtures按固定种子生成，无需Java、设备或网络。
+
+使用方式: python -m benchmarks.bench_suite [规模] [结果JSON路径]
+规模默认为1.0，对应20000个smali文件、32MB的压缩JS以及约32MB的Mach-O文件。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import contextlib
+from queue import Queue
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+import libs.core as cores
+import libs.core.parses as parses
+import libs.core.walker as walker
+from libs.core.rules import RuleEngine
+from libs.core.parses import ParsesThreads
+from libs.core.writer import ExcelWriter, JsonlWriter
+
+from benchmarks import fixtures
+
+try:
+    import resource
+except ImportError:
+    # Windows下没有resource模块，不统计峰值内存
+    resource = None
+
+
+def peak_rss(who="self"):
+    """
+    获取当前进程(或已结束的子进程)的峰值内存，单位MB。
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # Linux下为KB，macOS下为字节
+    if sys.platform == "darwin":
+        return round(usage.ru_maxrss / 1024 / 1024, 1)
+    return round(usage.ru_maxrss / 1024, 1)
+
+
+def parse_by_threads(file_paths, types, rule_engine, threads):
+    result_dict = {}
+    file_queue = Queue(maxsize=config.file_queue_size)
+    thread_list = []
+    for threadID in range(threads):
+        thread = ParsesThreads(threadID, "Thread - %d" % threadID, file_queue, result_dict, types, rule_engine)
+        thread.start()
+        thread_list.append(thread)
+    for file_path in file_paths:
+        file_queue.put(file_path)
+    for _ in thread_list:
+        file_queue.put(None)
+    for thread in thread_list:
+        thread.join()
+    return result_dict
+
+
+def parse_by_processes(file_paths, types, rule_engine, workers):
+    result_dict = {}
+    state = {name: getattr(cores, name) for name in parses.process_state_names}
+    batch_size = config.process_batch_size
+    with ProcessPoolExecutor(max_workers=workers, initializer=parses.init_process, initargs=(state,)) as executor:
+        futures = [executor.submit(parses.parse_files, file_paths[index:index + batch_size], types, rule_engine)
+                   for index in range(0, len(file_paths), batch_size)]
+        for future in futures:
+            result_dict.update(future.result()[0])
+    return result_dict
+
+
+class Suite(object):
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.results = []
+        self.work_dir = tempfile.mkdtemp(prefix="bench_suite_")
+        self.rule_engine = RuleEngine(config.filter_strs, config.filter_no)
+        self.threads = 10
+        self.workers = os.cpu_count()
+
+    def measure(self, name, func, size=0, files=0, items=0):
+        # AK/SK命中时会直接打印，测试过程中丢弃扫描的输出
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            value = func()
+            seconds = time.perf_counter() - start
+        result = {"name": name, "seconds": round(seconds, 3), "mb": round(size / 1024 / 1024, 2), "files": files,
+                  "items": items, "mb_per_second": round(size / 1024 / 1024 / seconds, 2) if size else None,
+                  "files_per_second": round(files / seconds, 1) if files else None,
+                  "items_per_second": round(items / seconds, 1) if items else None,
+                  "peak_rss_mb": peak_rss(), "peak_child_rss_mb": peak_rss("children")}
+        self.results.append(result)
+        print("[*] %-28s %8.3fs %10s MB/s %10s files/s %12s items/s  peak RSS %s MB" % (
+            name, seconds, result["mb_per_second"], result["files_per_second"], result["items_per_second"],
+            result["peak_rss_mb"]))
+        return value
+
+    def run(self):
+        # 扫描时不输出每条命中结果
+        cores.all_flag = False
+        cores.resource_flag = False
+        cores.profile_flag = False
+
+        smali_count = int(20000 * self.scale)
+        js_size = int(32 * 1024 * 1024 * self.scale)
+        macho_strings = int(800000 * self.scale)
+
+        print("[*] Building corpora in %s" % self.work_dir)
+        smali_dir = os.path.join(self.work_dir, "apk")
+        smali_size = fixtures.build_smali_tree(smali_dir, smali_count)
+        js_path = os.path.join(self.work_dir, "web", "app.min.js")
+        os.makedirs(os.path.dirname(js_path))
+        js_size = fixtures.build_minified_js(js_path, js_size)
+        macho_path = os.path.join(self.work_dir, "ipa", "Payload", "Bench.app", "Bench")
+        os.makedirs(os.path.dirname(macho_path))
+        macho_size = fixtures.build_macho(macho_path, macho_strings)
+
+        smali_files = self.measure("walker (smali tree)",
+                                   lambda: list(walker.walk_files(smali_dir, ["smali"])), files=smali_count)
+
+        strings = []
+        for file_path in smali_files[:2000]:
+            with open(file_path, "r", encoding="utf8", errors="ignore") as f:
+                strings.extend(parses.string_pattern.findall(f.read()))
+        self.measure("rule filter (strings)",
+                     lambda: [self.rule_engine.match(string) for string in strings], items=len(strings))
+
+        smali_result = self.measure("parses threads (smali)",
+                                    lambda: parse_by_threads(smali_files, "Android", self.rule_engine, self.threads),
+                                    size=smali_size, files=smali_count)
+        process_result = self.measure("parses processes (smali)",
+                                      lambda: parse_by_processes(smali_files, "Android", self.rule_engine,
+                                                                 self.workers),
+                                      size=smali_size, files=smali_count)
+        if smali_result != process_result:
+            raise Exception("Thread and process backends returned different results.")
+
+        self.measure("parses threads (minified js)",
+                     lambda: parse_by_threads([js_path], "Web", self.rule_engine, self.threads),
+                     size=js_size, files=1)
+        self.measure("parses threads (mach-o)",
+                     lambda: parse_by_threads([macho_path], "iOS", self.rule_engine, self.threads),
+                     size=macho_size, files=1)
+
+        findings = [(file_path, [("filter_strs[0]", value, index) for index, value in enumerate(values)])
+                    for file_path, values in smali_result.items()]
+        finding_count = sum(len(items) for _, items in findings)
+        self.measure("jsonl writer", lambda: self.__write_jsonl__(findings), items=finding_count)
+        self.measure("xlsx writer", lambda: self.__write_xlsx__(int(50000 * self.scale)),
+                     items=int(50000 * self.scale))
+
+    def __write_jsonl__(self, findings):
+        writer = JsonlWriter(os.path.join(self.work_dir, "result.jsonl"), "Android", "bench")
+        for file_path, items in findings:
+            writer.write_findings(file_path, items)
+        writer.close()
+
+    def __write_xlsx__(self, rows):
+        writer = ExcelWriter(os.path.join(self.work_dir, "result.xlsx"))
+        writer.start()
+        result = {"status": 200, "des_ip": "10.0.0.1", "server": "nginx", "title": "Bench", "cdn": ""}
+        for index in range(rows):
+            writer.write("https://api.bench-example.com/v1/item%d" % index, "api.bench-example.com", result)
+        writer.close()
+
+    def close(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def run(scale, json_path=None):
+    suite = Suite(scale)
+    try:
+        suite.run()
+    finally:
+        suite.close()
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"scale": scale, "cpu_count": os.cpu_count(), "results": suite.results}, f, indent=2)
+        print("[*] Benchmark results: %s" % json_path)
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0, sys.argv[2] if len(sys.argv) > 2 else None)
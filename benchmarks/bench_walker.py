@@ -0,0 +1,79 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+"""
+目录遍历基准测试: 对比原有基于os.listdir的递归遍历与libs.core.walker。
+
+使用方式: python -m benchmarks.bench_walker [文件数量] [目录]
+未指定目录时在临时目录中生成smali目录树，测试完成后删除。
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import libs.core.walker as walker
+
+
+def legacy_walk(scanner_dir, scanner_file_suffixs, results):
+    """原有AndroidTask.__get_scanner_file__的递归遍历逻辑"""
+    dir_or_files = os.listdir(scanner_dir)
+    for dir_or_file in dir_or_files:
+        dir_file_path = os.path.join(scanner_dir, dir_or_file)
+        if os.path.isdir(dir_file_path):
+            legacy_walk(dir_file_path, scanner_file_suffixs, results)
+        else:
+            if ("." not in dir_or_file) or (len(dir_or_file.split(".")) < 1) or (
+                    dir_or_file.split(".")[-1] not in scanner_file_suffixs):
+                continue
+            results.append(dir_file_path)
+
+
+def build_tree(root_dir, count, files_per_dir=40):
+    """生成与apktool输出结构相似的smali目录树"""
+    packages = ["com/example/app", "androidx/core/content", "com/google/android/gms/internal",
+                "okhttp3/internal/http2", "kotlin/collections/builders", "io/reactivex/internal/operators"]
+    for index in range(count):
+        package = packages[index % len(packages)]
+        dir_path = os.path.join(root_dir, "smali", package, "p%d" % (index // (files_per_dir * len(packages))))
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+        suffix = "smali" if index % 20 else "xml"
+        with open(os.path.join(dir_path, "C%d.%s" % (index, suffix)), "w") as f:
+            f.write(".class public Lcom/example/C%d;\n" % index)
+
+
+def run(count, root_dir=None):
+    temp_dir = None
+    if root_dir is None:
+        temp_dir = tempfile.mkdtemp(prefix="bench_walker_")
+        root_dir = temp_dir
+        print("[*] Creating %d files in %s" % (count, root_dir))
+        build_tree(root_dir, count)
+
+    try:
+        start = time.perf_counter()
+        legacy = []
+        legacy_walk(root_dir, ["smali"], legacy)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        current = list(walker.walk_files(root_dir, ["smali"]))
+        walker_time = time.perf_counter() - start
+
+        if sorted(legacy) != sorted(current):
+            raise Exception("Walker results differ from the legacy implementation.")
+
+        print("[*] Files matched: %d" % len(current))
+        print("[*] Legacy os.listdir walker: %.3fs (%.0f files/s)" % (legacy_time, len(legacy) / legacy_time))
+        print("[*] os.scandir walker       : %.3fs (%.0f files/s)" % (walker_time, len(current) / walker_time))
+        print("[*] Speedup: %.1fx" % (legacy_time / walker_time))
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000, sys.argv[2] if len(sys.argv) > 2 else None)
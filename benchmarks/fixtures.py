@@ -0,0 +1,157 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+"""
+基准测试使用的合成样本，相同的参数与随机种子总是生成完全相同的内容，无需Java、设备或网络。
+
+- build_smali_tree: 与apktool输出结构相似的smali目录树，可指定URL与AK/SK的密度。
+- build_minified_js: 压缩后只有一行的超长JS文件。
+- build_macho: 包含__TEXT,__cstring与__ustring的Mach-O文件。
+"""
+import os
+import random
+import struct
+
+# 与apktool输出结构相似的包名，包含常见的第三方SDK
+PACKAGES = ["com/bench/app", "com/bench/app/net", "androidx/core/content", "com/google/android/gms/internal",
+            "okhttp3/internal/http2", "kotlin/collections/builders", "io/reactivex/internal/operators"]
+
+WORDS = ["onCreate", "getString", "user_id", "setContentView", "toString", "application/json", "UTF-8",
+         "Landroid/os/Bundle;", "Ljava/lang/String;", "%s=%s", "token", "deviceId"]
+
+HOSTS = ["api.bench-example.com", "cdn.bench-example.net", "pay.bench-example.cn", "www.w3.org",
+         "log.umeng.com", "127.0.0.1", "10.0.2.15"]
+
+SECRETS = ['accessKeyId = "LTAI%s"', 'accessKeySecret = "%s"', 'secret: "%s"']
+
+
+def random_url(rnd):
+    return "%s://%s/v%d/%s" % (rnd.choice(["http", "https"]), rnd.choice(HOSTS), rnd.randint(1, 3),
+                               rnd.choice(WORDS).strip("%;=/"))
+
+
+def random_secret(rnd):
+    return rnd.choice(SECRETS) % "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(24))
+
+
+def random_string(rnd, url_density):
+    if rnd.random() < url_density:
+        return random_url(rnd)
+    return rnd.choice(WORDS) + str(rnd.randint(0, 1000))
+
+
+def build_smali_tree(root_dir, count, url_density=0.05, secret_density=0.01, strings_per_file=20,
+                     files_per_dir=40, seed=20201010):
+    """
+    生成smali目录树。
+
+    参数:
+    - root_dir: 输出目录，smali文件位于root_dir/smali下。
+    - count: 文件数量。
+    - url_density: const-string中URL所占的比例。
+    - secret_density: 包含AK/SK的文件所占的比例。
+    - strings_per_file: 每个文件中const-string的数量。
+
+    返回:
+    int: 生成的文件总字节数。
+    """
+    rnd = random.Random(seed)
+    total = 0
+    for index in range(count):
+        package = PACKAGES[index % len(PACKAGES)]
+        dir_path = os.path.join(root_dir, "smali", package, "p%d" % (index // (files_per_dir * len(PACKAGES))))
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+
+        lines = [".class public L%s/C%d;" % (package, index), ".super Ljava/lang/Object;", "",
+                 ".method public run()V", "    .locals 2"]
+        for number in range(strings_per_file):
+            lines.append('    const-string v%d, "%s"' % (number % 2, random_string(rnd, url_density)))
+            lines.append("    invoke-static {v0, v1}, Lcom/bench/app/Log;->d(Ljava/lang/String;Ljava/lang/String;)V")
+        if rnd.random() < secret_density:
+            lines.append('    const-string v0, "%s"' % random_secret(rnd).replace('"', "'"))
+            lines.append("    # " + random_secret(rnd))
+        lines.extend(["    return-void", ".end method", ""])
+
+        content = "\n".join(lines).encode("utf-8")
+        with open(os.path.join(dir_path, "C%d.smali" % index), "wb") as f:
+            f.write(content)
+        total = total + len(content)
+    return total
+
+
+def build_minified_js(file_path, size, url_density=0.05, secret_density=0.001, seed=20201010):
+    """
+    生成压缩后只有一行的JS文件。
+
+    参数:
+    - file_path: 输出文件路径。
+    - size: 文件大小的下限(字节)。
+
+    返回:
+    int: 生成的文件字节数。
+    """
+    rnd = random.Random(seed)
+    total = 0
+    index = 0
+    with open(file_path, "w", encoding="utf-8") as f:
+        while total < size:
+            parts = []
+            for _ in range(1000):
+                if rnd.random() < secret_density:
+                    parts.append("var k%d={%s}" % (index, random_secret(rnd).replace(" = ", ":")))
+                else:
+                    parts.append('var a%d="%s",b%d=a%d.length' % (index, random_string(rnd, url_density),
+                                                                  index, index))
+                index = index + 1
+            chunk = ";".join(parts) + ";"
+            f.write(chunk)
+            total = total + len(chunk)
+    return total
+
+
+def build_macho(file_path, string_count, url_density=0.05, text_size=1024 * 1024, seed=20201010):
+    """
+    生成64位小端序的Mach-O文件，__TEXT段中包含__text、__cstring与__ustring三个section，
+    并带有cryptid为0的LC_ENCRYPTION_INFO_64。
+
+    参数:
+    - file_path: 输出文件路径。
+    - string_count: __cstring中的字符串数量。
+    - text_size: __text中填充的无意义机器码大小(字节)。
+
+    返回:
+    int: 生成的文件字节数。
+    """
+    rnd = random.Random(seed)
+    cstring = b"".join(random_string(rnd, url_density).encode("utf-8") + b"\0" for _ in range(string_count))
+    ustring = b"".join(random_string(rnd, url_density).encode("utf-16-le") + b"\0\0"
+                       for _ in range(max(string_count // 100, 1)))
+    text = bytes(rnd.getrandbits(8) & 0x1f for _ in range(min(text_size, 4096))) * max(text_size // 4096, 1)
+
+    sections = [(b"__text", text, 0x80000400), (b"__cstring", cstring, 0x2), (b"__ustring", ustring, 0x0)]
+    segment_size = 72 + 80 * len(sections)
+    encryption_size = 24
+    header_size = 32 + segment_size + encryption_size
+
+    offset = (header_size + 0xfff) & ~0xfff
+    section_commands = b""
+    body = b""
+    for sectname, content, flags in sections:
+        section_commands = section_commands + struct.pack(
+            "<16s16s2Q8I", sectname, b"__TEXT", 0x100000000 + offset, len(content), offset, 0, 0, 0, flags, 0, 0, 0)
+        body = body + content
+        offset = offset + len(content)
+
+    file_offset = (header_size + 0xfff) & ~0xfff
+    segment = struct.pack("<2I16s4Q4I", 0x19, segment_size, b"__TEXT", 0x100000000, offset, 0, offset,
+                          5, 5, len(sections), 0) + section_commands
+    encryption = struct.pack("<6I", 0x2C, encryption_size, file_offset, len(text), 0, 0)
+    header = struct.pack("<7I I", 0xfeedfacf, 0x0100000c, 0, 2, 2, segment_size + encryption_size, 0x00200085, 0)
+
+    content = header + segment + encryption
+    content = content + b"\0" * (file_offset - len(content)) + body
+    with open(file_path, "wb") as f:
+        f.write(content)
+    return len(content)
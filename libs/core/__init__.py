@@ -26,6 +26,9 @@ frida64_path = ""
 # aapt 所在路径
 aapt_apth = ""
 
+# 内置加固特征文件所在路径
+protect_path = ""
+
 # 系统类型
 os_type = ""
 
@@ -35,13 +38,17 @@ output_path = ""
 # 下载完成标记
 download_flag = False
 
-# excel 起始行号
-excel_row = 1
+# 性能统计标记
+profile_flag = False
+
+# 断点续扫标记
+resume_flag = False
 
 
 class Bootstrapper(object):
 
-    def __init__(self, path, out_path, all=False, no_resource=False):
+    def __init__(self, path, out_path, all=False, no_resource=False, no_cache=False, profile=False,
+                 profile_hook="", resume=False):
         global smali_path
         global backsmali_path
         global apktool_path
@@ -49,24 +56,39 @@ class Bootstrapper(object):
         global frida32_path
         global frida64_path
         global aapt_apth
+        global protect_path
         global os_type
         global output_path
         global script_root_dir
         global txt_result_path
         global xls_result_path
+        global jsonl_result_path
+        global batch_result_path
         global strings_path
         global history_path
         global app_history_path
         global domain_history_path
-        global excel_row
         global download_path
         global download_flag
         global out_dir
         global all_flag
         global resource_flag
+        global cache_flag
+        global scan_cache_path
+        global decode_cache_path
+        global profile_flag
+        global profile_hook_name
+        global profile_result_path
+        global profile_hook_path
+        global resume_flag
+        global resume_path
 
         all_flag = not all
         resource_flag = no_resource
+        cache_flag = not no_cache
+        profile_flag = profile or bool(profile_hook)
+        profile_hook_name = profile_hook
+        resume_flag = resume
 
         create_time = time.strftime("%Y%m%d%H%M%S", time.localtime())
         script_root_dir = os.path.dirname(os.path.abspath(path))
@@ -77,6 +99,8 @@ class Bootstrapper(object):
         tools_dir = os.path.join(script_root_dir, "tools")
         output_path = os.path.join(out_dir, "out")
         history_path = os.path.join(script_root_dir, "history")
+        # 扫描断点与反编译结果一起保存在输出目录中，不使用--resume时随输出目录一起清理
+        resume_path = os.path.join(output_path, "resume.db")
 
         if platform.system() == "Windows":
             machine2bits = {'AMD64': 64, 'x86_64': 64, 'i386': 32, 'x86': 32}
@@ -95,18 +119,30 @@ class Bootstrapper(object):
         frida32_path = os.path.join(tools_dir + '\\unpacker', "hexl-server-arm32")
         frida64_path = os.path.join(tools_dir + '\\unpacker', "hexl-server-arm64")
         aapt_apth = os.path.join(tools_dir + '\\unpacker', "aapt.exe")
+        protect_path = os.path.join(tools_dir, "protect.json")
         download_path = os.path.join(out_dir, "download")
         txt_result_path = os.path.join(out_dir, "result_" + str(create_time) + ".txt")
         xls_result_path = os.path.join(out_dir, "result_" + str(create_time) + ".xlsx")
+        jsonl_result_path = os.path.join(out_dir, "result_" + str(create_time) + ".jsonl")
+        # 批量扫描时每个应用的结果以及汇总结果所在的目录
+        batch_result_path = os.path.join(out_dir, "batch_" + str(create_time))
+        profile_result_path = os.path.join(out_dir, "result_" + str(create_time) + ".profile.json")
+        profile_hook_path = os.path.join(out_dir, "result_" + str(create_time) + (
+            ".html" if profile_hook == "pyinstrument" else ".prof"))
         app_history_path = os.path.join(history_path, "app_history.txt")
         domain_history_path = os.path.join(history_path, "domain_history.txt")
+        scan_cache_path = os.path.join(history_path, "scan_cache.db")
+        decode_cache_path = os.path.join(history_path, "decode_cache")
 
     def init(self):
         if not os.path.exists(out_dir):
             os.makedirs(out_dir)
             print("[*] Create directory {}".format(out_dir))
 
-        if os.path.exists(output_path):
+        if resume_flag and os.path.exists(output_path):
+            # 断点续扫时保留上次的反编译结果与扫描断点
+            print("[*] Resume from directory {}".format(output_path))
+        elif os.path.exists(output_path):
             try:
                 shutil.rmtree(output_path)
             except Exception as e:
@@ -115,8 +151,9 @@ class Bootstrapper(object):
                     raise e
                 self.__removed_dirs_cmd__(output_path)
 
-        os.makedirs(output_path)
-        print("[*] Create directory {}".format(output_path))
+        if not os.path.exists(output_path):
+            os.makedirs(output_path)
+            print("[*] Create directory {}".format(output_path))
 
         if not os.path.exists(download_path):
             os.makedirs(download_path)
@@ -132,6 +169,9 @@ class Bootstrapper(object):
         if os.path.exists(xls_result_path):
             os.remove(xls_result_path)
 
+        if os.path.exists(jsonl_result_path):
+            os.remove(jsonl_result_path)
+
     def __removed_dirs_cmd__(self, output_path):
         files = os.listdir(output_path)
         for file in files:
@@ -0,0 +1,147 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+"""
+APK内文件的虚拟路径，--decoder zip模式下无需解压即可将APK内的文件交给扫描线程。
+
+虚拟路径的格式为"APK路径!/APK内的文件名"，如/tmp/app.apk!/classes2.dex。
+扫描线程通过open_text、iter_string_table读取文件内容，每个线程各自持有打开的ZipFile，互不影响。
+"""
+import io
+import os
+import struct
+import zipfile
+import threading
+
+import libs.core.dex as dex
+import libs.core.axml as axml
+
+SEPARATOR = "!/"
+
+# 每个线程打开的APK: APK路径 -> ZipFile
+local = threading.local()
+
+
+def join_path(archive_path, entry_name):
+    return archive_path + SEPARATOR + entry_name
+
+
+def split_path(file_path):
+    """
+    拆分虚拟路径。
+
+    返回:
+    tuple: (APK路径, APK内的文件名)，不是虚拟路径时返回(None, None)。
+    """
+    index = file_path.find(SEPARATOR)
+    if index == -1:
+        return None, None
+    return file_path[:index], file_path[index + len(SEPARATOR):]
+
+
+def is_virtual(file_path):
+    return SEPARATOR in file_path
+
+
+def __zip_file__(archive_path):
+    archives = getattr(local, "archives", None)
+    if archives is None:
+        archives = {}
+        local.archives = archives
+    zip_file = archives.get(archive_path)
+    if zip_file is None:
+        zip_file = zipfile.ZipFile(archive_path)
+        archives[archive_path] = zip_file
+    return zip_file
+
+
+def close():
+    """
+    关闭当前线程打开的所有APK。
+    """
+    archives = getattr(local, "archives", None) or {}
+    for zip_file in archives.values():
+        zip_file.close()
+    archives.clear()
+
+
+def open_binary(file_path):
+    """
+    以二进制方式打开普通文件或者虚拟路径对应的APK内文件。
+    """
+    archive_path, entry_name = split_path(file_path)
+    if archive_path is None:
+        return open(file_path, "rb")
+    return __zip_file__(archive_path).open(entry_name)
+
+
+def read_bytes(file_path):
+    with open_binary(file_path) as f:
+        return f.read()
+
+
+def getsize(file_path):
+    """
+    获取文件大小，虚拟路径返回APK内文件解压后的大小。
+    """
+    archive_path, entry_name = split_path(file_path)
+    if archive_path is None:
+        return os.path.getsize(file_path)
+    return __zip_file__(archive_path).getinfo(entry_name).file_size
+
+
+def open_text(file_path):
+    """
+    以文本方式打开文件，APK内的二进制XML会先还原为文本XML。
+    """
+    archive_path, entry_name = split_path(file_path)
+    if archive_path is None:
+        return open(file_path, "r", encoding="utf8", errors="ignore")
+    if entry_name.endswith(".xml"):
+        data = read_bytes(file_path)
+        if axml.is_axml(data):
+            try:
+                return io.StringIO(axml.decode(data))
+            except (ValueError, struct.error):
+                # 被加固工具故意构造的畸形二进制XML无法还原，直接扫描原始内容
+                print("[-] Unable to decode binary XML %s, scanning its raw content." % file_path)
+        return io.StringIO(data.decode("utf8", "ignore"))
+    return io.TextIOWrapper(open_binary(file_path), encoding="utf8", errors="ignore")
+
+
+def is_string_table(file_path):
+    """
+    判断文件是否需要按字符串表解析，包括DEX文件以及APK内的resources.arsc。
+    """
+    return file_path.endswith(".dex") or (is_virtual(file_path) and file_path.endswith("/resources.arsc"))
+
+
+def iter_string_table(file_path, package_filter=None):
+    """
+    依次返回DEX或者resources.arsc中的字符串，磁盘上的DEX文件以内存映射的方式读取。
+    指定package_filter时，DEX中只返回需要扫描的包内的类使用的字符串，见dex.in_packages。
+
+    返回:
+    generator: 依次返回(在文件中的偏移, 字符串, 使用该字符串的类)，无法确定所属的类时为None。
+    """
+    if not is_virtual(file_path):
+        try:
+            for item in dex.iter_strings(file_path, package_filter):
+                yield item
+        except (ValueError, struct.error):
+            # 空文件或者不是DEX文件
+            pass
+        return
+
+    data = read_bytes(file_path)
+    try:
+        if dex.is_dex(data):
+            for item in dex.DexFile(data).strings_with_classes(package_filter):
+                yield item
+        elif axml.is_arsc(data):
+            for offset, string in axml.iter_arsc_strings(data):
+                yield offset, string, None
+    except (ValueError, struct.error):
+        # 畸形的DEX或者resources.arsc，保留已经读取到的字符串
+        print("[-] Unable to parse the string table of %s, the remaining strings were skipped." % file_path)
@@ -0,0 +1,289 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import re
+import ssl
+import time
+import asyncio
+from urllib.parse import urlsplit, urljoin
+
+import config
+from libs.core.net import write_probe_result
+from libs.core.resolver import DnsCache
+from libs.core.metrics import metrics
+
+# 跟随重定向的最大次数，与requests保持一致
+MAX_REDIRECTS = 30
+
+
+class AsyncNetEngine(object):
+    """
+    基于asyncio的网络嗅探引擎，替代每个URL固定休眠2秒的多线程嗅探方式。
+
+    所有URL在同一个事件循环中并发请求，并发总数由config.sniffer_concurrency限制，
+    同一个域名的请求间隔由config.sniffer_host_interval限制，以代替原有的固定休眠。
+    同一个域名的连接在请求结束后放回连接池复用(keep-alive)，每个域名保留的空闲连接
+    不超过config.sniffer_pool_size个。输出的Status/IP/Server/Title/CDN与多线程嗅探一致。
+    域名通过DnsCache解析，预解析过的域名直接连接缓存中的IP，不再重复解析。
+    """
+
+    def __init__(self, domain_queue, writer, resolver=None):
+        self.domain_queue = domain_queue
+        self.writer = writer
+        self.resolver = resolver or DnsCache()
+        self.concurrency = config.sniffer_concurrency
+        self.host_interval = config.sniffer_host_interval
+        self.timeout = config.sniffer_timeout
+        self.pool_size = config.sniffer_pool_size
+        self.body_limit = config.sniffer_body_limit
+        self.ssl_context = ssl.create_default_context()
+        # 每个域名下一次允许发起请求的时间
+        self.host_next_time = {}
+        # 每个(协议, 域名, 端口)对应的空闲连接
+        self.idle_connections = {}
+
+    def start(self):
+        domains_list = []
+        while not self.domain_queue.empty():
+            domains_list.append(self.domain_queue.get())
+        if len(domains_list) == 0:
+            return
+        asyncio.run(self.__run__(domains_list))
+
+    async def __run__(self, domains_list):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            await asyncio.gather(*[self.__get_Http_info__(domains) for domains in domains_list])
+        finally:
+            for connections in self.idle_connections.values():
+                for connection in connections:
+                    connection["writer"].close()
+            self.idle_connections.clear()
+
+    async def __get_Http_info__(self, domains):
+        url_ip = domains["url_ip"]
+
+        # 按域名限速的等待不占用并发名额，也不计入请求超时
+        host = urlsplit(url_ip).hostname
+        if host:
+            await self.__wait_host__(host)
+
+        async with self.semaphore:
+            start_time = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self.__get_request_result__(url_ip), self.timeout)
+            except asyncio.TimeoutError:
+                result = "timeout"
+            metrics.observe("probe", time.perf_counter() - start_time)
+        print("[+] Processing URL address：" + url_ip)
+
+        if result != "error":
+            write_probe_result(self.writer, domains, result)
+
+    async def __get_request_result__(self, url):
+        """
+        发送GET请求并获取结果，跟随重定向，返回最终响应的信息。
+
+        返回:
+        dict: 包含请求状态、服务器信息、CDN信息、目标IP、源IP和页面标题的字典。
+        如果URL无效则返回"error"，连接失败返回"timeout"。
+        """
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                try:
+                    url_parts = urlsplit(url)
+                    url_parts.port
+                except ValueError:
+                    return "error"
+                if url_parts.scheme not in ("http", "https") or not url_parts.hostname:
+                    return "error"
+                response = await self.__request__(url_parts)
+                location = response["headers"].get("location")
+                if response["status"] in (301, 302, 303, 307, 308) and location:
+                    url = urljoin(url, location)
+                    continue
+                return self.__parse_response__(response)
+            return "timeout"
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            # 连接失败或响应内容不合法
+            return "timeout"
+
+    async def __request__(self, url_parts):
+        scheme = url_parts.scheme
+        host = url_parts.hostname
+        port = url_parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port)
+
+        path = url_parts.path or "/"
+        if url_parts.query:
+            path = path + "?" + url_parts.query
+        host_header = url_parts.netloc.rsplit("@", 1)[-1]
+        request = ("GET %s HTTP/1.1\r\nHost: %s\r\nUser-Agent: %s\r\nAccept: */*\r\n"
+                   "Accept-Encoding: identity\r\nConnection: keep-alive\r\n\r\n") % (
+            path, host_header, config.headers.get("User-Agent", "python"))
+
+        connection = self.__get_connection__(key)
+        reused = connection is not None
+        if connection is None:
+            connection = await self.__connect__(scheme, host, port)
+
+        try:
+            response = await self.__send__(connection, request)
+        except (OSError, asyncio.IncompleteReadError):
+            connection["writer"].close()
+            if not reused:
+                raise
+            # 复用的连接可能已被服务器关闭，重新建立连接后重试一次
+            connection = await self.__connect__(scheme, host, port)
+            response = await self.__send__(connection, request)
+
+        response["des_ip"] = connection["des_ip"]
+        response["sou_ip"] = connection["sou_ip"]
+        if response["reusable"]:
+            self.__release_connection__(key, connection)
+        else:
+            connection["writer"].close()
+        return response
+
+    async def __send__(self, connection, request):
+        try:
+            connection["writer"].write(request.encode("latin-1", "ignore"))
+            await connection["writer"].drain()
+            return await self.__read_response__(connection["reader"])
+        except asyncio.CancelledError:
+            # 请求超时被取消时关闭连接，避免泄露
+            connection["writer"].close()
+            raise
+
+    async def __wait_host__(self, host):
+        # 同一个域名的请求之间保持最小间隔，代替原有的固定休眠
+        now = time.monotonic()
+        next_time = max(self.host_next_time.get(host, now), now)
+        self.host_next_time[host] = next_time + self.host_interval
+        if next_time > now:
+            await asyncio.sleep(next_time - now)
+
+    async def __connect__(self, scheme, host, port):
+        ips = self.resolver.get(host)
+        if ips is None:
+            # 重定向到的新域名未经过预解析，在线程池中解析后写入缓存
+            ips = await asyncio.get_running_loop().run_in_executor(None, self.resolver.resolve, host)
+        if not ips:
+            raise OSError("Unable to resolve host: " + host)
+
+        ssl_context = self.ssl_context if scheme == "https" else None
+        reader, writer = await asyncio.open_connection(ips[0], port, ssl=ssl_context,
+                                                       server_hostname=host if ssl_context else None,
+                                                       limit=64 * 1024)
+        # 目标IP即解析得到的IP，源IP在建立连接时记录
+        sockname = writer.get_extra_info("sockname")
+        return {"reader": reader, "writer": writer,
+                "des_ip": ips[0],
+                "sou_ip": sockname[0] if sockname else ""}
+
+    def __get_connection__(self, key):
+        connections = self.idle_connections.get(key)
+        while connections:
+            connection = connections.pop()
+            if not connection["writer"].is_closing() and not connection["reader"].at_eof():
+                return connection
+            connection["writer"].close()
+        return None
+
+    def __release_connection__(self, key, connection):
+        connections = self.idle_connections.setdefault(key, [])
+        if len(connections) < self.pool_size:
+            connections.append(connection)
+        else:
+            connection["writer"].close()
+
+    async def __read_response__(self, reader):
+        status_line = await reader.readuntil(b"\r\n")
+        status_parts = status_line.decode("latin-1").split(" ", 2)
+        version = status_parts[0]
+        status = int(status_parts[1])
+
+        headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            value = value.strip()
+            # 同名响应头与requests一致使用逗号拼接
+            if name in headers:
+                headers[name] = headers[name] + ", " + value
+            else:
+                headers[name] = value
+
+        reusable = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        body = b""
+        if status in (204, 304) or 100 <= status < 200:
+            pass
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            body, complete = await self.__read_chunked__(reader)
+            reusable = reusable and complete
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            body = await reader.readexactly(min(length, self.body_limit))
+            reusable = reusable and length <= self.body_limit
+        else:
+            # 未指定长度时读取到连接关闭为止
+            body = await reader.read(self.body_limit)
+            reusable = False
+
+        return {"status": status, "headers": headers, "body": body, "reusable": reusable}
+
+    async def __read_chunked__(self, reader):
+        body = b""
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # 读取结尾的空行及可能存在的trailer
+                while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                    pass
+                return body, True
+            if len(body) + size > self.body_limit:
+                body = body + await reader.readexactly(self.body_limit - len(body))
+                return body, False
+            body = body + await reader.readexactly(size)
+            await reader.readexactly(2)
+
+    def __parse_response__(self, response):
+        result = {"status": response["status"], "server": "", "cookie": "",
+                  "cdn": "", "des_ip": response["des_ip"], "sou_ip": response["sou_ip"], "title": ""}
+        headers = response["headers"]
+        # 检查并记录服务器类型
+        if "server" in headers:
+            result["server"] = headers["server"]
+        # 检查并记录Cookie信息
+        if "cookie" in headers:
+            result["cookie"] = headers["cookie"]
+        # 检查并累加CDN信息
+        cdn = ""
+        if "x-via" in headers:
+            cdn = cdn + headers["x-via"]
+        if "via" in headers:
+            cdn = cdn + headers["via"]
+        result["cdn"] = cdn
+
+        # 使用正则表达式提取页面标题
+        html = response["body"].decode(self.__get_charset__(headers), "replace")
+        title = re.findall('<title>(.+)</title>', html)
+        if title:
+            result["title"] = title[0]
+        return result
+
+    def __get_charset__(self, headers):
+        content_type = headers.get("content-type", "")
+        charset = re.findall(r'charset=["\']?([\w-]+)', content_type, re.I)
+        if charset:
+            try:
+                "".encode(charset[0])
+                return charset[0]
+            except LookupError:
+                pass
+        return "utf-8"
@@ -0,0 +1,217 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+"""
+Android二进制资源格式的解析，无需apktool即可读取APK中的AndroidManifest.xml与resources.arsc。
+
+- decode: 将二进制XML(AXML)还原为与apktool输出格式相近的文本XML。
+- iter_arsc_strings: 返回resources.arsc全局字符串池中的字符串，即字符串资源等全部资源值。
+"""
+import struct
+from xml.sax.saxutils import escape
+
+RES_STRING_POOL_TYPE = 0x0001
+RES_TABLE_TYPE = 0x0002
+RES_XML_TYPE = 0x0003
+RES_XML_START_NAMESPACE_TYPE = 0x0100
+RES_XML_END_NAMESPACE_TYPE = 0x0101
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_END_ELEMENT_TYPE = 0x0103
+RES_XML_CDATA_TYPE = 0x0104
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+
+UTF8_FLAG = 0x100
+NO_INDEX = 0xFFFFFFFF
+
+# 被混淆工具删除属性名后，根据资源ID还原常用的android属性名
+ATTRIBUTE_NAMES = {
+    0x01010003: "name",
+    0x0101020c: "minSdkVersion",
+    0x0101021b: "versionCode",
+    0x0101021c: "versionName",
+    0x01010270: "targetSdkVersion",
+}
+
+
+def is_axml(data):
+    return len(data) >= 8 and struct.unpack_from("<H", data, 0)[0] == RES_XML_TYPE
+
+
+def is_arsc(data):
+    return len(data) >= 12 and struct.unpack_from("<H", data, 0)[0] == RES_TABLE_TYPE
+
+
+def parse_string_pool(data, chunk_offset):
+    """
+    解析ResStringPool。
+
+    参数:
+    - data: 文件内容。
+    - chunk_offset: 字符串池chunk在文件中的偏移。
+
+    返回:
+    list: 由(字符串内容在文件中的偏移, 字符串)组成的列表，与字符串索引一一对应。
+    """
+    _, header_size, chunk_size, string_count, _, flags, strings_start, _ = struct.unpack_from(
+        "<HHIIIIII", data, chunk_offset)
+    utf8 = flags & UTF8_FLAG
+    offsets = struct.unpack_from("<%dI" % string_count, data, chunk_offset + header_size)
+    base = chunk_offset + strings_start
+    chunk_end = chunk_offset + chunk_size
+
+    strings = []
+    for offset in offsets:
+        position = base + offset
+        try:
+            if utf8:
+                # UTF-16长度与UTF-8字节长度，最高位为1时占两个字节
+                position = position + (2 if data[position] & 0x80 else 1)
+                length = data[position]
+                if length & 0x80:
+                    length = ((length & 0x7F) << 8) | data[position + 1]
+                    position = position + 2
+                else:
+                    position = position + 1
+                value = bytes(data[position:min(position + length, chunk_end)]).decode("utf-8", "replace")
+            else:
+                length = struct.unpack_from("<H", data, position)[0]
+                position = position + 2
+                if length & 0x8000:
+                    length = ((length & 0x7FFF) << 16) | struct.unpack_from("<H", data, position)[0]
+                    position = position + 2
+                value = bytes(data[position:min(position + length * 2, chunk_end)]).decode("utf-16-le", "replace")
+        except (IndexError, struct.error):
+            value = ""
+        strings.append((position, value))
+    return strings
+
+
+def iter_chunks(data, offset, end):
+    """
+    依次返回[offset, end)范围内的chunk: (类型, 头部大小, chunk大小, chunk偏移)。
+    """
+    while offset + 8 <= end:
+        chunk_type, header_size, chunk_size = struct.unpack_from("<HHI", data, offset)
+        if chunk_size < 8:
+            break
+        yield chunk_type, header_size, chunk_size, offset
+        offset = offset + chunk_size
+
+
+def format_value(strings, raw_value, data_type, value):
+    if raw_value != NO_INDEX and raw_value < len(strings):
+        return strings[raw_value][1]
+    if data_type == 0x03 and value < len(strings):
+        return strings[value][1]
+    if data_type == 0x01:
+        return "@0x%08x" % value
+    if data_type == 0x02:
+        return "?0x%08x" % value
+    if data_type == 0x04:
+        return repr(struct.unpack("<f", struct.pack("<I", value))[0])
+    if data_type == 0x10:
+        return str(struct.unpack("<i", struct.pack("<I", value))[0])
+    if data_type == 0x11:
+        return "0x%08x" % value
+    if data_type == 0x12:
+        return "true" if value else "false"
+    if 0x1c <= data_type <= 0x1f:
+        return "#%08x" % value
+    return str(value)
+
+
+def decode(data):
+    """
+    将二进制XML还原为文本XML，没有子节点的元素输出为自闭合标签，每个元素占一行。
+
+    返回:
+    str: 文本XML。
+    """
+    if not is_axml(data):
+        raise ValueError("Not a binary XML file.")
+    _, header_size, file_size = struct.unpack_from("<HHI", data, 0)
+    end = min(file_size, len(data))
+
+    strings = []
+    resource_ids = []
+    # 命名空间URI -> 前缀
+    namespaces = {}
+    pending_namespaces = []
+    lines = ['<?xml version="1.0" encoding="utf-8" standalone="no"?>']
+    depth = 0
+    # 尚未确定是否自闭合的开始标签
+    open_tag = None
+
+    def string(index):
+        if index == NO_INDEX or index >= len(strings):
+            return ""
+        return strings[index][1]
+
+    for chunk_type, chunk_header_size, chunk_size, offset in iter_chunks(data, header_size, end):
+        if chunk_type == RES_STRING_POOL_TYPE:
+            strings = parse_string_pool(data, offset)
+        elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+            count = (chunk_size - chunk_header_size) // 4
+            resource_ids = struct.unpack_from("<%dI" % count, data, offset + chunk_header_size)
+        elif chunk_type == RES_XML_START_NAMESPACE_TYPE:
+            prefix, uri = struct.unpack_from("<II", data, offset + chunk_header_size)
+            namespaces[string(uri)] = string(prefix)
+            pending_namespaces.append((string(prefix), string(uri)))
+        elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+            if open_tag is not None:
+                lines.append(open_tag + ">")
+            ext = offset + chunk_header_size
+            _, name, attribute_start, attribute_size, attribute_count = struct.unpack_from("<IIHHH", data, ext)
+            attributes = ['xmlns:%s="%s"' % (prefix, escape(uri, {'"': "&quot;"}))
+                          for prefix, uri in pending_namespaces]
+            pending_namespaces = []
+            for index in range(attribute_count):
+                attr_offset = ext + attribute_start + index * attribute_size
+                attr_ns, attr_name, raw_value, _, _, data_type, value = struct.unpack_from(
+                    "<IIIHBBI", data, attr_offset)
+                attr_name_str = string(attr_name)
+                if not attr_name_str and attr_name < len(resource_ids):
+                    attr_name_str = ATTRIBUTE_NAMES.get(resource_ids[attr_name], "")
+                prefix = namespaces.get(string(attr_ns), "") if attr_ns != NO_INDEX else ""
+                if prefix:
+                    attr_name_str = prefix + ":" + attr_name_str
+                attributes.append('%s="%s"' % (attr_name_str, escape(
+                    format_value(strings, raw_value, data_type, value), {'"': "&quot;"})))
+            open_tag = "    " * depth + "<" + " ".join([string(name)] + attributes)
+            depth = depth + 1
+        elif chunk_type == RES_XML_END_ELEMENT_TYPE:
+            depth = max(depth - 1, 0)
+            _, name = struct.unpack_from("<II", data, offset + chunk_header_size)
+            if open_tag is not None:
+                lines.append(open_tag + "/>")
+                open_tag = None
+            else:
+                lines.append("    " * depth + "</%s>" % string(name))
+        elif chunk_type == RES_XML_CDATA_TYPE:
+            if open_tag is not None:
+                lines.append(open_tag + ">")
+                open_tag = None
+            text = struct.unpack_from("<I", data, offset + chunk_header_size)[0]
+            lines.append("    " * depth + escape(string(text)))
+    if open_tag is not None:
+        lines.append(open_tag + ">")
+    return "\n".join(lines) + "\n"
+
+
+def iter_arsc_strings(data):
+    """
+    依次返回resources.arsc全局字符串池中的字符串。
+
+    返回:
+    generator: 依次返回(在文件中的偏移, 字符串)。
+    """
+    if not is_arsc(data):
+        raise ValueError("Not a resources.arsc file.")
+    _, header_size, file_size = struct.unpack_from("<HHI", data, 0)
+    for chunk_type, _, _, offset in iter_chunks(data, header_size, min(file_size, len(data))):
+        if chunk_type == RES_STRING_POOL_TYPE:
+            for item in parse_string_pool(data, offset):
+                yield item
+            # 全局字符串池之后为各个package，其中只有资源类型与资源名称
+            break
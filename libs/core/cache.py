@@ -0,0 +1,270 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+import config
+import libs.core.apk as apk
+
+# 缓存内容的格式版本，格式变化后旧的缓存自动失效
+CACHE_VERSION = 3
+
+
+def file_sha256(file_path):
+    """
+    分块计算文件内容的SHA-256，避免大文件一次性读入内存。
+    """
+    sha256_obj = hashlib.sha256()
+    with apk.open_binary(file_path) as f:
+        while True:
+            r = f.read(1024 * 1024)
+            if not r:
+                break
+            sha256_obj.update(r)
+    return sha256_obj.hexdigest()
+
+
+class ScanCache(object):
+    """
+    基于文件内容哈希的扫描结果缓存，保存在history目录下的SQLite数据库中。
+
+    缓存的键由文件内容的SHA-256与规则集哈希组成，规则发生变化后旧的缓存自动失效。
+    内容相同的文件(如各个版本之间未变化的第三方SDK)命中缓存后直接返回上次的扫描结果。
+    缓存条目超过config.scan_cache_max_entries时，按最近访问时间淘汰最久未使用的条目。
+    """
+
+    def __init__(self, db_path, rule_hash, max_entries=None):
+        self.db_path = db_path
+        self.rule_hash = rule_hash
+        self.max_entries = max_entries or config.scan_cache_max_entries
+        # 多进程模式下子进程只读缓存，写入的结果与命中的键由主进程统一写入
+        self.deferred = False
+        self.writes = []
+        self.touched = []
+        self.__connect__()
+
+    def __connect__(self):
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scan_cache (key TEXT PRIMARY KEY, results TEXT, last_access REAL)")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS scan_cache_access ON scan_cache (last_access)")
+        self.conn.commit()
+
+    def __getstate__(self):
+        # 多进程模式下只传递数据库路径，由子进程重新建立连接
+        return {"db_path": self.db_path, "rule_hash": self.rule_hash, "max_entries": self.max_entries}
+
+    def __setstate__(self, state):
+        # 子进程中不持有写事务，避免多个进程争用数据库的写锁
+        self.db_path = state["db_path"]
+        self.rule_hash = state["rule_hash"]
+        self.max_entries = state["max_entries"]
+        self.deferred = True
+        self.writes = []
+        self.touched = []
+        self.__connect__()
+
+    def derive(self, rule_hash):
+        """
+        获取规则集哈希不同、共用同一个数据库连接的缓存，用于批量扫描中不同类型的应用。
+        SQLite同一时间只允许一个连接写入，多个连接各自持有未提交的事务时会相互阻塞。
+        """
+        # 不能使用copy.copy，__getstate__会使副本重新建立连接
+        scan_cache = object.__new__(ScanCache)
+        scan_cache.__dict__.update(self.__dict__)
+        scan_cache.rule_hash = rule_hash
+        return scan_cache
+
+    def key(self, file_path):
+        return "%s:%s:%d" % (file_sha256(file_path), self.rule_hash, CACHE_VERSION)
+
+    def get(self, key):
+        """
+        获取缓存的扫描结果。
+
+        返回:
+        tuple: 缓存的(结果列表, 命中记录列表)，未命中时返回None。
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT results FROM scan_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.deferred:
+                self.touched.append(key)
+            else:
+                self.conn.execute(
+                    "UPDATE scan_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+                self.__commit__()
+        content = json.loads(row[0])
+        return content["results"], [tuple(finding) for finding in content["findings"]]
+
+    def put(self, key, results, findings=()):
+        """
+        保存一个文件的扫描结果。
+
+        参数:
+        - key: 缓存的键。
+        - results: 结果列表。
+        - findings: 由(规则名称, 命中内容, 偏移[, 所属的类])组成的命中记录列表。
+        """
+        content = json.dumps({"results": sorted(set(results)), "findings": sorted(set(findings))},
+                             ensure_ascii=False)
+        with self.lock:
+            if self.deferred:
+                self.writes.append((key, content))
+                return
+            self.conn.execute("INSERT OR REPLACE INTO scan_cache (key, results, last_access) VALUES (?, ?, ?)",
+                              (key, content, time.time()))
+            self.__commit__()
+
+    def drain(self):
+        """
+        取出子进程中尚未写入的结果与命中的键，随扫描结果返回给主进程。
+
+        返回:
+        tuple: (由(键, 缓存内容)组成的列表, 命中的键列表)。
+        """
+        with self.lock:
+            updates = (self.writes, self.touched)
+            self.writes = []
+            self.touched = []
+        return updates
+
+    def apply(self, updates):
+        """
+        在主进程中写入子进程返回的结果并更新命中条目的访问时间，每批提交一次。
+        """
+        writes, touched = updates
+        now = time.time()
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO scan_cache (key, results, last_access) VALUES (?, ?, ?)",
+                                  [(key, content, now) for key, content in writes])
+            self.conn.executemany("UPDATE scan_cache SET last_access = ? WHERE key = ?",
+                                  [(now, key) for key in touched])
+            self.conn.commit()
+            self.pending = 0
+
+    def __commit__(self):
+        # 批量提交，减少磁盘同步的次数
+        self.pending = self.pending + 1
+        if self.pending >= 100:
+            self.conn.commit()
+            self.pending = 0
+
+    def close(self, evict=True):
+        """
+        提交未保存的结果并关闭数据库连接。
+
+        参数:
+        - evict: 是否按照LRU策略淘汰超出上限的缓存条目。
+        """
+        with self.lock:
+            if evict:
+                self.conn.execute("DELETE FROM scan_cache WHERE key IN (SELECT key FROM scan_cache "
+                                  "ORDER BY last_access DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self.conn.commit()
+            self.conn.close()
+
+
+# 当前进程中使用或者生成的反编译缓存目录，这些目录中的文件可能仍在扫描，清理缓存时跳过
+decode_in_use = set()
+decode_in_use_lock = threading.Lock()
+
+
+class DecodeCache(object):
+    """
+    apktool反编译结果的缓存，以APK文件的SHA-256为目录名保存在history目录下。
+
+    命中缓存时直接使用已反编译的目录，跳过apktool。反编译先输出到临时目录，成功后再重命名，
+    避免中途失败留下不完整的缓存。缓存目录超过config.decode_cache_max_entries个，
+    或者超过config.decode_cache_max_days天未使用时会被清理，本次运行中使用过的缓存目录不会被清理。
+    """
+
+    def __init__(self, cache_dir, max_entries=None, max_days=None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries or config.decode_cache_max_entries
+        self.max_days = max_days or config.decode_cache_max_days
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    def get(self, key):
+        """
+        获取缓存的反编译目录。
+
+        返回:
+        str: 缓存目录的路径，未命中时返回None。
+        """
+        cache_path = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(cache_path):
+            return None
+        # 更新访问时间，用于淘汰最久未使用的缓存
+        os.utime(cache_path, None)
+        with decode_in_use_lock:
+            decode_in_use.add(cache_path)
+        return cache_path
+
+    def prepare(self, key):
+        """
+        获取本次反编译输出的临时目录。
+        """
+        return os.path.join(self.cache_dir, "%s.%s.tmp" % (key, uuid.uuid4().hex))
+
+    def commit(self, key, temp_path):
+        """
+        将反编译完成的临时目录保存为缓存，并清理过期的缓存。
+
+        返回:
+        str: 缓存目录的路径。
+        """
+        cache_path = os.path.join(self.cache_dir, key)
+        with decode_in_use_lock:
+            decode_in_use.add(cache_path)
+        try:
+            os.rename(temp_path, cache_path)
+        except OSError:
+            # 同一个APK被并发反编译时，保留先完成的结果
+            shutil.rmtree(temp_path, ignore_errors=True)
+        self.prune()
+        return cache_path
+
+    def prune(self):
+        expire_time = time.time() - self.max_days * 24 * 3600
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir():
+                continue
+            mtime = entry.stat().st_mtime
+            if entry.name.endswith(".tmp"):
+                # 清理异常退出时遗留的临时目录
+                if mtime < time.time() - 24 * 3600:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            with decode_in_use_lock:
+                in_use = entry.path in decode_in_use
+            if in_use:
+                # 本次运行使用的缓存计入数量，但不会被清理
+                entries.append((float("inf"), entry.path))
+                continue
+            if mtime < expire_time:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            entries.append((mtime, entry.path))
+
+        entries.sort(reverse=True)
+        for mtime, path in entries[self.max_entries:]:
+            if mtime != float("inf"):
+                shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,305 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+"""
+DEX文件的字符串表解析，无需baksmali即可获取DEX中的全部字符串常量与类型描述符。
+
+DEX中所有的字符串(包括const-string使用的字符串常量、类名、方法名等)都保存在string_ids指向的
+string_data_item中，格式为uleb128表示的UTF-16长度加上以0结尾的MUTF-8编码内容。
+字符串所属的类通过遍历每个类方法中的const-string指令获得。
+"""
+import mmap
+import struct
+from contextlib import contextmanager
+
+DEX_MAGIC = b"dex\n"
+
+# header中string_ids、type_ids、class_defs的数量与偏移所在的位置
+HEADER_STRING_IDS = 56
+HEADER_TYPE_IDS = 64
+HEADER_CLASS_DEFS = 96
+
+OP_CONST_STRING = 0x1a
+OP_CONST_STRING_JUMBO = 0x1b
+
+
+def __instruction_units__():
+    # 每个操作码对应的指令长度(16位代码单元的个数)，未使用的操作码按1计算
+    units = [1] * 256
+    for opcodes, size in (
+            ((0x02, 0x05, 0x08, 0x13, 0x15, 0x16, 0x19, 0x1a, 0x1c, 0x1f, 0x20, 0x22, 0x23, 0x29, 0xfe, 0xff), 2),
+            ((0x03, 0x06, 0x09, 0x14, 0x17, 0x1b, 0x24, 0x25, 0x26, 0x2a, 0x2b, 0x2c, 0xfc, 0xfd), 3),
+            ((0xfa, 0xfb), 4),
+            ((0x18,), 5),
+            (range(0x2d, 0x3e), 2),
+            (range(0x44, 0x6e), 2),
+            (range(0x6e, 0x73), 3),
+            (range(0x74, 0x79), 3),
+            (range(0x90, 0xb0), 2),
+            (range(0xd0, 0xe3), 2)):
+        for opcode in opcodes:
+            units[opcode] = size
+    return units
+
+
+INSTRUCTION_UNITS = __instruction_units__()
+
+
+def is_dex(data):
+    return data[:4] == DEX_MAGIC
+
+
+def read_uleb128(data, offset):
+    """
+    读取uleb128编码的整数。
+
+    返回:
+    tuple: (整数, 下一个字段的偏移)。
+    """
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset = offset + 1
+        result = result | ((byte & 0x7F) << shift)
+        if byte < 0x80:
+            return result, offset
+        shift = shift + 7
+
+
+@contextmanager
+def open_dex(file_path):
+    """
+    以内存映射的方式打开DEX文件，不会将整个文件读入内存。
+
+    返回:
+    DexFile: DEX文件解析器，退出上下文后失效。
+    """
+    with open(file_path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield DexFile(buf)
+        finally:
+            buf.close()
+
+
+def iter_strings(file_path, package_filter=None):
+    """
+    依次返回DEX文件中的字符串以及使用该字符串的类。
+
+    参数:
+    - file_path: DEX文件路径。
+    - package_filter: 包名过滤，见in_packages。
+
+    返回:
+    generator: 依次返回(在文件中的偏移, 字符串, 类型描述符)，没有被const-string使用的字符串类型描述符为None。
+    """
+    with open_dex(file_path) as dex_file:
+        for item in dex_file.strings_with_classes(package_filter):
+            yield item
+
+
+def in_packages(descriptor, package_filter):
+    """
+    判断类是否在需要扫描的包内，与apktool模式下按照smali目录过滤的规则一致。
+
+    参数:
+    - descriptor: 类型描述符，如Lcom/example/Main;。
+    - package_filter: (需要扫描的包名前缀列表, 需要排除的包名前缀列表)，前缀形如com/example。
+
+    返回:
+    bool: 类所在的包在需要扫描的包内且不在排除的包内时返回True。
+    """
+    prefixes, exclude_prefixes = package_filter
+    package = descriptor[1:-1].rpartition("/")[0] + "/"
+    if any(package.startswith(prefix + "/") for prefix in exclude_prefixes):
+        return False
+    return not prefixes or any(package.startswith(prefix + "/") for prefix in prefixes)
+
+
+def decode_mutf8(raw):
+    """
+    解码MUTF-8字符串: U+0000编码为C0 80，增补平面字符编码为两个3字节的代理项。
+    """
+    if raw.isascii():
+        return raw.decode("ascii")
+    raw = raw.replace(b"\xc0\x80", b"\x00")
+    value = raw.decode("utf-8", "surrogatepass")
+    if b"\xed" in raw:
+        # 将成对的代理项合并为增补平面字符，无法配对的代理项替换为U+FFFD
+        value = value.encode("utf-16-le", "surrogatepass").decode("utf-16-le", "replace")
+    return value
+
+
+class DexFile(object):
+    """
+    DEX文件的只读解析器。
+
+    参数:
+    - data: DEX文件内容，可以是bytes、mmap或者memoryview等支持切片的对象。
+    """
+
+    def __init__(self, data):
+        if not is_dex(data):
+            raise ValueError("Not a DEX file.")
+        self.data = data
+        self.string_count, self.string_ids_off = struct.unpack_from("<2I", data, HEADER_STRING_IDS)
+        self.type_count, self.type_ids_off = struct.unpack_from("<2I", data, HEADER_TYPE_IDS)
+        self.class_count, self.class_defs_off = struct.unpack_from("<2I", data, HEADER_CLASS_DEFS)
+
+    def string_offsets(self):
+        """
+        获取每个字符串的string_data_item在文件中的偏移。
+        """
+        return struct.unpack_from("<%dI" % self.string_count, self.data, self.string_ids_off)
+
+    def string_at(self, offset):
+        """
+        读取偏移处的string_data_item。
+
+        返回:
+        tuple: (MUTF-8内容在文件中的偏移, 解码后的字符串)。
+        """
+        data = self.data
+        # 跳过uleb128编码的UTF-16长度
+        while data[offset] & 0x80:
+            offset = offset + 1
+        offset = offset + 1
+        end = data.find(b"\0", offset)
+        if end == -1:
+            end = len(data)
+        return offset, decode_mutf8(bytes(data[offset:end]))
+
+    def strings(self):
+        """
+        按string_ids的顺序依次返回DEX中的所有字符串。
+
+        返回:
+        generator: 依次返回(在文件中的偏移, 字符串)。
+        """
+        for offset in self.string_offsets():
+            try:
+                yield self.string_at(offset)
+            except (IndexError, UnicodeDecodeError):
+                # 损坏或者被加固工具篡改的字符串直接跳过
+                continue
+
+    def strings_with_classes(self, package_filter=None):
+        """
+        与strings相同，同时返回第一个通过const-string使用该字符串的类。
+
+        参数:
+        - package_filter: 包名过滤，见in_packages。指定时只返回需要扫描的类通过const-string使用的字符串。
+
+        返回:
+        generator: 依次返回(在文件中的偏移, 字符串, 类型描述符)，无法确定时类型描述符为None。
+        """
+        try:
+            string_classes = self.string_classes(package_filter)
+        except (IndexError, struct.error):
+            # 类定义被加固工具篡改时只返回字符串
+            string_classes = {}
+        for index, offset in enumerate(self.string_offsets()):
+            if package_filter and index not in string_classes:
+                continue
+            try:
+                data_offset, string = self.string_at(offset)
+            except (IndexError, UnicodeDecodeError):
+                continue
+            yield data_offset, string, string_classes.get(index)
+
+    def string_classes(self, package_filter=None):
+        """
+        遍历所有类方法的指令，获取const-string与const-string/jumbo引用的字符串所属的类。
+
+        参数:
+        - package_filter: 包名过滤，见in_packages。指定时跳过不需要扫描的类。
+
+        返回:
+        dict: 字符串下标 -> 第一个引用该字符串的类的类型描述符。
+        """
+        data = self.data
+        string_offsets = self.string_offsets()
+        type_ids = struct.unpack_from("<%dI" % self.type_count, data, self.type_ids_off)
+        string_classes = {}
+        for index in range(self.class_count):
+            class_idx, _, _, _, _, _, class_data_off, _ = struct.unpack_from(
+                "<8I", data, self.class_defs_off + index * 32)
+            if class_data_off == 0:
+                continue
+            descriptor = None
+            if package_filter:
+                descriptor = self.string_at(string_offsets[type_ids[class_idx]])[1]
+                if not in_packages(descriptor, package_filter):
+                    continue
+            for string_idx in self.__const_strings__(class_data_off):
+                if string_idx in string_classes:
+                    continue
+                if descriptor is None:
+                    descriptor = self.string_at(string_offsets[type_ids[class_idx]])[1]
+                string_classes[string_idx] = descriptor
+        return string_classes
+
+    def __const_strings__(self, class_data_off):
+        # class_data_item: 静态字段数、实例字段数、直接方法数、虚方法数，以及字段与方法列表
+        data = self.data
+        offset = class_data_off
+        sizes = []
+        for _ in range(4):
+            size, offset = read_uleb128(data, offset)
+            sizes.append(size)
+        # 跳过字段列表: field_idx_diff、access_flags
+        for _ in range((sizes[0] + sizes[1]) * 2):
+            _, offset = read_uleb128(data, offset)
+        for _ in range(sizes[2] + sizes[3]):
+            _, offset = read_uleb128(data, offset)
+            _, offset = read_uleb128(data, offset)
+            code_off, offset = read_uleb128(data, offset)
+            if code_off:
+                for string_idx in self.__code_strings__(code_off):
+                    yield string_idx
+
+    def __code_strings__(self, code_off):
+        # code_item的前16个字节为寄存器数等信息，insns_size为指令的代码单元数
+        data = self.data
+        insns_size = struct.unpack_from("<I", data, code_off + 12)[0]
+        start = code_off + 16
+        end = start + insns_size * 2
+        # 没有const-string指令的方法直接跳过
+        if data.find(bytes((OP_CONST_STRING,)), start, end) == -1 and \
+                data.find(bytes((OP_CONST_STRING_JUMBO,)), start, end) == -1:
+            return
+        position = start
+        while position < end:
+            opcode = data[position]
+            if opcode == OP_CONST_STRING:
+                yield struct.unpack_from("<H", data, position + 2)[0]
+            elif opcode == OP_CONST_STRING_JUMBO:
+                yield struct.unpack_from("<I", data, position + 2)[0]
+            elif opcode == 0 and data[position + 1]:
+                # packed-switch、sparse-switch、fill-array-data的数据负载
+                ident = data[position + 1]
+                if ident == 1:
+                    units = 4 + struct.unpack_from("<H", data, position + 2)[0] * 2
+                elif ident == 2:
+                    units = 2 + struct.unpack_from("<H", data, position + 2)[0] * 4
+                elif ident == 3:
+                    width, count = struct.unpack_from("<HI", data, position + 2)
+                    units = 4 + (width * count + 1) // 2
+                else:
+                    units = 1
+                position = position + units * 2
+                continue
+            position = position + INSTRUCTION_UNITS[opcode] * 2
+
+    def type_descriptors(self):
+        """
+        依次返回type_ids中的所有类型描述符，如Lcom/alibaba/fastjson/JSON;。
+        """
+        string_offsets = self.string_offsets()
+        for index in struct.unpack_from("<%dI" % self.type_count, self.data, self.type_ids_off):
+            try:
+                yield self.string_at(string_offsets[index])[1]
+            except (IndexError, UnicodeDecodeError):
+                continue
@@ -70,7 +70,6 @@ class DownloadThreads(threading.Thread):
                                     print("\r", end="")
                                     print("[*] Download progress: {}%: ".format(progress), "▋" * (progress // 2), end="")
                                     sys.stdout.flush()
-                            f.close()
                 else:
                     # 直接保存HTML文本
                     html = resp.text
@@ -0,0 +1,224 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import re
+import mmap
+import struct
+
+import config
+
+# 胖二进制(Universal)文件头，固定为大端序
+FAT_MAGIC = 0xCAFEBABE
+FAT_MAGIC_64 = 0xCAFEBABF
+
+# 单架构Mach-O文件头: magic -> (是否为64位, 字节序)
+MACHO_MAGICS = {
+    b"\xce\xfa\xed\xfe": (False, "<"),
+    b"\xcf\xfa\xed\xfe": (True, "<"),
+    b"\xfe\xed\xfa\xce": (False, ">"),
+    b"\xfe\xed\xfa\xcf": (True, ">"),
+}
+
+LC_SEGMENT = 0x1
+LC_SEGMENT_64 = 0x19
+LC_ENCRYPTION_INFO = 0x21
+LC_ENCRYPTION_INFO_64 = 0x2C
+
+# 无文件内容的section类型
+S_ZEROFILL = 0x1
+S_GB_ZEROFILL = 0xC
+S_THREAD_LOCAL_ZEROFILL = 0x12
+
+# 胖二进制中架构数量的上限，用于区分同样以CAFEBABE开头的Java class文件
+FAT_MAX_ARCHS = 30
+
+
+def iter_slices(buf):
+    """
+    获取文件中所有的Mach-O架构切片。
+
+    参数:
+    - buf: 文件内容，支持bytes或mmap。
+
+    返回:
+    generator: 依次返回(切片起始偏移, 是否为64位, 字节序)。
+    """
+    if len(buf) < 8:
+        return
+
+    magic = struct.unpack_from(">I", buf, 0)[0]
+    if magic in (FAT_MAGIC, FAT_MAGIC_64):
+        nfat_arch = struct.unpack_from(">I", buf, 4)[0]
+        if nfat_arch == 0 or nfat_arch > FAT_MAX_ARCHS:
+            return
+        offset = 8
+        for _ in range(nfat_arch):
+            if magic == FAT_MAGIC:
+                _, _, slice_offset, _, _ = struct.unpack_from(">5I", buf, offset)
+                offset = offset + 20
+            else:
+                _, _, slice_offset, _, _, _ = struct.unpack_from(">2I2Q2I", buf, offset)
+                offset = offset + 32
+            slice_magic = bytes(buf[slice_offset:slice_offset + 4])
+            if slice_magic in MACHO_MAGICS:
+                is64, endian = MACHO_MAGICS[slice_magic]
+                yield slice_offset, is64, endian
+        return
+
+    header_magic = bytes(buf[0:4])
+    if header_magic in MACHO_MAGICS:
+        is64, endian = MACHO_MAGICS[header_magic]
+        yield 0, is64, endian
+
+
+def iter_load_commands(buf, offset, is64, endian):
+    """
+    遍历单个架构切片中的所有Load Command。
+
+    返回:
+    generator: 依次返回(cmd, Load Command在文件中的偏移, cmdsize)。
+    """
+    ncmds, sizeofcmds = struct.unpack_from(endian + "2I", buf, offset + 16)
+    cmd_offset = offset + (32 if is64 else 28)
+    end = min(cmd_offset + sizeofcmds, len(buf))
+    for _ in range(ncmds):
+        if cmd_offset + 8 > end:
+            break
+        cmd, cmdsize = struct.unpack_from(endian + "2I", buf, cmd_offset)
+        yield cmd, cmd_offset, cmdsize
+        if cmdsize < 8:
+            break
+        cmd_offset = cmd_offset + cmdsize
+
+
+def iter_sections(buf, offset, is64, endian):
+    """
+    遍历单个架构切片中的所有section。
+
+    返回:
+    generator: 依次返回(segname, sectname, section在文件中的偏移, section大小)，不包含无文件内容的section。
+    """
+    for cmd, cmd_offset, _ in iter_load_commands(buf, offset, is64, endian):
+        if cmd == LC_SEGMENT_64 and is64:
+            nsects = struct.unpack_from(endian + "I", buf, cmd_offset + 64)[0]
+            sect_offset = cmd_offset + 72
+            sect_format = endian + "16s16s2Q8I"
+            sect_size = 80
+        elif cmd == LC_SEGMENT and not is64:
+            nsects = struct.unpack_from(endian + "I", buf, cmd_offset + 48)[0]
+            sect_offset = cmd_offset + 56
+            sect_format = endian + "16s16s9I"
+            sect_size = 68
+        else:
+            continue
+
+        for _ in range(nsects):
+            fields = struct.unpack_from(sect_format, buf, sect_offset)
+            sect_offset = sect_offset + sect_size
+            sectname = fields[0].split(b"\0", 1)[0].decode("ascii", "ignore")
+            segname = fields[1].split(b"\0", 1)[0].decode("ascii", "ignore")
+            size, file_offset, flags = fields[3], fields[4], fields[8]
+            if (flags & 0xFF) in (S_ZEROFILL, S_GB_ZEROFILL, S_THREAD_LOCAL_ZEROFILL) or file_offset == 0:
+                continue
+            # section偏移相对于所在架构切片
+            yield segname, sectname, offset + file_offset, size
+
+
+def iter_strings(file_path, sections=None, min_length=4):
+    """
+    在进程内提取文件中的可打印字符串，替代外部的strings命令。
+
+    对Mach-O文件仅提取config.macho_string_sections中指定section的内容，
+    其他文件(plist、js等资源文件)则与strings命令一致，提取整个文件中的可打印字符串。
+
+    参数:
+    - file_path: 文件路径。
+    - sections: 需要提取的section名称，默认为config.macho_string_sections。
+    - min_length: 字符串的最小长度。
+
+    返回:
+    generator: 依次返回提取到的字符串。
+    """
+    for _, string in iter_string_offsets(file_path, sections, min_length):
+        yield string
+
+
+def iter_string_offsets(file_path, sections=None, min_length=4):
+    """
+    与iter_strings相同，同时返回每个字符串在文件中的字节偏移。
+
+    返回:
+    generator: 依次返回(偏移, 字符串)。
+    """
+    if sections is None:
+        sections = config.macho_string_sections
+    sections = frozenset(sections)
+    pattern = re.compile(rb"[\x20-\x7e\t\x80-\xff]{%d,}" % min_length)
+
+    with open(file_path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件无法映射
+            return
+        try:
+            try:
+                slices = list(iter_slices(buf))
+            except struct.error:
+                slices = []
+            if len(slices) == 0:
+                for match in pattern.finditer(buf):
+                    yield match.start(), match.group().decode("utf-8", "ignore")
+                return
+
+            sect_list = []
+            try:
+                for offset, is64, endian in slices:
+                    sect_list.extend(iter_sections(buf, offset, is64, endian))
+            except struct.error:
+                # 文件结构不完整时仅处理已解析到的section
+                pass
+
+            for _, sectname, sect_offset, size in sect_list:
+                if sectname not in sections:
+                    continue
+                end = min(sect_offset + size, len(buf))
+                if sectname == "__ustring":
+                    # __ustring中为UTF-16编码的字符串
+                    string_offset = sect_offset
+                    for string in bytes(buf[sect_offset:end]).decode("utf-16-le", "ignore").split("\0"):
+                        if len(string) >= min_length:
+                            yield string_offset, string
+                        string_offset = string_offset + (len(string) + 1) * 2
+                    continue
+                for match in pattern.finditer(buf, sect_offset, end):
+                    yield match.start(), match.group().decode("utf-8", "ignore")
+        finally:
+            buf.close()
+
+
+def is_encrypted(file_path):
+    """
+    通过LC_ENCRYPTION_INFO中的cryptid判断Mach-O文件是否被加密(加壳)。
+
+    返回:
+    bool: 任意架构切片被加密返回True，否则返回False。
+    """
+    with open(file_path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return False
+        try:
+            for offset, is64, endian in iter_slices(buf):
+                for cmd, cmd_offset, _ in iter_load_commands(buf, offset, is64, endian):
+                    if cmd in (LC_ENCRYPTION_INFO, LC_ENCRYPTION_INFO_64):
+                        cryptid = struct.unpack_from(endian + "I", buf, cmd_offset + 16)[0]
+                        if cryptid != 0:
+                            return True
+            return False
+        except struct.error:
+            return False
+        finally:
+            buf.close()
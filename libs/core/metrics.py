@@ -0,0 +1,214 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import json
+import time
+import heapq
+import bisect
+import threading
+from contextlib import contextmanager
+
+import config
+import libs.core as cores
+import libs.core.apk as apk
+
+
+class Metrics(object):
+    """
+    扫描过程的耗时与计数统计，仅在--profile开启(cores.profile_flag)时记录，关闭时各记录方法直接返回。
+
+    - 阶段耗时: 通过stage记录每个阶段的墙钟时间与进程CPU时间，多个线程同时执行的阶段会累加。
+    - 计数器: 通过count累加，每个线程写入自己的计数器，生成报告时合并，热点路径上无需加锁。
+    - 文件: 通过record_file记录每个文件的扫描耗时与大小，保留最慢的config.profile_slowest_files个文件。
+    - 延迟分布: 通过observe按照config.profile_latency_buckets统计网络嗅探等操作的耗时分布。
+
+    多进程模式下子进程通过snapshot导出统计结果，由主进程merge合并。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.local = threading.local()
+            self.counter_list = []
+            # 阶段名称 -> [墙钟时间, CPU时间, 次数]
+            self.stages = {}
+            # (耗时, 文件路径)组成的小顶堆
+            self.slowest_files = []
+            # 名称 -> 每个区间的次数，最后一个区间为超出最大值的次数
+            self.histograms = {}
+            self.start_time = time.perf_counter()
+            self.start_cpu = time.process_time()
+
+    def enabled(self):
+        return cores.profile_flag
+
+    def count(self, name, value=1):
+        if not cores.profile_flag:
+            return
+        counters = getattr(self.local, "counters", None)
+        if counters is None:
+            counters = {}
+            self.local.counters = counters
+            with self.lock:
+                self.counter_list.append(counters)
+        counters[name] = counters.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, name):
+        if not cores.profile_flag:
+            yield
+            return
+        start_time = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start_time, time.process_time() - start_cpu)
+
+    def add_stage(self, name, wall, cpu, times=1):
+        if not cores.profile_flag:
+            return
+        with self.lock:
+            stage = self.stages.setdefault(name, [0.0, 0.0, 0])
+            stage[0] = stage[0] + wall
+            stage[1] = stage[1] + cpu
+            stage[2] = stage[2] + times
+
+    def record_file(self, file_path, seconds):
+        """
+        记录单个文件的扫描耗时、读取的字节数，并更新最慢的文件列表。
+        """
+        if not cores.profile_flag:
+            return
+        try:
+            size = apk.getsize(file_path)
+        except (OSError, KeyError):
+            size = 0
+        self.count("files_scanned")
+        self.count("bytes_read", size)
+        self.__push_file__(seconds, file_path)
+
+    def __push_file__(self, seconds, file_path):
+        with self.lock:
+            item = (seconds, file_path)
+            if len(self.slowest_files) < config.profile_slowest_files:
+                heapq.heappush(self.slowest_files, item)
+            elif item > self.slowest_files[0]:
+                heapq.heapreplace(self.slowest_files, item)
+
+    def observe(self, name, seconds):
+        """
+        将一次操作的耗时计入延迟分布。
+        """
+        if not cores.profile_flag:
+            return
+        buckets = config.profile_latency_buckets
+        index = bisect.bisect_left(buckets, seconds)
+        with self.lock:
+            histogram = self.histograms.setdefault(name, [0] * (len(buckets) + 1))
+            histogram[index] = histogram[index] + 1
+
+    def counters(self):
+        with self.lock:
+            return self.__merge_counters__()
+
+    def __merge_counters__(self):
+        result = {}
+        for counters in self.counter_list:
+            for name, value in list(counters.items()):
+                result[name] = result.get(name, 0) + value
+        return result
+
+    def snapshot(self):
+        """
+        导出当前的统计结果，用于从子进程传回主进程。
+        """
+        with self.lock:
+            return {"counters": self.__merge_counters__(),
+                    "stages": {name: list(stage) for name, stage in self.stages.items()},
+                    "slowest_files": list(self.slowest_files),
+                    "histograms": {name: list(histogram) for name, histogram in self.histograms.items()}}
+
+    def merge(self, snapshot):
+        """
+        合并子进程导出的统计结果。
+        """
+        if not snapshot:
+            return
+        for name, value in snapshot["counters"].items():
+            self.count(name, value)
+        for name, (wall, cpu, times) in snapshot["stages"].items():
+            self.add_stage(name, wall, cpu, times)
+        for seconds, file_path in snapshot["slowest_files"]:
+            self.__push_file__(seconds, file_path)
+        with self.lock:
+            for name, counts in snapshot["histograms"].items():
+                histogram = self.histograms.setdefault(name, [0] * len(counts))
+                for index, value in enumerate(counts):
+                    histogram[index] = histogram[index] + value
+
+    def report(self):
+        """
+        生成统计报告。
+
+        返回:
+        dict: 包含总耗时、各阶段耗时、计数器、扫描速度、最慢的文件以及延迟分布的字典。
+        """
+        counters = self.counters()
+        wall = time.perf_counter() - self.start_time
+        with self.lock:
+            stages = {name: {"wall": round(stage[0], 3), "cpu": round(stage[1], 3), "count": stage[2]}
+                      for name, stage in self.stages.items()}
+            slowest_files = [{"file": file_path, "seconds": round(seconds, 4)}
+                             for seconds, file_path in sorted(self.slowest_files, reverse=True)]
+            histograms = {}
+            labels = ["<=%ss" % bucket for bucket in config.profile_latency_buckets] + \
+                [">%ss" % config.profile_latency_buckets[-1]]
+            for name, histogram in self.histograms.items():
+                histograms[name] = dict(zip(labels, histogram))
+
+        scan_wall = stages.get("scan", {}).get("wall") or wall
+        files_scanned = counters.get("files_scanned", 0)
+        return {
+            "wall": round(wall, 3),
+            "cpu": round(time.process_time() - self.start_cpu, 3),
+            "stages": stages,
+            "counters": counters,
+            "files_per_second": round(files_scanned / scan_wall, 2) if scan_wall else 0,
+            "bytes_per_second": round(counters.get("bytes_read", 0) / scan_wall, 2) if scan_wall else 0,
+            "regex_evaluations": {name[6:]: value for name, value in sorted(counters.items())
+                                  if name.startswith("regex:")},
+            "slowest_files": slowest_files,
+            "latency": histograms,
+        }
+
+    def print_summary(self, report):
+        print("[*] ========= Profile summary ===============")
+        print("[*] Total wall time: %.3fs, CPU time: %.3fs" % (report["wall"], report["cpu"]))
+        for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["wall"]):
+            print("[*] Stage %-12s wall: %9.3fs  cpu: %9.3fs  count: %d" %
+                  (name, stage["wall"], stage["cpu"], stage["count"]))
+        print("[*] Files scanned: %d (%.2f files/s), bytes read: %d (%.2f MB/s)" %
+              (report["counters"].get("files_scanned", 0), report["files_per_second"],
+               report["counters"].get("bytes_read", 0), report["bytes_per_second"] / 1024 / 1024))
+        for name, value in sorted(report["regex_evaluations"].items(), key=lambda item: -item[1]):
+            print("[*] Regex %-30s evaluations: %d" % (name, value))
+        for item in report["slowest_files"]:
+            print("[*] Slow file %.4fs: %s" % (item["seconds"], item["file"]))
+        for name, histogram in report["latency"].items():
+            print("[*] Latency %s: %s" % (name, ", ".join("%s: %d" % item for item in histogram.items())))
+
+    def write_report(self, report_path):
+        report = self.report()
+        self.print_summary(report)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print("[*] For more information about the profile, see JSON file result: %s" % (report_path))
+
+
+# 进程内共享的统计实例
+metrics = Metrics()
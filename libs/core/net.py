@@ -5,25 +5,84 @@
 import re
 import time
 import threading
+from urllib.parse import urlsplit, urlunsplit
 import requests
-import libs.core as cores
+from libs.core.session import SnifferSession
+from libs.core.metrics import metrics
+
+
+def normalize_url(url):
+    """
+    规范化URL，用于嗅探前的去重。
+
+    去掉#后的片段、将查询参数按照名称排序、将协议和域名转为小写，
+    仅参数顺序或域名大小写不同的URL只会被嗅探一次。
+
+    参数:
+    - url: 需要规范化的URL。
+
+    返回:
+    str: 规范化后的URL，无法解析时原样返回。
+    """
+    try:
+        url_parts = urlsplit(url)
+        url_parts.port
+    except ValueError:
+        return url
+    netloc = url_parts.netloc
+    if "@" in netloc:
+        userinfo, _, host = netloc.rpartition("@")
+        netloc = userinfo + "@" + host.lower()
+    else:
+        netloc = netloc.lower()
+    query = url_parts.query
+    if query:
+        query = "&".join(sorted(query.split("&")))
+    return urlunsplit((url_parts.scheme.lower(), netloc, url_parts.path, query, ""))
+
+
+def host_url(url):
+    """
+    获取URL对应的协议和域名，作为域名级别嗅探的请求地址，如https://api.example.com/。
+    """
+    url_parts = urlsplit(url)
+    return urlunsplit((url_parts.scheme, url_parts.netloc, "/", "", ""))
+
+
+def write_probe_result(writer, domains, result):
+    """
+    将一次嗅探的结果交给写入线程。
+
+    域名级别的嗅探(domains中包含urls)只请求一次协议+域名，结果中的IP、Server、CDN为域名级别的信息，
+    写入该域名下的所有URL，Status和Title属于具体路径，不写入。
+    """
+    if "urls" not in domains:
+        writer.write(domains["url_ip"], domains["domain"], result)
+        return
+
+    if result != "timeout":
+        result = dict(result, status="", title="")
+    for url_ip, domain in domains["urls"]:
+        writer.write(url_ip, domain, result)
+
 
 class NetThreads(threading.Thread):
 
-    def __init__(self, threadID, name, domain_queue, worksheet):
+    def __init__(self, threadID, name, domain_queue, writer, session=None):
         threading.Thread.__init__(self)
         self.name = name
         self.threadID = threadID
-        self.lock = threading.Lock()
         self.domain_queue = domain_queue
-        self.worksheet = worksheet
+        self.writer = writer
+        # 所有嗅探线程共享的会话层，未传入时单独创建
+        self.session = session or SnifferSession()
 
     def __get_Http_info__(self, threadLock):
         """
         获取HTTP信息并更新Excel工作表。
 
         从域名队列中获取域名和URL IP，然后请求URL的信息。
-        如果请求成功且结果不为错误，则将信息写入Excel工作表中。
+        如果请求成功且结果不为错误，则将信息交给写入线程写入Excel工作表中。
 
         参数:
         - threadLock: 线程锁，用于同步对共享资源的访问。
@@ -38,111 +97,83 @@ class NetThreads(threading.Thread):
 
             # 从队列中获取域名信息，包括域名和URL IP
             domains = self.domain_queue.get(timeout=5)
-            domain = domains["domain"]
             url_ip = domains["url_ip"]
 
             # 短暂休眠，以模拟处理时间或减轻目标服务器的负担
-            time.sleep(2)
+            with metrics.stage("sniffer_sleep"):
+                time.sleep(2)
 
             # 发起HTTP请求并获取结果
+            start_time = time.perf_counter()
             result = self.__get_request_result__(url_ip)
+            metrics.observe("probe", time.perf_counter() - start_time)
             print("[+] Processing URL address："+url_ip)
 
-            # 如果结果不为错误，则尝试获取线程锁以更新Excel工作表
-            # 检查结果是否为错误
+            # 如果结果不为错误，则交给写入线程写入Excel工作表
             if result != "error":
-                # 尝试获取线程锁，以便安全地写入Excel
-                if self.lock.acquire(True):
-                    # 更新Excel行号并写入域名、URL IP等信息
-                    cores.excel_row = cores.excel_row + 1
-                    self.worksheet.cell(row=cores.excel_row, column=1, value=cores.excel_row-1)
-                    self.worksheet.cell(row=cores.excel_row, column=2, value=url_ip)
-                    self.worksheet.cell(row=cores.excel_row, column=3, value=domain)
-
-                    # 如果结果不是超时，则写入更多详细信息
-                    if result != "timeout":
-                        self.worksheet.cell(row=cores.excel_row, column=4, value=result["status"])
-                        self.worksheet.cell(row=cores.excel_row, column=5, value=result["des_ip"])
-                        self.worksheet.cell(row=cores.excel_row, column=6, value=result["server"])
-                        self.worksheet.cell(row=cores.excel_row, column=7, value=result["title"])
-                        self.worksheet.cell(row=cores.excel_row, column=8, value=result["cdn"])
-
-                    # 释放线程锁，允许其他线程进行写入操作
-                    self.lock.release()
-
-    class SomeClass:
-        """
-        一个示例类，用于演示如何添加注释。
+                write_probe_result(self.writer, domains, result)
+
+    def __get_request_result__(self, url):
         """
+        发送GET请求并获取结果。
+
+        此函数通过requests库发送GET请求，并解析响应头和内容，提取相关信息，如服务器类型、Cookie、CDN信息、目标IP和源IP以及页面标题。
 
-        def __get_request_result__(self, url):
-            """
-            发送GET请求并获取结果。
-
-            此函数通过requests库发送GET请求，并解析响应头和内容，提取相关信息，如服务器类型、Cookie、CDN信息、目标IP和源IP以及页面标题。
-
-            参数:
-            url (str): 目标URL地址。
-
-            返回:
-            dict: 包含请求状态、服务器信息、CDN信息、目标IP、源IP和页面标题的字典。
-            如果URL无效或请求失败，则返回"error"或"timeout"。
-            """
-            # 初始化结果字典，用于存储请求结果和解析出的信息
-            result = {"status": "", "server": "", "cookie": "",
-                      "cdn": "", "des_ip": "", "sou_ip": "", "title": ""}
-            # 初始化CDN信息字符串
-            cdn = ""
-            try:
-                # 发送GET请求，设置超时时间和流式响应
-                with requests.get(url, timeout=5, stream=True) as rsp:
-                    # 获取并记录HTTP状态码
-                    status_code = rsp.status_code
-                    result["status"] = status_code
-                    # 获取响应头
-                    headers = rsp.headers
-                    # 检查并记录服务器类型
-                    if "Server" in headers:
-                        result["server"] = headers['Server']
-                    # 检查并记录Cookie信息
-                    if "Cookie" in headers:
-                        result["cookie"] = headers['Cookie']
-                    # 检查并累加CDN信息
-                    if "X-Via" in headers:
-                        cdn = cdn + headers['X-Via']
-                    if "Via" in headers:
-                        cdn = cdn + headers['Via']
-                    result["cdn"] = cdn
-                    # 获取底层socket对象
-                    sock = rsp.raw._connection.sock
-                    # 如果socket对象存在，获取目标IP和源IP信息
-                    if sock:
-                        des_ip = sock.getpeername()[0]
-                        sou_ip = sock.getsockname()[0]
-                        if des_ip:
-                            result["des_ip"] = des_ip
-                        if sou_ip:
-                            result["sou_ip"] = sou_ip
-                        # 关闭socket连接
-                        sock.close()
-                    # 获取页面内容
-                    html = rsp.text
-                    # 使用正则表达式提取页面标题
-                    title = re.findall('<title>(.+)</title>', html)
-                    if title:
-                        result["title"] = title[0]
-                    # 关闭响应
-                    rsp.close()
-                    # 返回结果字典
-                    return result
-            # 异常处理：无效URL
-            except requests.exceptions.InvalidURL as e:
-                return "error"
-            # 异常处理：连接错误或读取超时
-            except requests.exceptions.ConnectionError as e1:
-                return "timeout"
-            except requests.exceptions.ReadTimeout as e2:
-                return "timeout"
+        参数:
+        url (str): 目标URL地址。
+
+        返回:
+        dict: 包含请求状态、服务器信息、CDN信息、目标IP、源IP和页面标题的字典。
+        如果URL无效或请求失败，则返回"error"或"timeout"。
+        """
+        # 初始化结果字典，用于存储请求结果和解析出的信息
+        result = {"status": "", "server": "", "cookie": "",
+                  "cdn": "", "des_ip": "", "sou_ip": "", "title": ""}
+        # 初始化CDN信息字符串
+        cdn = ""
+        try:
+            # 通过共享的会话层发送GET请求，设置超时时间和流式响应
+            with self.session.get(url, timeout=5, stream=True) as rsp:
+                # 获取并记录HTTP状态码
+                status_code = rsp.status_code
+                result["status"] = status_code
+                # 获取响应头
+                headers = rsp.headers
+                # 检查并记录服务器类型
+                if "Server" in headers:
+                    result["server"] = headers['Server']
+                # 检查并记录Cookie信息
+                if "Cookie" in headers:
+                    result["cookie"] = headers['Cookie']
+                # 检查并累加CDN信息
+                if "X-Via" in headers:
+                    cdn = cdn + headers['X-Via']
+                if "Via" in headers:
+                    cdn = cdn + headers['Via']
+                result["cdn"] = cdn
+                # 目标IP和源IP在建立连接时记录，复用的连接同样可以获取
+                if rsp.des_ip:
+                    result["des_ip"] = rsp.des_ip
+                if rsp.sou_ip:
+                    result["sou_ip"] = rsp.sou_ip
+                # 获取页面内容
+                html = rsp.text
+                # 使用正则表达式提取页面标题
+                title = re.findall('<title>(.+)</title>', html)
+                if title:
+                    result["title"] = title[0]
+                # 关闭响应，读取完毕的连接放回连接池中复用
+                rsp.close()
+                # 返回结果字典
+                return result
+        # 异常处理：无效URL
+        except requests.exceptions.InvalidURL as e:
+            return "error"
+        # 异常处理：连接错误或读取超时
+        except requests.exceptions.ConnectionError as e1:
+            return "timeout"
+        except requests.exceptions.ReadTimeout as e2:
+            return "timeout"
 
     def run(self):
         threadLock = threading.Lock()
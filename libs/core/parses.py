@@ -5,121 +5,405 @@
 
 import re
 import os
+import time
+import bisect
 import config
 import threading
 import libs.core as cores
+import libs.core.apk as apk
+import libs.core.macho as macho
+from libs.core.rules import RuleEngine
+from libs.core.secret import SecretEngine
+from libs.core.metrics import metrics
+
+# 文件中的字符串
+string_pattern = re.compile(r'\"(.*?)\"')
+quote_or_newline_pattern = re.compile(r'["\n]')
+
+# 多进程模式下需要同步到子进程的全局配置
+process_state_names = ["all_flag", "resource_flag", "output_path", "profile_flag"]
+
+
+def init_process(state):
+    """
+    多进程扫描时子进程的初始化入口，用于同步Bootstrapper生成的全局配置。
+
+    参数:
+    - state: 由process_state_names对应的全局配置组成的字典。
+    """
+    for name, value in state.items():
+        setattr(cores, name, value)
+    # fork方式启动的子进程会继承主进程已有的统计，需要清空后重新统计
+    metrics.reset()
+
+
+def parse_files(file_paths, types, rule_engine, scan_cache=None, secret_engine=None, package_filter=None):
+    """
+    多进程扫描时子进程的任务入口，扫描一批文件并返回每个文件的结果集。
+
+    参数:
+    - file_paths: 需要扫描的文件路径列表。
+    - types: 任务类型。
+    - rule_engine: 规则引擎。
+    - scan_cache: 扫描结果缓存，为None时不使用缓存。
+    - secret_engine: AK/SK检测引擎。
+    - package_filter: DEX字符串表的包名过滤，见dex.in_packages。
+
+    返回:
+    tuple: (以文件路径为键、结果集为值的字典, 以文件路径为键、命中记录列表为值的字典, 本批次的性能统计,
+    超出扫描时间预算的文件列表, 需要由主进程写入的缓存更新)，前两项不包含无结果的文件，未开启性能统计时
+    第三项为None，未使用缓存时最后一项为None。
+    """
+    result_dict = {}
+    finding_dict = {}
+    parses = ParsesThreads(0, "Process - " + str(os.getpid()),
+                           None, result_dict, types, rule_engine, scan_cache, finding_dict.__setitem__,
+                           secret_engine, package_filter=package_filter)
+    for file_path in file_paths:
+        parses.__safe_parse__(file_path)
+    apk.close()
+    cache_updates = None
+    if scan_cache:
+        cache_updates = scan_cache.drain()
+        scan_cache.close(evict=False)
+
+    snapshot = None
+    if cores.profile_flag:
+        snapshot = metrics.snapshot()
+        metrics.reset()
+    return result_dict, finding_dict, snapshot, parses.over_budget_list, cache_updates
+
 
 class ParsesThreads(threading.Thread):
 
-    def __init__(self, threadID, name, file_queue, result_dict, types):
+    def __init__(self, threadID, name, file_queue, result_dict, types, rule_engine=None, scan_cache=None,
+                 finding_handler=None, secret_engine=None, resume_store=None, package_filter=None):
         threading.Thread.__init__(self)
         self.file_queue = file_queue
         self.name = name
         self.threadID = threadID
         self.result_list = []
+        # 由(规则名称, 命中内容, 偏移)组成的命中记录，每个文件扫描完成后交给finding_handler
+        self.finding_list = []
+        self.finding_handler = finding_handler
         self.result_dict = result_dict
         self.types = types
+        # 规则引擎由任务统一构建，未传入时根据当前配置构建
+        if rule_engine is None:
+            rule_engine = RuleEngine(config.filter_strs, config.filter_no)
+        self.rule_engine = rule_engine
+        if secret_engine is None:
+            secret_engine = SecretEngine(config.filter_ak_map)
+        self.secret_engine = secret_engine
+        self.scan_cache = scan_cache
+        # 扫描断点，已经扫描完成的文件直接使用保存的结果
+        self.resume_store = resume_store
+        # -p/-e指定的包名过滤，apktool模式下由目录遍历完成，直接扫描DEX字符串表时按照字符串所属的类过滤
+        self.package_filter = package_filter
+        # 超出config.scan_file_budget的文件，扫描结束后由任务统一列出
+        self.over_budget_list = []
+        self.over_budget = False
+        self.threadLock = threading.Lock()
 
     def __regular_parse__(self):
         while True:
-            if self.file_queue.empty():
+            file_path = self.file_queue.get()
+            # 文件遍历完成后放入的结束标记
+            if file_path is None:
                 break
 
-            file_path = self.file_queue.get(timeout=5)
-            scan_str = ("[+] Scan file : %s" % file_path)
+            if isinstance(file_path, tuple):
+                self.__parse_app_file__(*file_path)
+            else:
+                self.__safe_parse__(file_path)
+
+    def __safe_parse__(self, file_path):
+        # 单个文件扫描失败(文件被删除、内容损坏等)时只跳过该文件，扫描线程继续消费队列
+        try:
+            self.__parse_file__(file_path)
+        except Exception as e:
+            print("[-] Failed to scan %s: %s" % (file_path, e))
+            metrics.count("files_failed")
+
+    def __parse_app_file__(self, file_path, app):
+        """
+        批量扫描时多个应用共用同一组扫描线程，队列中的元素为(文件路径, 所属的应用)。
+
+        应用需要提供types、result_dict、finding_handler、scan_cache、resume_store、over_budget_list、package_filter，
+        扫描线程按照所属的应用切换这些属性后扫描文件，扫描完成后调用应用的done通知该文件已完成。
+        """
+        self.types = app.types
+        self.result_dict = app.result_dict
+        self.finding_handler = app.finding_handler
+        self.scan_cache = app.scan_cache
+        self.resume_store = app.resume_store
+        self.over_budget_list = app.over_budget_list
+        self.package_filter = app.package_filter
+        try:
+            self.__safe_parse__(file_path)
+        finally:
+            app.done(1)
+
+    def __parse_file__(self, file_path):
+        # 每个文件单独统计结果，避免上一个文件的结果被计入当前文件
+        self.result_list = []
+        self.finding_list = []
+        self.over_budget = False
+        start_time = time.perf_counter() if cores.profile_flag else None
+
+        # 断点续扫时上次已经扫描完成的文件直接使用保存的结果
+        resumed = None
+        if self.resume_store:
+            resumed = self.resume_store.get(file_path)
+            if resumed is not None:
+                metrics.count("files_resumed")
+
+        # 内容未变化的文件直接使用缓存的结果，跳过正则匹配
+        cache_key = None
+        cached = resumed
+        if self.scan_cache and resumed is None:
+            cache_key = self.scan_cache.key(file_path)
+            cached = self.scan_cache.get(cache_key)
+            metrics.count("scan_cache_miss" if cached is None else "scan_cache_hit")
+
+        if cached is not None:
+            self.result_list, self.finding_list = cached
+        else:
             if self.types == "iOS":
                 self.__get_string_by_iOS__(file_path)
+            elif self.types == "Android" and apk.is_string_table(file_path):
+                self.__get_string_by_table__(file_path)
             else:
                 self.__get_string_by_file__(file_path)
+            # 超出时间预算的文件结果不完整，不写入缓存
+            if cache_key and not self.over_budget:
+                self.scan_cache.put(cache_key, self.result_list, self.finding_list)
+
+        if self.resume_store and resumed is None:
+            self.resume_store.put(file_path, self.result_list, self.finding_list)
+
+        if self.over_budget:
+            self.over_budget_list.append(file_path)
+            print("[-] Scanning %s took longer than %ss, the remaining AK or SK detection was skipped." %
+                  (file_path, config.scan_file_budget))
+            metrics.count("files_over_budget")
+
+        result_set = set(self.result_list)
+        if len(result_set) != 0:
+            self.result_dict[file_path] = result_set
+
+        if self.finding_handler and len(self.finding_list) != 0:
+            self.finding_handler(file_path, self.finding_list)
 
-            result_set = set(self.result_list)
-            if len(result_set) != 0:
-                self.result_dict[file_path] = result_set
+        if start_time is not None:
+            metrics.record_file(file_path, time.perf_counter() - start_time)
 
     def __get_string_by_iOS__(self, file_path):
-        output_path = cores.output_path
-        strings_path = cores.strings_path
-        temp = os.path.join(output_path, "temp.txt")
-        cmd_str = ('"%s" "%s" > "%s"') % (
-            str(strings_path), str(file_path), str(temp))
-        if os.system(cmd_str) == 0:
-            with open(temp, "r", encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-                for line in lines:
-                    self.__parse_string__(line)
+        # 在进程内直接从Mach-O文件中提取字符串，无需调用strings命令及写入临时文件
+        for offset, line in macho.iter_string_offsets(file_path):
+            self.__parse_string__(line, offset)
 
     def __get_string_by_file__(self, file_path):
-        with open(file_path, "r", encoding="utf8", errors='ignore') as f:
-            file_content = f.read()
-            # 获取到所有的字符串
-            pattern = re.compile(r'\"(.*?)\"')
-            results = pattern.findall(file_content)
-
-            # 搜素AK和SK信息,由于iOS的逻辑处理效率过慢暂时忽略对iOS的AK检测
-            if not (".js" == file_path[-3:] and self.types == "iOS"):
-                # 未包含相关字段不进行ak或者sk信息采集
-                if "access" in file_content or "secret" in file_content:
-                    for key, values in config.filter_ak_map.items():
-                        if isinstance(values, list):
-                            for value in values:
-                                self.__ak_and_sk__(key, value, file_content)
-                        else:
-                            self.__ak_and_sk__(key, values, file_content)
-
-            # 遍历所有的字符串
-            for result in set(results):
-                if ("http://" == result) or ("https://" == result) or result.startswith("https://.") or result.startswith("http://.") :
-                    continue
-                self.__parse_string__(result)
-
-    def __ak_and_sk__(self, name, ak_rule, content):
-        akAndSkList = re.compile(ak_rule).findall(content)
-        for akAndSk in akAndSkList:
-            ak = ("[%s]-->:%s") % (name, akAndSk.strip())
-            self.result_list.append(ak)
-            print(("[+] [%s] AK or SK in %s:") % (name, akAndSk.strip()))
-
-    def __parse_string__(self, result):
-        # 通过正则筛选需要过滤的字符串
-        for filter_str in config.filter_strs:
-            filter_str_pat = re.compile(filter_str)
-            filter_resl = filter_str_pat.findall(result)
-            # 过滤掉未搜索到的内容
-            if len(filter_resl) != 0:
-                # 提取第一个结果
-                resl_str = filter_resl[0]
-                # 过滤
-                if self.__filter__(resl_str) == 0:
-                    continue
+        # 搜素AK和SK信息,由于iOS的逻辑处理效率过慢暂时忽略对iOS的AK检测
+        ak_flag = not (".js" == file_path[-3:] and self.types == "iOS")
+        deadline = self.__deadline__()
+        # 已经命中的字符串，跨分块去重，只保存命中的内容而不是文件中的全部字符串
+        seen = set()
 
-                self.threadLock.acquire()
-                if cores.all_flag:
-                    print(
-                        ("[+] The string searched for matching rule is: %s") % (resl_str))
-                self.result_list.append(resl_str)
-                self.threadLock.release()
-            continue
-
-    def __filter__(self, resl_str):
-        return_flag = 1
-        resl_str = resl_str.replace("\r", "").replace(
-            "\n", "").replace(" ", "")
-
-        if len(resl_str) == 0:
-            return 0
-
-        for filte in set(config.filter_no):
-            resl_str = resl_str.replace(filte, "")
-            if len(resl_str) == 0:
-                return_flag = 0
-                continue
+        base = 0
+        for file_content, start, end in self.__read_segments__(file_path):
+            # 当前分块中的字符串 -> 首次出现的偏移
+            results = {}
+            for match in string_pattern.finditer(file_content, start, end):
+                results.setdefault(match.group(1), base + match.start(1))
+
+            # 只执行字面量出现在内容中的AK规则
+            if ak_flag:
+                for name, value, offset in self.__scan_secrets__(file_content, deadline):
+                    self.__ak_and_sk__(name, value, base + offset)
+            base = base + len(file_content)
+
+            self.__parse_results__(results, ak_flag, seen=seen)
+
+    def __get_string_by_table__(self, file_path):
+        """
+        扫描DEX或者resources.arsc的字符串表，无需反编译。
 
-            if re.match(filte, resl_str):
-                return_flag = 0
+        字符串表中的每一项都是独立的常量，直接交给规则引擎；AK规则需要上下文，
+        因此将字符串按照smali中const-string的形式加上引号逐行拼接为文本块后再检测，
+        命中位置换算为对应字符串在文件中的偏移(字符串内部按字符计算)。
+        DEX中能够确定所属类的字符串，命中记录中同时记录该类。
+        """
+        results = {}
+        # 字符串 -> 使用该字符串的类
+        origins = {}
+        seen = set()
+        deadline = self.__deadline__()
+        # 文本块中的每一行、行首在文本块中的位置、对应字符串在文件中的偏移以及所属的类
+        lines = []
+        starts = []
+        offsets = []
+        classes = []
+        size = 0
+        for offset, string, origin in apk.iter_string_table(file_path, self.package_filter):
+            results.setdefault(string, offset)
+            if origin:
+                origins.setdefault(string, origin)
+            line = '"%s"' % string
+            lines.append(line)
+            starts.append(size)
+            offsets.append(offset)
+            classes.append(origin)
+            size = size + len(line) + 1
+            if size >= config.scan_chunk_size:
+                self.__scan_table_block__(lines, starts, offsets, classes, deadline)
+                self.__parse_results__(results, True, origins, seen)
+                lines, starts, offsets, classes, size = [], [], [], [], 0
+                results, origins = {}, {}
+        if lines:
+            self.__scan_table_block__(lines, starts, offsets, classes, deadline)
+        self.__parse_results__(results, True, origins, seen)
+
+    def __scan_table_block__(self, lines, starts, offsets, classes, deadline):
+        for name, value, position in self.__scan_secrets__("\n".join(lines), deadline):
+            index = bisect.bisect_right(starts, position) - 1
+            # 不计入行首的引号
+            self.__ak_and_sk__(name, value, offsets[index] + max(position - starts[index] - 1, 0),
+                               origin=classes[index])
+
+    def __deadline__(self):
+        # 超过单个文件的时间预算后跳过剩余的AK检测，字符串规则的耗时与文件大小成正比，继续执行
+        if config.scan_file_budget:
+            return time.perf_counter() + config.scan_file_budget
+        return None
+
+    def __scan_secrets__(self, content, deadline):
+        if self.over_budget:
+            return []
+        secrets = self.secret_engine.scan(content, deadline)
+        if deadline is not None and time.perf_counter() > deadline:
+            self.over_budget = True
+        return secrets
+
+    def __parse_results__(self, results, ak_flag, origins=None, seen=None):
+        """
+        对字符串执行规则匹配与高熵检测。
+
+        参数:
+        - results: 字符串 -> 首次出现的偏移。
+        - ak_flag: 是否进行高熵检测。
+        - origins: 字符串 -> 使用该字符串的类。
+        - seen: 分块扫描时之前的分块中已经命中的字符串，命中的字符串会加入其中，只记录首次出现的位置。
+        """
+        origins = origins or {}
+        if seen is None:
+            seen = set()
+        # 遍历所有的字符串
+        for result, offset in results.items():
+            if result in seen:
+                continue
+            if ("http://" == result) or ("https://" == result) or result.startswith("https://.") or result.startswith("http://.") :
                 continue
+            count = len(self.result_list)
+            self.__parse_string__(result, offset, origins.get(result))
+            if len(self.result_list) != count:
+                seen.add(result)
 
-        return return_flag
+        # 高熵字符串检测，与规则命中分开去重
+        if ak_flag and self.secret_engine.entropy:
+            for result, offset in results.items():
+                if ("High_Entropy", result) in seen:
+                    continue
+                if self.secret_engine.high_entropy(result):
+                    seen.add(("High_Entropy", result))
+                    self.__ak_and_sk__("High_Entropy", result, offset, "entropy", origins.get(result))
+
+    def __read_segments__(self, file_path):
+        """
+        按固定大小分块读取文件，避免超大文件一次性读入内存。
+
+        字符串规则与AK规则均无法跨行匹配，因此每块在最后一个换行处切分，剩余部分并入下一块，
+        结果与整体读取一致。超长的单行(如压缩后的JS)则在最后一个完整的引号字符串之后切分，
+        并入下一块的内容不超过config.scan_chunk_overlap；切分处位于未闭合的字符串内时，从该字符串的
+        起始引号处切分，保证后续分块中引号的配对与整体读取一致。
+        单个字符串超过一个分块时，该字符串只参与AK检测，字符串匹配从其闭合引号之后继续，
+        峰值内存约为分块大小的两倍。
+
+        参数:
+        - file_path: 需要读取的文件路径。
+
+        返回:
+        generator: 依次返回(文本内容, 字符串匹配的起始位置, 字符串匹配的结束位置)。
+        """
+        chunk_size = config.scan_chunk_size
+        overlap = config.scan_chunk_overlap
+        carry = ""
+        # 上一块以超长的未闭合字符串结束，需要先跳过该字符串的剩余部分
+        skip = False
+        with apk.open_text(file_path) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    if carry:
+                        yield carry, 0, len(carry)
+                    break
+
+                buffer = carry + chunk
+                start = 0
+                if skip:
+                    # 字符串在闭合引号处结束，没有闭合引号时在行尾结束
+                    match = quote_or_newline_pattern.search(buffer)
+                    if match is None:
+                        start = len(buffer)
+                    else:
+                        start = match.end()
+                        skip = False
+
+                cut = buffer.rfind("\n", start) + 1 or start
+                stop = None
+                if len(buffer) - cut > overlap:
+                    # 超长单行，在最后一个完整的引号字符串之后切分
+                    for match in string_pattern.finditer(buffer, cut):
+                        cut = match.end()
+                    quote = buffer.find('"', cut)
+                    if quote < 0:
+                        cut = max(cut, len(buffer) - overlap)
+                    elif len(buffer) - quote <= chunk_size:
+                        # 未闭合的字符串整体并入下一块
+                        cut = min(quote, max(cut, len(buffer) - overlap))
+                    else:
+                        stop = quote
+                        cut = len(buffer)
+                        skip = True
+
+                if cut > 0:
+                    yield buffer[:cut], start, cut if stop is None else stop
+                carry = buffer[cut:]
+
+    def __ak_and_sk__(self, name, akAndSk, offset=0, rule_name=None, origin=None):
+        ak = ("[%s]-->:%s") % (name, akAndSk)
+        self.result_list.append(ak)
+        self.__add_finding__(rule_name or "filter_ak_map[%s]" % name, akAndSk, offset, origin)
+        print(("[+] [%s] AK or SK in %s:") % (name, akAndSk))
+
+    def __add_finding__(self, rule_name, value, offset, origin=None):
+        # 能够确定字符串所属的类时，命中记录的第四项为该类的类型描述符
+        if origin:
+            self.finding_list.append((rule_name, value, offset, origin))
+        else:
+            self.finding_list.append((rule_name, value, offset))
+
+    def __parse_string__(self, result, offset=0, origin=None):
+        # 通过预编译的规则引擎筛选需要过滤的字符串
+        for rule_name, resl_str in self.rule_engine.match(result):
+            self.threadLock.acquire()
+            if cores.all_flag:
+                print(
+                    ("[+] The string searched for matching rule [%s] is: %s") % (rule_name, resl_str))
+            self.result_list.append(resl_str)
+            self.__add_finding__(rule_name, resl_str, offset, origin)
+            self.threadLock.release()
 
     def run(self):
-        self.threadLock = threading.Lock()
         self.__regular_parse__()
+        apk.close()
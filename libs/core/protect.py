@@ -0,0 +1,156 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+"""
+APK加固特征的检测。
+
+加固特征保存在tools/protect.json中，格式为{"加固名称": ["特征", ...]}，config.protect_signatures中配置的
+文件会合并到内置特征中。特征与APK内的文件路径按子串匹配，全部特征构建为一个Aho-Corasick自动机，
+每个文件路径只需扫描一遍即可找出其中出现的全部特征；与文件名或完整路径相同的特征标记为精确命中。
+"""
+import os
+import json
+import threading
+import zipfile
+from collections import deque
+
+import config
+import libs.core as cores
+
+# 每个进程只构建一次的特征索引
+__index__ = None
+__index_lock__ = threading.Lock()
+
+
+def load_signatures(paths):
+    """
+    读取并合并加固特征文件，同名加固的特征合并去重，不存在的文件直接跳过。
+
+    返回:
+    dict: 加固名称 -> 特征列表。
+    """
+    signatures = {}
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for name, markers in json.load(f).items():
+                merged = signatures.setdefault(name, [])
+                for marker in markers:
+                    if marker and marker not in merged:
+                        merged.append(marker)
+    return signatures
+
+
+def get_index():
+    """
+    获取当前进程的加固特征索引，首次调用时根据内置特征与config.protect_signatures构建。
+    """
+    global __index__
+    with __index_lock__:
+        if __index__ is None:
+            __index__ = ProtectIndex(load_signatures([cores.protect_path] + list(config.protect_signatures)))
+        return __index__
+
+
+class ProtectIndex(object):
+    """
+    加固特征索引。
+
+    参数:
+    - signatures: 加固名称 -> 特征列表。
+    """
+
+    def __init__(self, signatures):
+        # 特征 -> 使用该特征的加固名称列表
+        self.markers = {}
+        for name, markers in signatures.items():
+            for marker in markers:
+                self.markers.setdefault(marker, []).append(name)
+        self.__build__(list(self.markers))
+
+    def __build__(self, markers):
+        # Aho-Corasick自动机: 状态转移、失败指针、每个状态结束的特征
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for marker in markers:
+            state = 0
+            for char in marker:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(marker)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                # 继承失败指针指向的状态上结束的特征
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, entry):
+        """
+        获取文件路径中出现的全部特征。
+
+        返回:
+        set: 文件路径中出现的特征。
+        """
+        found = set()
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for char in entry:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def classify(self, entries):
+        """
+        对APK内的所有文件进行一次遍历，识别其中的加固特征。
+
+        参数:
+        - entries: APK内的文件路径列表。
+
+        返回:
+        list: 由{"name": 加固名称, "entry": APK内的文件路径, "marker": 命中的特征, "exact": 是否与文件名或完整路径相同}
+        组成的列表，按文件顺序排列。
+        """
+        matches = []
+        for entry in entries:
+            found = self.search(entry)
+            if not found:
+                continue
+            basename = entry.rsplit("/", 1)[-1]
+            for marker in sorted(found):
+                exact = marker == entry or marker == basename
+                for name in self.markers[marker]:
+                    matches.append({"name": name, "entry": entry, "marker": marker, "exact": exact})
+        return matches
+
+
+def detect(file_path):
+    """
+    识别APK使用的加固。
+
+    返回:
+    list: 与ProtectIndex.classify相同的命中列表。
+    """
+    with zipfile.ZipFile(file_path) as zip_file:
+        entries = zip_file.namelist()
+    return get_index().classify(entries)
@@ -0,0 +1,84 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import time
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+
+class DnsCache(object):
+    """
+    网络嗅探使用的域名解析缓存。
+
+    嗅探开始前通过resolve_all并发解析所有域名，解析结果在内存中保留config.dns_cache_ttl秒，
+    解析失败的结果保留config.dns_negative_ttl秒，重定向到的新域名在请求时按需解析并写入缓存。
+    系统解析器不返回记录的TTL，因此使用配置的TTL作为缓存的过期时间。
+    """
+
+    def __init__(self, ttl=None, negative_ttl=None, concurrency=None):
+        self.ttl = ttl or config.dns_cache_ttl
+        self.negative_ttl = negative_ttl or config.dns_negative_ttl
+        self.concurrency = concurrency or config.dns_concurrency
+        # 域名 -> (IP列表, 过期时间)
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def get(self, host):
+        """
+        获取缓存的解析结果。
+
+        返回:
+        list: IP列表，解析失败时为空列表；未缓存或已过期时返回None。
+        """
+        with self.lock:
+            entry = self.cache.get(host)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self.cache[host]
+                return None
+            return entry[0]
+
+    def resolve(self, host):
+        """
+        解析单个域名，优先使用缓存。
+
+        返回:
+        list: 按系统解析器返回顺序排列的IP列表，无法解析时为空列表。
+        """
+        ips = self.get(host)
+        if ips is not None:
+            return ips
+
+        ips = []
+        try:
+            for _, _, _, _, sockaddr in socket.getaddrinfo(host, None, type=socket.SOCK_STREAM):
+                if sockaddr[0] not in ips:
+                    ips.append(sockaddr[0])
+        except (OSError, UnicodeError):
+            pass
+
+        ttl = self.ttl if ips else self.negative_ttl
+        with self.lock:
+            self.cache[host] = (ips, time.monotonic() + ttl)
+        return ips
+
+    def resolve_all(self, hosts):
+        """
+        并发解析所有域名。
+
+        参数:
+        - hosts: 需要解析的域名集合。
+
+        返回:
+        dict: 域名 -> IP列表。
+        """
+        hosts = list(hosts)
+        if len(hosts) == 0:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(hosts))) as executor:
+            return dict(zip(hosts, executor.map(self.resolve, hosts)))
@@ -0,0 +1,122 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import json
+import time
+import sqlite3
+import threading
+
+import config
+
+
+class ResumeStore(object):
+    """
+    扫描断点，保存在输出目录(out)下的SQLite数据库中。
+
+    仅在使用--resume时创建。扫描过程中记录每个已完成文件的结果与命中记录、每个已嗅探URL的结果，每隔
+    config.resume_checkpoint_interval秒提交一次。扫描被中断(OOM、SIGTERM等)后再次使用--resume运行时，
+    输出目录不会被清理，已完成的文件直接使用保存的结果，已嗅探的URL不再请求。数据库中只保存一个任务的断点，任务的输入、类型或规则发生变化时自动清空。
+    """
+
+    def __init__(self, db_path, task_key, interval=None):
+        self.db_path = db_path
+        self.task_key = task_key
+        self.interval = config.resume_checkpoint_interval if interval is None else interval
+        self.lock = threading.Lock()
+        self.closed = False
+        self.last_commit = time.time()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS resume_task (task_key TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS resume_file (file_path TEXT PRIMARY KEY, results TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS resume_url (url TEXT PRIMARY KEY, row TEXT)")
+
+        row = self.conn.execute("SELECT task_key FROM resume_task").fetchone()
+        if row is None or row[0] != task_key:
+            self.conn.execute("DELETE FROM resume_task")
+            self.conn.execute("DELETE FROM resume_file")
+            self.conn.execute("DELETE FROM resume_url")
+            self.conn.execute("INSERT INTO resume_task (task_key) VALUES (?)", (task_key,))
+        self.conn.commit()
+
+        # 上次已经完成的文件与URL，启动时一次性读入内存
+        self.files = {}
+        for file_path, content in self.conn.execute("SELECT file_path, results FROM resume_file"):
+            self.files[file_path] = json.loads(content)
+        self.urls = {}
+        for url, row in self.conn.execute("SELECT url, row FROM resume_url"):
+            self.urls[url] = json.loads(row)
+
+    def get(self, file_path):
+        """
+        获取上次已经扫描完成的文件的结果。
+
+        返回:
+        tuple: (结果列表, 命中记录列表)，文件尚未扫描完成时返回None。
+        """
+        content = self.files.get(file_path)
+        if content is None:
+            return None
+        return list(content["results"]), [tuple(finding) for finding in content["findings"]]
+
+    def put(self, file_path, results, findings=()):
+        """
+        记录一个已经扫描完成的文件，没有结果的文件同样需要记录。
+        """
+        content = json.dumps({"results": sorted(set(results)), "findings": sorted(set(findings))},
+                             ensure_ascii=False)
+        with self.lock:
+            if self.closed:
+                return
+            self.conn.execute("INSERT OR REPLACE INTO resume_file (file_path, results) VALUES (?, ?)",
+                              (file_path, content))
+            self.__commit__()
+
+    def put_many(self, files):
+        """
+        记录一批已经扫描完成的文件并立即提交，用于多进程模式下按批次返回的结果。
+
+        参数:
+        - files: 由(文件路径, 结果列表, 命中记录列表)组成的列表。
+        """
+        rows = [(file_path, json.dumps({"results": sorted(set(results)), "findings": sorted(set(findings))},
+                                       ensure_ascii=False)) for file_path, results, findings in files]
+        with self.lock:
+            if self.closed:
+                return
+            self.conn.executemany("INSERT OR REPLACE INTO resume_file (file_path, results) VALUES (?, ?)", rows)
+            self.conn.commit()
+            self.last_commit = time.time()
+
+    def get_url(self, url):
+        """
+        获取上次已经嗅探的URL写入Excel的行内容，尚未嗅探时返回None。
+        """
+        return self.urls.get(url)
+
+    def put_url(self, url, row):
+        with self.lock:
+            if self.closed:
+                return
+            self.conn.execute("INSERT OR REPLACE INTO resume_url (url, row) VALUES (?, ?)",
+                              (url, json.dumps(row, ensure_ascii=False)))
+            self.__commit__()
+
+    def __commit__(self):
+        # 按时间间隔提交，中断时最多丢失一个间隔内的结果
+        if time.time() - self.last_commit >= self.interval:
+            self.conn.commit()
+            self.last_commit = time.time()
+
+    def close(self):
+        # 关闭后仍在返回的结果(如出错退出时进程池的回调)直接忽略
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.conn.commit()
+            self.conn.close()
@@ -0,0 +1,140 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import re
+import json
+import hashlib
+
+import libs.core as cores
+from libs.core.metrics import metrics
+
+# 合并后组号会发生变化或者无法合并的规则: 反向引用、条件分组、命名分组(重名时无法编译)以及内联的全局标志
+standalone_pattern = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]|\(\?P[=<]|\(\?\(|^\(\?[aiLmsux]+\)')
+
+
+class RuleEngine(object):
+    """
+    规则引擎，在一次扫描开始时构建一次，并共享给所有的扫描线程。
+
+    构建时会将config.filter_strs、--rules临时规则以及config.filter_no全部预编译，
+    同时将所有的匹配规则合并为一个整体的正则表达式作为预筛选器。绝大多数字符串不会命中任何规则，
+    只需要进行一次正则匹配即可被丢弃，命中后才会逐条执行对应的规则并返回命中的规则名称。
+    包含反向引用等依赖组号的规则不参与合并，对每个字符串单独执行。
+    """
+
+    def __init__(self, filter_strs, filter_no, rules=""):
+        self.rules = []
+        for index, filter_str in enumerate(filter_strs):
+            self.rules.append(("filter_strs[%d]" % index, filter_str))
+        if rules:
+            self.rules.append(("rules", r'.*' + str(rules) + r'.*'))
+        self.filter_no = list(filter_no)
+
+        self.__compile__()
+
+    def __compile__(self):
+        # 逐条编译的规则，用于提取命中内容以及规则名称
+        self.patterns = [(name, re.compile(rule)) for name, rule in self.rules]
+
+        # 所有可以合并的规则合并后的预筛选器
+        self.combined = self.__combine__([rule for _, rule in self.rules if not is_standalone(rule)])
+        # 无法合并的规则，预筛选器未命中时仍需逐条执行
+        self.standalone_patterns = [(name, pattern) for (name, rule), (_, pattern) in zip(self.rules, self.patterns)
+                                    if is_standalone(rule)]
+
+        # 过滤规则合并为一个整体的正则表达式，与逐条re.match等价
+        self.filter_combined = self.__combine__([rule for rule in self.filter_no if not is_standalone(rule)])
+        self.filter_patterns = [re.compile(rule) for rule in self.filter_no if is_standalone(rule)]
+
+        # 原有逻辑中会将规则文本作为字符串替换，替换后为空的字符串同样需要过滤
+        self.filter_literals = frozenset(self.filter_no)
+
+    def __combine__(self, rules):
+        if len(rules) == 0:
+            return None
+        return re.compile("|".join("(?:%s)" % rule for rule in rules))
+
+    def __getstate__(self):
+        # 只保留规则文本，便于在多进程之间传递
+        return {"rules": self.rules, "filter_no": self.filter_no}
+
+    def __setstate__(self, state):
+        self.rules = state["rules"]
+        self.filter_no = state["filter_no"]
+        self.__compile__()
+
+    def fingerprint(self):
+        """
+        获取规则集的哈希值，规则发生变化时哈希值随之变化。
+        """
+        content = json.dumps([self.rules, sorted(self.filter_no)], ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def match(self, string):
+        """
+        对单个字符串执行所有规则。
+
+        参数:
+        - string: 需要检测的字符串。
+
+        返回:
+        list: 由(规则名称, 命中内容)组成的列表，已经过config.filter_no过滤。
+        """
+        profile_flag = cores.profile_flag
+        if profile_flag:
+            metrics.count("regex:prefilter")
+        if self.combined is not None and self.combined.search(string):
+            patterns = self.patterns
+        else:
+            patterns = self.standalone_patterns
+            if len(patterns) == 0:
+                return []
+
+        results = []
+        for name, pattern in patterns:
+            if profile_flag:
+                metrics.count("regex:" + name)
+            filter_resl = pattern.findall(string)
+            # 过滤掉未搜索到的内容
+            if len(filter_resl) == 0:
+                continue
+            # 提取第一个结果
+            resl_str = filter_resl[0]
+            if self.is_filtered(resl_str):
+                continue
+            results.append((name, resl_str))
+        return results
+
+    def is_filtered(self, resl_str):
+        """
+        判断命中内容是否需要被过滤。
+
+        返回:
+        bool: 需要过滤返回True，否则返回False。
+        """
+        resl_str = resl_str.replace("\r", "").replace(
+            "\n", "").replace(" ", "")
+
+        if len(resl_str) == 0:
+            return True
+
+        if resl_str in self.filter_literals:
+            return True
+
+        if self.filter_combined is not None and self.filter_combined.match(resl_str):
+            return True
+
+        for pattern in self.filter_patterns:
+            if pattern.match(resl_str):
+                return True
+
+        return False
+
+
+def is_standalone(rule):
+    """
+    判断规则是否需要单独执行。合并为一个整体的正则表达式后组号会被重新编号，
+    规则中的\\1、(?P=name)等反向引用将指向错误的分组，重名的命名分组与内联的全局标志则会导致编译失败。
+    """
+    return standalone_pattern.search(rule) is not None
@@ -0,0 +1,244 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import re
+import json
+import math
+import time
+import hashlib
+from collections import Counter
+
+import config
+import libs.core as cores
+from libs.core.metrics import metrics
+
+# 高熵检测的候选字符串，分别为十六进制与Base64(含URL安全的Base64)字符集
+hex_pattern = re.compile(r'[0-9a-fA-F]+')
+base64_pattern = re.compile(r'[A-Za-z0-9+/=_\-]+')
+
+
+def shannon_entropy(value):
+    """
+    计算字符串的香农熵(每个字符的比特数)。
+    """
+    length = len(value)
+    if length == 0:
+        return 0.0
+    return -sum(count / length * math.log2(count / length) for count in Counter(value).values())
+
+
+class SecretEngine(object):
+    """
+    AK/SK检测引擎，与RuleEngine一样在一次扫描开始时构建一次，并共享给所有的扫描线程。
+
+    config.filter_ak_map中的每条规则可以声明anchors，即规则命中时必定出现的字面量。
+    所有字面量按首字符分组，每组合并为一个以该字符开头的正则表达式，re模块会先快速定位首字符再比较整组字面量；
+    扫描一段内容时先用这些分组完成预筛选，只有字面量出现的规则才会执行，未声明anchors的规则总是执行。
+    忽略大小写的字面量在转为小写的内容上查找。所有规则在构建时预编译。
+
+    声明了anchors的规则不在整段内容上执行，只在每个字面量所在的行内执行，超长的行只取字面量前后各
+    config.secret_window个字符，避免.*在压缩后的JS等超长行上回溯整行内容。
+
+    开启entropy时，还会对文件中的字符串计算香农熵，十六进制或Base64字符集且熵超过阈值的字符串作为疑似密钥输出。
+    """
+
+    def __init__(self, ak_map, entropy=False):
+        # 由(名称, 正则表达式, 字面量列表, 字面量是否忽略大小写)组成的规则列表
+        self.rules = []
+        for name, values in ak_map.items():
+            if not isinstance(values, list):
+                values = [values]
+            for value in values:
+                if isinstance(value, dict):
+                    self.rules.append((name, value["rule"], list(value.get("anchors") or []),
+                                       bool(value.get("ignore_case"))))
+                else:
+                    self.rules.append((name, value, [], False))
+        self.entropy = entropy
+
+        self.__compile__()
+
+    def __compile__(self):
+        # 预编译的规则，与self.rules一一对应
+        self.patterns = [(name, re.compile(rule)) for name, rule, _, _ in self.rules]
+        # 未声明字面量、总是执行的规则下标
+        self.always = [index for index, rule in enumerate(self.rules) if len(rule[2]) == 0]
+
+        # (字面量, 是否忽略大小写) -> 触发的规则下标，忽略大小写的字面量统一转为小写
+        self.anchor_rules = {}
+        # 规则下标 -> 该规则的字面量
+        self.rule_anchors = {}
+        for index, (_, _, anchors, ignore_case) in enumerate(self.rules):
+            for anchor in anchors:
+                key = (anchor.lower() if ignore_case else anchor, ignore_case)
+                self.anchor_rules.setdefault(key, []).append(index)
+                self.rule_anchors.setdefault(index, []).append(key)
+
+        # 按首字符分组的预筛选器: [(合并后的正则表达式, 组内的字面量列表)]
+        self.anchor_groups = self.__group__([key for key in self.anchor_rules if not key[1]])
+        self.lower_anchor_groups = self.__group__([key for key in self.anchor_rules if key[1]])
+
+    def __group__(self, keys):
+        groups = {}
+        for key in sorted(keys):
+            groups.setdefault(key[0][0], []).append(key)
+        # 较长的字面量优先，避免被同组内作为其前缀的字面量遮挡
+        return [(re.compile("|".join(re.escape(anchor) for anchor, _ in sorted(group, key=lambda key: -len(key[0])))),
+                 group) for group in groups.values()]
+
+    def __getstate__(self):
+        # 只保留规则文本，便于在多进程之间传递
+        return {"rules": self.rules, "entropy": self.entropy}
+
+    def __setstate__(self, state):
+        self.rules = state["rules"]
+        self.entropy = state["entropy"]
+        self.__compile__()
+
+    def fingerprint(self):
+        """
+        获取规则集的哈希值，规则、扫描窗口或高熵检测的配置发生变化时哈希值随之变化。
+        """
+        entropy = None
+        if self.entropy:
+            entropy = [config.secret_entropy_min_length, config.secret_entropy_max_length,
+                       config.secret_entropy_hex_threshold, config.secret_entropy_base64_threshold,
+                       config.secret_entropy_base64_ratio]
+        content = json.dumps([self.rules, config.secret_window, entropy], ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def anchors(self, content, lower_content=None):
+        """
+        获取内容中出现的字面量。
+
+        返回:
+        set: 由(字面量, 是否忽略大小写)组成的集合。
+        """
+        found = set()
+        self.__search__(self.anchor_groups, content, found)
+        if self.lower_anchor_groups:
+            self.__search__(self.lower_anchor_groups, lower_content or content.lower(), found)
+        return found
+
+    def __search__(self, groups, content, found):
+        for pattern, group in groups:
+            if pattern.search(content) is None:
+                continue
+            # 分组命中后再逐个确认组内出现的字面量，只在少数内容上发生
+            if len(group) == 1:
+                found.update(group)
+            else:
+                found.update(key for key in group if key[0] in content)
+
+    def scan(self, content, deadline=None):
+        """
+        对一段内容执行所有字面量出现的规则。
+
+        参数:
+        - content: 需要检测的文本内容。
+        - deadline: time.perf_counter()的截止时间，超过后不再执行剩余的规则，为None时不限制。
+
+        返回:
+        list: 由(规则名称, 命中内容, 在内容中的偏移)组成的列表。
+        """
+        profile_flag = cores.profile_flag
+        if profile_flag:
+            metrics.count("regex:anchors")
+        lower_content = content.lower() if self.lower_anchor_groups else None
+        found = self.anchors(content, lower_content)
+
+        indexes = set(self.always)
+        for key in found:
+            indexes.update(self.anchor_rules[key])
+
+        # 字面量 -> 在内容中出现的所有位置，多条规则共用同一个字面量时只查找一次
+        positions = {}
+        results = []
+        # 按规则的配置顺序执行，输出顺序与配置一致
+        for index in sorted(indexes):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            name, pattern = self.patterns[index]
+            if profile_flag:
+                metrics.count("regex:filter_ak_map[%s]" % name)
+
+            if index in self.rule_anchors:
+                keys = [key for key in self.rule_anchors[index] if key in found]
+                windows = self.__windows__(content, lower_content, keys, positions)
+            else:
+                windows = [(0, len(content))]
+
+            for start, end in windows:
+                for match in pattern.finditer(content, start, end):
+                    # 与findall一致，包含一个分组时取分组的内容
+                    value = match.group(1 if pattern.groups == 1 else 0)
+                    results.append((name, value.strip(), match.start()))
+        return results
+
+    def __windows__(self, content, lower_content, keys, positions):
+        """
+        计算规则需要执行的区间: 每个字面量所在的行，超长的行只取字面量前后各config.secret_window个字符，
+        相互重叠的区间顺延，保证每个字符只被同一条规则检测一次。
+        """
+        window = config.secret_window
+        length = len(content)
+        hits = []
+        for key in keys:
+            if key not in positions:
+                anchor, ignore_case = key
+                text = content
+                # 少数字符转为小写后长度会发生变化，此时位置无法对应，退化为整段执行
+                if ignore_case and len(lower_content) != length:
+                    positions[key] = None
+                else:
+                    if ignore_case:
+                        text = lower_content
+                    found = []
+                    index = text.find(anchor)
+                    while index != -1:
+                        found.append((index, index + len(anchor)))
+                        index = text.find(anchor, index + 1)
+                    positions[key] = found
+            if positions[key] is None:
+                return [(0, length)]
+            hits.extend(positions[key])
+
+        windows = []
+        last_end = 0
+        for hit_start, hit_end in sorted(hits):
+            if hit_end <= last_end:
+                continue
+            # 向前查找行首、向后查找行尾，查找范围不超过窗口大小
+            start = max(content.rfind("\n", max(hit_start - window, 0), hit_start) + 1, hit_start - window, last_end)
+            end = content.find("\n", hit_end, hit_end + window)
+            if end == -1:
+                end = min(hit_end + window, length)
+            windows.append((start, end))
+            last_end = end
+        return windows
+
+    def high_entropy(self, value):
+        """
+        判断字符串是否为疑似密钥的高熵字符串。
+
+        只检测长度在config.secret_entropy_min_length与config.secret_entropy_max_length之间、
+        同时包含字母与数字的十六进制或Base64字符串，十六进制与Base64分别使用不同的阈值。
+        Base64字符串的阈值随长度缩放，否则长度不足23的字符串熵值永远达不到阈值。
+
+        返回:
+        float: 超过阈值时返回香农熵，否则返回0。
+        """
+        if not config.secret_entropy_min_length <= len(value) <= config.secret_entropy_max_length:
+            return 0
+        if hex_pattern.fullmatch(value):
+            threshold = config.secret_entropy_hex_threshold
+        elif base64_pattern.fullmatch(value):
+            threshold = min(config.secret_entropy_base64_threshold,
+                            config.secret_entropy_base64_ratio * math.log2(len(value)))
+        else:
+            return 0
+        if not (any(char.isdigit() for char in value) and any(char.isalpha() for char in value)):
+            return 0
+        entropy = shannon_entropy(value)
+        return entropy if entropy > threshold else 0
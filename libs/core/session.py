@@ -0,0 +1,142 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import functools
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import config
+
+
+class AddressMixin(object):
+    """
+    在建立连接时记录目标IP和源IP，连接被复用时同样可以获取到。
+    """
+    des_ip = ""
+    sou_ip = ""
+    # 嗅探前已经解析的IP，为空时由系统解析器解析域名
+    connect_ip = ""
+
+    def _new_conn(self):
+        # urllib3中host与_dns_host是同一个属性，只在建立TCP连接时替换为IP，Host请求头与SNI仍然使用域名
+        if not self.connect_ip:
+            return super()._new_conn()
+        host = self._dns_host
+        self._dns_host = self.connect_ip
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        super().connect()
+        try:
+            self.des_ip = self.sock.getpeername()[0]
+            self.sou_ip = self.sock.getsockname()[0]
+        except (OSError, IndexError):
+            pass
+
+
+class AddressHTTPConnection(AddressMixin, HTTPConnection):
+    pass
+
+
+class AddressHTTPSConnection(AddressMixin, HTTPSConnection):
+    pass
+
+
+class ResolverPoolMixin(object):
+    """
+    新建连接时使用嗅探前解析并缓存的IP作为连接地址，不再由系统解析器重复解析。通过代理连接时不做替换。
+    """
+
+    def __init__(self, *args, resolver=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resolver = resolver
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        if self.resolver and self.proxy is None:
+            ips = self.resolver.resolve(self.host)
+            if ips:
+                conn.connect_ip = ips[0]
+        return conn
+
+
+class AddressHTTPConnectionPool(ResolverPoolMixin, HTTPConnectionPool):
+    ConnectionCls = AddressHTTPConnection
+
+
+class AddressHTTPSConnectionPool(ResolverPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = AddressHTTPSConnection
+
+
+class AddressAdapter(HTTPAdapter):
+    """
+    按域名复用连接的适配器，每个响应上附带建立连接时记录的des_ip和sou_ip。
+    """
+
+    def __init__(self, resolver=None, **kwargs):
+        # HTTPAdapter的构造函数中会调用init_poolmanager，需要先保存解析缓存
+        self.resolver = resolver
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": functools.partial(AddressHTTPConnectionPool, resolver=self.resolver),
+            "https": functools.partial(AddressHTTPSConnectionPool, resolver=self.resolver)}
+
+    def build_response(self, req, resp):
+        response = super().build_response(req, resp)
+        connection = getattr(resp, "connection", None)
+        response.des_ip = getattr(connection, "des_ip", "")
+        response.sou_ip = getattr(connection, "sou_ip", "")
+        return response
+
+
+class SnifferSession(object):
+    """
+    网络嗅探线程共享的会话层。
+
+    所有线程共享同一个连接池(urllib3连接池本身是线程安全的)，同一个域名下的多个URL复用已建立的
+    TCP/TLS连接；requests.Session中的Cookie等状态不是线程安全的，因此每个线程各自持有一个Session。
+    每个域名保留的连接数由config.sniffer_pool_size限制，缓存的域名数由config.sniffer_pool_connections限制。
+    传入resolver时，新建连接使用其中缓存的解析结果。
+    """
+
+    def __init__(self, pool_size=None, pool_connections=None, resolver=None):
+        self.adapter = AddressAdapter(resolver=resolver,
+                                      pool_connections=pool_connections or config.sniffer_pool_connections,
+                                      pool_maxsize=pool_size or config.sniffer_pool_size)
+        self.local = threading.local()
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def get_session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            session.headers.update(config.headers)
+            # 嗅探时保持连接，以便同一个域名的后续请求复用
+            session.headers["Connection"] = "keep-alive"
+            self.local.session = session
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def get(self, url, **kwargs):
+        return self.get_session().get(url, **kwargs)
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions:
+                session.cookies.clear()
+            self.sessions = []
+        self.adapter.close()
@@ -0,0 +1,126 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import os
+import fnmatch
+
+
+def walk_files(root_dir, suffixes=None, include=None, exclude=None, prefixes=None, exclude_prefixes=None):
+    """
+    基于os.scandir的非递归目录遍历，供Android、iOS、Web任务共用。
+
+    os.scandir在读取目录时即可获得文件类型，无需对每个文件再调用os.path.isdir，
+    同时使用栈代替递归，层级很深的smali包目录也不会超出递归深度限制。
+    与原先基于os.path.isdir的遍历一致，会进入指向目录的符号链接，并通过已进入目录的(st_dev, st_ino)
+    跳过已经遍历过的目录，避免符号链接指向上级目录时陷入死循环。
+
+    参数:
+    - root_dir: 需要遍历的根目录。
+    - suffixes: 需要获取的文件后缀名，为None时返回所有文件。
+    - include: 需要包含的相对路径通配符列表，如["com/example/*"]，为空时不限制。
+    - exclude: 需要排除的相对路径通配符列表，匹配的目录将整体跳过。
+    - prefixes: 需要扫描的相对目录前缀列表，如["com/example"]，不在前缀内的目录将整体跳过。
+    - exclude_prefixes: 需要排除的相对目录前缀列表，如["androidx", "com/google"]。
+
+    返回:
+    generator: 依次返回符合条件的文件路径。
+    """
+    if suffixes is not None:
+        suffixes = frozenset(suffixes)
+    include = list(include or [])
+    exclude = list(exclude or [])
+    prefixes = [prefix.strip("/") + "/" for prefix in (prefixes or []) if prefix.strip("/")]
+    exclude_prefixes = [prefix.strip("/") + "/" for prefix in (exclude_prefixes or []) if prefix.strip("/")]
+
+    try:
+        root_stat = os.stat(root_dir)
+        visited = {(root_stat.st_dev, root_stat.st_ino)}
+    except OSError:
+        visited = set()
+
+    stack = [(root_dir, "")]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        try:
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            continue
+
+        sub_dirs = []
+        for entry in entries:
+            rel_path = rel_dir + entry.name
+            if exclude and __match__(rel_path, exclude):
+                continue
+
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                rel_sub_dir = rel_path + "/"
+                if exclude_prefixes and __in_prefixes__(rel_sub_dir, exclude_prefixes):
+                    continue
+                # 只进入指定包名所在的目录及其上级目录
+                if prefixes and not __in_prefixes__(rel_sub_dir, prefixes) and \
+                        not __parent_of_prefixes__(rel_sub_dir, prefixes):
+                    continue
+                try:
+                    dir_stat = entry.stat()
+                except OSError:
+                    continue
+                key = (dir_stat.st_dev, dir_stat.st_ino)
+                if key in visited:
+                    continue
+                visited.add(key)
+                sub_dirs.append((entry.path, rel_sub_dir))
+                continue
+
+            if prefixes and not __in_prefixes__(rel_dir, prefixes):
+                continue
+
+            if suffixes is not None:
+                _, dot, suffix = entry.name.rpartition(".")
+                if not dot or suffix not in suffixes:
+                    continue
+
+            if include and not __match__(rel_path, include):
+                continue
+
+            yield entry.path
+
+        # 逆序入栈，保证按照目录列出的顺序深度优先遍历
+        stack.extend(reversed(sub_dirs))
+
+
+def package_to_prefixes(packages):
+    """
+    将逗号分隔的包名转换为相对目录前缀列表，如"com.example,org.demo"转换为["com/example", "org/demo"]。
+    """
+    prefixes = []
+    for package in (packages or "").split(","):
+        package = package.strip().replace(".", "/").strip("/")
+        if package:
+            prefixes.append(package)
+    return prefixes
+
+
+def __match__(rel_path, patterns):
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(rel_path, pattern):
+            return True
+    return False
+
+
+def __in_prefixes__(rel_dir, prefixes):
+    for prefix in prefixes:
+        if rel_dir.startswith(prefix):
+            return True
+    return False
+
+
+def __parent_of_prefixes__(rel_dir, prefixes):
+    for prefix in prefixes:
+        if prefix.startswith(rel_dir):
+            return True
+    return False
@@ -0,0 +1,156 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import os
+import csv
+import json
+import threading
+from queue import Queue
+
+import openpyxl
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+import config
+
+EXCEL_HEADER = ["Number", "IP/URL", "Domain", "Status", "IP", "Server", "Title", "CDN", "Finger"]
+
+
+class ExcelWriter(threading.Thread):
+    """
+    嗅探结果的写入线程，所有嗅探线程和asyncio嗅探引擎只通过write将结果放入队列，不直接操作工作表。
+
+    工作表使用openpyxl的只写模式，逐行追加，不在内存中保留已写入的单元格。
+    每一行同时追加到同名的.partial.csv检查点文件中，每config.writer_checkpoint_rows行刷新一次磁盘，
+    嗅探中途被中断时已完成的结果仍然保留在检查点文件中；正常结束并保存xlsx后删除检查点文件。
+    """
+
+    def __init__(self, xls_path, checkpoint_rows=None, resume_store=None):
+        threading.Thread.__init__(self)
+        self.name = "Excel Writer"
+        self.xls_path = xls_path
+        # 扫描断点，记录每个已嗅探的URL，--resume时不再重复请求
+        self.resume_store = resume_store
+        self.checkpoint_path = os.path.splitext(xls_path)[0] + ".partial.csv"
+        self.checkpoint_rows = checkpoint_rows or config.writer_checkpoint_rows
+        self.row_queue = Queue()
+        self.row_count = 0
+
+    def write(self, url_ip, domain, result):
+        """
+        写入一条嗅探结果，可以在任意线程中调用。
+
+        参数:
+        - url_ip: 请求的URL地址。
+        - domain: URL中的域名。
+        - result: 请求结果字典，超时时为"timeout"。
+        """
+        row = [url_ip, domain]
+        # 如果结果不是超时，则写入更多详细信息
+        if result != "timeout":
+            row.extend([result["status"], result["des_ip"], result["server"], result["title"], result["cdn"]])
+        self.row_queue.put(row)
+        if self.resume_store:
+            self.resume_store.put_url(url_ip, row)
+
+    def write_row(self, row):
+        """
+        写入扫描断点中保存的嗅探结果，行内容与write生成的相同。
+        """
+        self.row_queue.put(list(row))
+
+    def close(self):
+        """
+        等待队列中的结果全部写入后保存xlsx文件。
+        """
+        self.row_queue.put(None)
+        self.join()
+
+    def run(self):
+        workbook = openpyxl.Workbook(write_only=True)
+        worksheet = workbook.create_sheet("Result")
+        worksheet.append(EXCEL_HEADER)
+
+        with open(self.checkpoint_path, "w", newline="", encoding="utf-8", errors="ignore") as f:
+            checkpoint = csv.writer(f)
+            checkpoint.writerow(EXCEL_HEADER)
+            try:
+                while True:
+                    row = self.row_queue.get()
+                    if row is None:
+                        break
+                    self.row_count = self.row_count + 1
+                    row = [self.row_count] + [self.__clean__(value) for value in row]
+                    try:
+                        worksheet.append(row)
+                    except Exception as e:
+                        # 单行写入失败时只丢弃该行，写入线程继续处理后续结果
+                        print("[-] Failed to write the sniffing result of %s: %s" % (row[1], e))
+                    checkpoint.writerow(row)
+                    if self.row_count % self.checkpoint_rows == 0:
+                        f.flush()
+            finally:
+                f.flush()
+                workbook.save(self.xls_path)
+
+        os.remove(self.checkpoint_path)
+
+    def __clean__(self, value):
+        # 标题、Server等响应内容中的控制字符无法写入xlsx
+        if isinstance(value, str):
+            return ILLEGAL_CHARACTERS_RE.sub("", value)
+        return value
+
+
+class JsonlWriter(object):
+    """
+    JSONL格式的结果输出，每个命中记录一行，扫描线程每扫描完一个文件即写入该文件的命中记录。
+
+    记录在同一个文件内按(规则名称, 命中内容)去重，保留首次出现的偏移；写入使用带缓冲的文件，
+    缓冲区写满后才落盘，下游可以在扫描结束前开始读取已写入的记录。
+    扫描结束后追加一条type为app的记录，包含包名与应用标识。
+    """
+
+    def __init__(self, jsonl_path, platform, app=""):
+        self.jsonl_path = jsonl_path
+        self.platform = platform
+        self.app = app
+        self.lock = threading.Lock()
+        self.file = open(jsonl_path, "w", encoding="utf-8", errors="ignore",
+                         buffering=config.jsonl_buffer_size)
+
+    def write_findings(self, file_path, findings):
+        """
+        写入一个文件的命中记录，可以在任意线程中调用。
+
+        参数:
+        - file_path: 被扫描的文件路径。
+        - findings: 由(规则名称, 命中内容, 偏移)组成的命中记录列表，DEX中的命中记录还包含所属的类。
+        """
+        seen = set()
+        lines = []
+        for finding in sorted(findings, key=lambda finding: finding[2]):
+            rule_name, value, offset = finding[:3]
+            if (rule_name, value) in seen:
+                continue
+            seen.add((rule_name, value))
+            record = {"type": "finding", "file": file_path, "rule": rule_name, "value": value,
+                      "offset": offset, "platform": self.platform, "app": self.app}
+            if len(finding) > 3:
+                record["class"] = finding[3]
+            lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        with self.lock:
+            self.file.write("".join(lines))
+
+    def write_app(self, packagename, file_identifier):
+        """
+        扫描结束后写入应用信息。
+        """
+        record = {"type": "app", "platform": self.platform, "app": self.app,
+                  "packagename": packagename, "file_identifier": file_identifier}
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        with self.lock:
+            self.file.close()
@@ -2,302 +2,74 @@
 # -*- coding: utf-8 -*-
 # Author: kelvinBen
 # Github: https://github.com/kelvinBen/AppInfoScanner
-import json
 import os
 import re
 import shutil
+import struct
 import subprocess
 
 import config
 import hashlib
 import zipfile
 import platform
+import threading
 from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
 import libs.core as cores
+import libs.core.apk as apk
+import libs.core.dex as dex
+import libs.core.axml as axml
+import libs.core.protect as protect
+import libs.core.walker as walker
+from libs.core.cache import DecodeCache, file_sha256
+from libs.core.metrics import metrics
+
+
+def check_env(java=True):
+    """
+    检查反编译与脱壳依赖的Java、Frida环境。
+
+    参数:
+    - java: 是否需要检查Java环境，zip模式以及DEX文件无需反编译。
+    """
+    if java and os.system("java -version") != 0:
+        raise Exception("Please install the Java environment!")
+    # 检查Frida环境是否存在
+    if os.system("frida --version") != 0:
+        raise Exception("Please install the Frida environment!")
 
 
 class AndroidTask(object):
 
-    def __init__(self, path, package):
+    def __init__(self, path, package, file_queue=None, decode_jobs=1, exclude_package="", decoder="apktool",
+                 output_path=None, check_env=True):
         self.path = path
+        # 反编译结果的输出目录，批量扫描时每个应用使用单独的目录
+        self.output_path = output_path or cores.output_path
+        # 批量扫描时由调用方统一检查一次Java与Frida环境
+        self.check_env = check_env
+        # apktool: 使用apktool/baksmali反编译后扫描smali；zip: 直接读取APK内的文件，无需Java环境
+        self.decoder = decoder
         self.package = package
-        self.file_queue = Queue()
+        # 需要扫描以及需要排除的包名前缀，多个包名之间使用逗号分隔
+        self.package_prefixes = walker.package_to_prefixes(package)
+        self.exclude_prefixes = walker.package_to_prefixes(exclude_package)
+        # 由调用方传入文件队列时，扫描线程可以在反编译的同时消费队列中的文件
+        self.file_queue = file_queue if file_queue is not None else Queue()
+        self.decode_jobs = max(int(decode_jobs), 1)
+        self.lock = threading.Lock()
         self.shell_flag = False
         self.packagename = ""
         self.comp_list = []
         self.file_identifier = []
         self.permissions = []
         self.files = []
-        self.protect_flag = """{
-          "360加固": [
-            "assets/.appkey",
-            "assets/libjiagu.so",
-            "libjiagu.so",
-            "libjiagu_art.so",
-            "libjiagu_x86.so",
-            "libprotectClass.so",
-            ".appkey",
-            "1ibjgdtc.so",
-            "libjgdtc.so",
-            "libjgdtc_a64.so",
-            "libjgdtc_art.so",
-            "libjgdtc_x64.so",
-            "libjgdtc_x86.so",
-            "libjiagu_a64.so",
-            "libjiagu_ls.so",
-            "libjiagu_x64.so"
-          ],
-          "APKProtect": [
-            "libAPKProtect.so"
-          ],
-          "UU安全": [
-            "libuusafe.jar.so",
-            "libuusafe.so",
-            "libuusafeempty.so",
-            "assets/libuusafe.jar.so",
-            "assets/libuusafe.so",
-            "lib/armeabi/libuusafeempty.so"
-          ],
-          "apktoolplus": [
-            "assets/jiagu_data.bin",
-            "assets/sign.bin",
-            "jiagu_data.bin",
-            "lib/armeabi/libapktoolplus_jiagu.so",
-            "libapktoolplus_jiagu.so",
-            "sign.bin"
-          ],
-          "中国移动加固": [
-            "assets/mogosec_classes",
-            "assets/mogosec_data",
-            "assets/mogosec_dexinfo",
-            "assets/mogosec_march",
-            "ibmogosecurity.so",
-            "lib/armeabi/libcmvmp.so",
-            "lib/armeabi/libmogosec_dex.so",
-            "lib/armeabi/libmogosec_sodecrypt.so",
-            "lib/armeabi/libmogosecurity.so",
-            "libcmvmp.so",
-            "libmogosec_dex.so",
-            "libmogosec_sodecrypt.so",
-            "mogosec_classes",
-            "mogosec_data",
-            "mogosec_dexinfo",
-            "mogosec_march"
-          ],
-          "几维安全": [
-            "assets/dex.dat",
-            "lib/armeabi/kdpdata.so",
-            "lib/armeabi/libkdp.so",
-            "lib/armeabi/libkwscmm.so",
-            "libkwscmm.so",
-            "libkwscr.so",
-            "libkwslinker.so"
-          ],
-          "启明星辰": [
-            "libvenSec.so",
-            "libvenustech.so"
-          ],
-          "网秦加固": [
-            "libnqshield.so"
-          ],
-          "娜迦加固": [
-            "libchaosvmp.so",
-            "libddog.so",
-            "libfdog.so"
-          ],
-          "娜迦加固（新版2022）": [
-            "assets/maindata/fake_classes.dex",
-            "lib/armeabi/libxloader.so",
-            "lib/armeabi-v7a/libxloader.so",
-            "lib/arm64-v8a/libxloader.so",
-            "libxloader.so"
-          ],
-          "娜迦加固（企业版）": [
-            "libedog.so"
-          ],
-          "梆梆安全（企业版）": [
-            "libDexHelper-x86.so",
-            "libDexHelper.so",
-            "1ibDexHelper.so"
-          ],
-          "梆梆安全": [
-            "libSecShell.so",
-            "libsecexe.so",
-            "libsecmain.so",
-            "libSecShel1.so"
-          ],
-          "梆梆安全（定制版）": [
-            "assets/classes.jar",
-            "lib/armeabi/DexHelper.so"
-          ],
-          "梆梆安全（免费版）": [
-            "assets/secData0.jar",
-            "lib/armeabi/libSecShell-x86.so",
-            "lib/armeabi/libSecShell.so"
-          ],
-          "海云安加固": [
-            "assets/itse",
-            "lib/armeabi/libitsec.so",
-            "libitsec.so"
-          ],
-          "爱加密": [
-            "assets/af.bin",
-            "assets/ijiami.ajm",
-            "assets/ijm_lib/X86/libexec.so",
-            "assets/ijm_lib/armeabi/libexec.so",
-            "assets/signed.bin",
-            "ijiami.dat",
-            "lib/armeabi/libexecmain.so",
-            "libexecmain.so"
-          ],
-          "爱加密企业版": [
-            "ijiami.ajm"
-          ],
-          "珊瑚灵御": [
-            "assets/libreincp.so",
-            "assets/libreincp_x86.so",
-            "libreincp.so",
-            "libreincp_x86.so"
-          ],
-          "瑞星加固": [
-            "librsprotect.so"
-          ],
-          "百度加固": [
-            "libbaiduprotect.so",
-            "assets/baiduprotect.jar",
-            "assets/baiduprotect1.jar",
-            "baiduprotect1.jar",
-            "lib/armeabi/libbaiduprotect.so",
-            "libbaiduprotect_art.so",
-            "libbaiduprotect_x86.so"
-          ],
-          "盛大加固": [
-            "libapssec.so"
-          ],
-          "网易易盾": [
-            "libnesec.so"
-          ],
-          "腾讯": [
-            "libexec.so",
-            "libshell.so"
-          ],
-          "腾讯加固": [
-            "lib/armeabi/mix.dex",
-            "lib/armeabi/mixz.dex",
-            "lib/armeabi/libshella-xxxx.so",
-            "lib/armeabi/libshellx-xxxx.so",
-            "tencent_stub"
-          ],
-          "腾讯乐固（旧版）": [
-            "libtup.so",
-            "mix.dex",
-            "liblegudb.so",
-            "libshella",
-            "mixz.dex",
-            "libshel1x"
-          ],
-          "腾讯乐固": [
-            "libshellx"
-          ],
-          "腾讯乐固（VMP）": [
-            "lib/arm64-v8a/libxgVipSecurity.so",
-            "lib/armeabi-v7a/libxgVipSecurity.so",
-            "libxgVipSecurity.so"
-          ],
-          "腾讯云": [
-            "assets/libshellx-super.2021.so",
-            "lib/armeabi/libshell-super.2019.so",
-            "lib/armeabi/libshell-super.2020.so",
-            "lib/armeabi/libshell-super.2021.so",
-            "lib/armeabi/libshell-super.2022.so",
-            "lib/armeabi/libshell-super.2023.so",
-            "tencent_sub"
-          ],
-          "腾讯云移动应用安全": [
-            "0000000lllll.dex",
-            "00000olllll.dex",
-            "000O00ll111l.dex",
-            "00O000ll111l.dex",
-            "0OO00l111l1l",
-            "o0oooOO0ooOo.dat"
-          ],
-          "腾讯云移动应用安全（腾讯御安全）": [
-            "libBugly-yaq.so",
-            "libshell-super.2019.so",
-            "libshellx-super.2019.so",
-            "libzBugly-yaq.so",
-            "t86",
-            "tosprotection",
-            "tosversion",
-            "000000011111.dex",
-            "000000111111.dex",
-            "000001111111",
-            "00000o11111.dex",
-            "o0ooo000oo0o.dat"
-          ],
-          "腾讯御安全": [
-            "libtosprotection.armeabi-v7a.so",
-            "libtosprotection.armeabi.so",
-            "libtosprotection.x86.so",
-            "assets/libtosprotection.armeabi-v7a.so",
-            "assets/libtosprotection.armeabi.so",
-            "assets/libtosprotection.x86.so",
-            "assets/tosversion",
-            "lib/armeabi/libTmsdk-xxx-mfr.so",
-            "lib/armeabi/libtest.so"
-          ],
-          "腾讯Bugly": [
-            "lib/arm64-v8a/libBugly.so",
-            "libBugly.so"
-          ],
-          "蛮犀": [
-            "assets/mxsafe.config",
-            "assets/mxsafe.data",
-            "assets/mxsafe.jar",
-            "assets/mxsafe/arm64-v8a/libdSafeShell.so",
-            "assets/mxsafe/x86_64/libdSafeShell.so",
-            "libdSafeShell.so"
-          ],
-          "通付盾": [
-            "libNSaferOnly.so",
-            "libegis.so"
-          ],
-          "阿里加固": [
-            "assets/armeabi/libfakejni.so",
-            "assets/armeabi/libzuma.so",
-            "assets/classes.dex.dat",
-            "assets/dp.arm-v7.so.dat",
-            "assets/dp.arm.so.dat",
-            "assets/libpreverify1.so",
-            "assets/libzuma.so",
-            "assets/libzumadata.so",
-            "dexprotect"
-          ],
-          "阿里聚安全": [
-            "aliprotect.dat",
-            "libdemolish.so",
-            "libfakejni.so",
-            "libmobisec.so",
-            "libsgmain.so",
-            "libzuma.so",
-            "libzumadata.so",
-            "libdemolishdata.so",
-            "libpreverify1.so",
-            "libsgsecuritybody.so"
-          ],
-          "顶像科技": [
-            "libx3g.so",
-            "lib/armeabi/libx3g.so"
-          ]
-        }"""
+        # 识别到的加固特征
+        self.protect_list = []
 
     def start(self):
-        # 检查java环境是否存在
-        if os.system("java -version") != 0:
-            raise Exception("Please install the Java environment!")
-        # 检查Frida环境是否存在
-        if os.system("frida --version") != 0:
-            raise Exception("Please install the Frida environment!")
+        if self.check_env:
+            check_env(self.decoder != "zip" and not self.path.endswith(".dex"))
 
         input_file_path = self.path
         if os.path.isdir(input_file_path):
@@ -309,32 +81,21 @@ class AndroidTask(object):
 
         return {"comp_list": self.comp_list, "shell_flag": self.shell_flag, "file_queue": self.file_queue,
                 "packagename": self.packagename, "file_identifier": self.file_identifier,
-                "permissions": self.permissions}
+                "permissions": self.permissions, "protect_list": self.protect_list}
 
     def __detect_protect__(self, file_path):
-        markNameMap = json.loads(self.protect_flag)
-        markNameMap = dict(markNameMap)
-        zip_stream = zipfile.ZipFile(file_path)  # 默认模式r,读
-        flag = ''
-        for zippath in zip_stream.namelist():
-            if 'lib' in zippath:
-                for key, value in markNameMap.items():
-                    for mark in value:
-                        if mark in zippath:
-                            print("detect 【{}】 protector\nspecific code:{}->{}\n".format(key, zippath, mark))
-                            flag += ("detect 【{}】 protector\nspecific code:{}->{}\n".format(key, zippath, mark))
-        if len(flag) > 0:
-            self.__android_unpack__()
-        # so库文件模式找不到就全量匹配
-        for zippath in zip_stream.namelist():
-            for key, value in markNameMap.items():
-                for mark in value:
-                    if mark in zippath:
-                        print("detect 【{}】 protector\nspecific code:{}->{}\n".format(key, zippath, mark))
-                        flag += ("detect 【{}】 protector\nspecific code:{}->{}\n".format(key, zippath, mark))
-        if len(flag) > 0:
-            self.__android_unpack__()
-        print("We can't detect protect")
+        # 特征索引在进程内只构建一次，APK内的文件只遍历一次
+        matches = protect.detect(file_path)
+        for match in matches:
+            print("detect 【{}】 protector\nspecific code:{}->{}\n".format(match["name"], match["entry"], match["marker"]))
+        if len(matches) == 0:
+            print("We can't detect protect")
+            return matches
+
+        with self.lock:
+            self.protect_list.extend(matches)
+        self.__android_unpack__()
+        return matches
 
     def __android_unpack__(self):
         print('[*] unpacking')
@@ -372,50 +133,75 @@ class AndroidTask(object):
 
     def __decode_file__(self, file_path):
         apktool_path = str(cores.apktool_path)
-        backsmali_path = str(cores.backsmali_path)
-        base_out_path = str(cores.output_path)
+        base_out_path = str(self.output_path)
         filename = os.path.basename(file_path)
         suffix_name = filename.split(".")[-1]
 
         if suffix_name == "apk":
             self.__detect_protect__(file_path)
 
-        if suffix_name == "apk" or suffix_name == "hpk":
-            name = filename.split(".")[0]
+        if self.decoder == "zip" and suffix_name in ("apk", "hpk"):
+            self.__decode_zip__(file_path)
+        elif suffix_name == "apk" or suffix_name == "hpk":
+            # 保留文件名中除后缀外的全部内容，避免并发反编译时输出目录冲突
+            name = os.path.splitext(filename)[0]
             output_path = os.path.join(base_out_path, name)
             self.__decode_apk__(file_path, apktool_path, output_path)
         elif suffix_name == "dex":
-            f = open(file_path, 'rb')
-            md5_obj = hashlib.md5()
-            while True:
-                r = f.read(1024)
-                if not r:
-                    break
-                md5_obj.update(r)
-            dex_md5 = md5_obj.hexdigest().lower()
-            self.file_identifier.append(dex_md5)
-            output_path = os.path.join(base_out_path, dex_md5)
-            if not os.path.exists(output_path):
-                os.makedirs(output_path)
-            self.__decode_dex__(file_path, backsmali_path, output_path)
+            self.__scanner_dex__(file_path)
         else:
             return "error"
 
     def __decode_dir__(self, root_dir):
-        dir_or_files = os.listdir(root_dir)
-        for dir_or_file in dir_or_files:
-            dir_or_file_path = os.path.join(root_dir, dir_or_file)
-            if os.path.isdir(dir_or_file_path):
-                self.__decode_dir__(dir_or_file_path)
-            else:
-                if self.__decode_file__(dir_or_file_path) == "error":
-                    continue
+        # 收集目录下所有待反编译的文件，交由进程外的java并发反编译
+        file_paths = []
+        for dir_path, _, file_names in os.walk(root_dir):
+            for file_name in sorted(file_names):
+                file_paths.append(os.path.join(dir_path, file_name))
+
+        with ThreadPoolExecutor(max_workers=self.decode_jobs) as executor:
+            futures = [executor.submit(self.__decode_file__, file_path)
+                       for file_path in file_paths]
+            for future in futures:
+                future.result()
 
     # 分解apk
     def __decode_apk__(self, file_path, apktool_path, output_path):
+        # 相同的APK直接复用上一次的反编译结果
+        decode_cache = None
+        if cores.cache_flag:
+            decode_cache = DecodeCache(cores.decode_cache_path)
+            apk_sha256 = file_sha256(file_path)
+            cache_path = decode_cache.get(apk_sha256)
+            if cache_path:
+                print("[*] Reuse the decompiled cache of %s: %s" % (file_path, cache_path))
+                self.__shell_test__(cache_path)
+                self.__scanner_file_by_apktool__(cache_path)
+                return
+            output_path = decode_cache.prepare(apk_sha256)
+        elif cores.resume_flag and os.path.isdir(output_path):
+            # 断点续扫时复用上次完整反编译的目录
+            print("[*] Reuse the decompiled directory of %s: %s" % (file_path, output_path))
+            self.__shell_test__(output_path)
+            self.__scanner_file_by_apktool__(output_path)
+            return
+        else:
+            # 先输出到临时目录，成功后再重命名，反编译中途被中断时不会留下不完整的目录
+            decode_path = output_path
+            output_path = output_path + ".tmp"
+
         cmd_str = ('java -jar "%s" d -f "%s" -o "%s" --only-main-classe') % (
             str(apktool_path), str(file_path), str(output_path))
-        if os.system(cmd_str) == 0:
+        with metrics.stage("apktool"):
+            status = os.system(cmd_str)
+        if status == 0:
+            if decode_cache:
+                output_path = decode_cache.commit(apk_sha256, output_path)
+            else:
+                if os.path.isdir(decode_path):
+                    shutil.rmtree(decode_path)
+                os.rename(output_path, decode_path)
+                output_path = decode_path
             self.__shell_test__(output_path)
             self.__scanner_file_by_apktool__(output_path)
         else:
@@ -423,16 +209,68 @@ class AndroidTask(object):
                 "[-] Decompilation failed, please submit error information at https://github.com/kelvinBen/AppInfoScanner/issues")
             raise Exception(file_path + ", Decompilation failed.")
 
-    # 分解dex
-    def __decode_dex__(self, file_path, backsmali_path, output_path):
-        cmd_str = ('java -jar "%s" d "%s"') % (str(backsmali_path),
-                                               str(file_path))
-        if os.system(cmd_str) == 0:
-            self.__get_scanner_file__(output_path)
-        else:
-            print(
-                "[-] Decompilation failed, please submit error information at https://github.com/kelvinBen/AppInfoScanner/issues")
-            raise Exception(file_path + ", Decompilation failed.")
+    # 不解压APK，直接将APK内需要扫描的文件交给扫描线程
+    def __decode_zip__(self, file_path):
+        with zipfile.ZipFile(file_path) as zip_file:
+            names = zip_file.namelist()
+            if "AndroidManifest.xml" in names:
+                data = zip_file.read("AndroidManifest.xml")
+                am_str = None
+                if axml.is_axml(data):
+                    try:
+                        am_str = axml.decode(data)
+                    except (ValueError, struct.error):
+                        # 被加固工具篡改的AndroidManifest.xml，按原始内容识别包名与权限
+                        print("[-] Unable to decode AndroidManifest.xml of %s, parsing its raw content." % file_path)
+                if am_str is None:
+                    am_str = data.decode("utf-8", "ignore")
+                self.__parse_manifest__(am_str)
+
+            for name in names:
+                if re.match(r"classes\d*\.dex$", name):
+                    try:
+                        self.__detect_components__(dex.DexFile(zip_file.read(name)))
+                    except (ValueError, struct.error):
+                        pass
+                    self.file_queue.put(apk.join_path(file_path, name))
+
+            if cores.resource_flag:
+                return
+            for name in names:
+                if name == "resources.arsc" or (name.startswith("assets/") and name.endswith((".js", ".xml"))):
+                    self.file_queue.put(apk.join_path(file_path, name))
+
+    # DEX文件直接解析字符串表，无需baksmali反编译
+    def __scanner_dex__(self, file_path):
+        md5_obj = hashlib.md5()
+        with open(file_path, 'rb') as f:
+            while True:
+                r = f.read(1024 * 1024)
+                if not r:
+                    break
+                md5_obj.update(r)
+        self.file_identifier.append(md5_obj.hexdigest().lower())
+        try:
+            with dex.open_dex(file_path) as dex_file:
+                self.__detect_components__(dex_file)
+        except (ValueError, struct.error):
+            pass
+        self.file_queue.put(file_path)
+
+    def __detect_components__(self, dex_file):
+        # 通过DEX中的类型描述符识别组件，与apktool模式下按包目录识别一致
+        try:
+            descriptors = set(dex_file.type_descriptors())
+        except struct.error:
+            return
+        for component in config.filter_components:
+            # 包级别的组件匹配包下的任意类，类级别的组件匹配该类本身
+            name = "L" + component.replace(".", "/")
+            prefix = name + "/"
+            if name + ";" in descriptors or any(descriptor.startswith(prefix) for descriptor in descriptors):
+                with self.lock:
+                    if component not in self.comp_list:
+                        self.comp_list.append(component)
 
     # 初始化检测文件信息
     def __scanner_file_by_apktool__(self, output_path):
@@ -446,46 +284,52 @@ class AndroidTask(object):
                 scanner_file_suffixs = ["smali", "js", "xml"]
                 if cores.resource_flag:
                     scanner_file_suffixs = ["smali"]
-                self.__get_scanner_file__(file_path, scanner_file_suffixs)
+                # 包名过滤仅对smali目录生效
+                if "smali" in file_name:
+                    self.__get_scanner_file__(file_path, scanner_file_suffixs)
+                else:
+                    self.__get_scanner_file__(file_path, scanner_file_suffixs, False)
 
-    def __get_scanner_file__(self, scanner_dir, scanner_file_suffixs=["smali"]):
-        dir_or_files = os.listdir(scanner_dir)
-        for dir_or_file in dir_or_files:
-            dir_file_path = os.path.join(scanner_dir, dir_or_file)
+    def __get_scanner_file__(self, scanner_dir, scanner_file_suffixs=["smali"], package_filter=True):
+        # 通过组件所在的包目录或者类文件识别组件，被包名过滤跳过的目录同样能够识别
+        for component in config.filter_components:
+            comp_path = os.path.join(scanner_dir, component.replace(".", os.sep))
+            if os.path.isdir(comp_path) or os.path.isfile(comp_path + ".smali"):
+                with self.lock:
+                    if (component not in self.comp_list):
+                        self.comp_list.append(component)
 
-            if os.path.isdir(dir_file_path):
-                self.__get_scanner_file__(dir_file_path, scanner_file_suffixs)
-            else:
-                if ("." not in dir_or_file) or (len(dir_or_file.split(".")) < 1) or (
-                        dir_or_file.split(".")[-1] not in scanner_file_suffixs):
-                    continue
-                self.file_queue.put(dir_file_path)
-                for component in config.filter_components:
-                    comp = component.replace(".", "/")
-                    if (comp in dir_file_path):
-                        if (component not in self.comp_list):
-                            self.comp_list.append(component)
+        prefixes = None
+        exclude_prefixes = None
+        if package_filter:
+            prefixes = self.package_prefixes
+            exclude_prefixes = self.exclude_prefixes
+
+        for dir_file_path in walker.walk_files(scanner_dir, scanner_file_suffixs, prefixes=prefixes,
+                                               exclude_prefixes=exclude_prefixes):
+            self.file_queue.put(dir_file_path)
 
     def __shell_test__(self, output):
         am_path = os.path.join(output, "AndroidManifest.xml")
 
         with open(am_path, "r", encoding='utf-8', errors='ignore') as f:
-            am_str = f.read()
-
-            am_package = re.compile(r'<manifest.*package=\"(.*?)\".*')
-            apackage = am_package.findall(am_str)
-            if len(apackage) >= 1:
-                self.packagename = apackage[0]
-                self.file_identifier.append(apackage[0])
-
-            am_name = re.compile(r'<application.*android:name=\"(.*?)\".*>')
-            aname = am_name.findall(am_str)
-            if aname and len(aname) >= 1:
-                if aname[0] in config.shell_list:
-                    self.shell_flag = True
-
-            am_permission = re.compile(r'<uses-permission android:name="(.*)"/>')
-            ampermissions = am_permission.findall(am_str)
-            for ampermission in ampermissions:
-                if ampermission in config.apk_permissions:
-                    self.permissions.append(ampermission)
+            self.__parse_manifest__(f.read())
+
+    def __parse_manifest__(self, am_str):
+        am_package = re.compile(r'<manifest.*package=\"(.*?)\".*')
+        apackage = am_package.findall(am_str)
+        if len(apackage) >= 1:
+            self.packagename = apackage[0]
+            self.file_identifier.append(apackage[0])
+
+        am_name = re.compile(r'<application.*android:name=\"(.*?)\".*>')
+        aname = am_name.findall(am_str)
+        if aname and len(aname) >= 1:
+            if aname[0] in config.shell_list:
+                self.shell_flag = True
+
+        am_permission = re.compile(r'<uses-permission android:name="(.*)"/>')
+        ampermissions = am_permission.findall(am_str)
+        for ampermission in ampermissions:
+            if ampermission in config.apk_permissions:
+                self.permissions.append(ampermission)
@@ -3,75 +3,185 @@
 # Author: kelvinBen
 # Github: https://github.com/kelvinBen/AppInfoScanner
 import os
+import json
 import config
-from queue import Queue
+import time
+import hashlib
+import functools
+import threading
+from queue import Queue, Empty
+from collections import deque
 import libs.core as cores
+import libs.core.parses as parses
+import libs.core.walker as walker
+from concurrent.futures import ProcessPoolExecutor
 from libs.task.ios_task import iOSTask
 from libs.task.web_task import WebTask
 from libs.task.net_task import NetTask
+from libs.core.rules import RuleEngine
+from libs.core.secret import SecretEngine
+from libs.core.cache import ScanCache
+from libs.core.resume import ResumeStore
+from libs.core.writer import JsonlWriter
+from libs.core.metrics import metrics
 from libs.core.parses import ParsesThreads
 from libs.task.android_task import AndroidTask
 from libs.task.download_task import DownloadTask
 
 
 class BaseTask(object):
-    thread_list = []
-    result_dict = {}
-    app_history_list = []
-    domain_history_list = []
     # 统一初始化入口
 
-    def __init__(self, types="Android", inputs="", rules="", sniffer=True, threads=10, package=""):
+    def __init__(self, types="Android", inputs="", rules="", sniffer=True, threads=10, package="", backend="thread",
+                 workers=None, decode_jobs=None, exclude_package="", sniffer_engine="async",
+                 sniffer_mode="url", output_format="txt", entropy=False, decoder="apktool"):
         self.types = types
         self.path = inputs
-        if rules:
-            config.filter_strs.append(r'.*'+str(rules)+'.*')
+        # 扫描线程、扫描结果以及历史记录均属于当前任务，同一进程中的多个任务互不影响
+        self.thread_list = []
+        self.result_dict = {}
+        self.app_history_list = []
+        self.domain_history_list = []
+        self.rules = rules
+        self.rule_engine = None
+        self.secret_engine = None
+        self.entropy = entropy
+        # 超出单个文件扫描时间预算的文件
+        self.over_budget_list = []
+        self.scan_cache = None
+        self.resume_store = None
         self.sniffer = not sniffer
+        self.sniffer_engine = sniffer_engine
+        self.sniffer_mode = sniffer_mode
+        self.output_format = output_format
+        self.result_writer = None
         self.threads = threads
         self.package = package
-        self.file_queue = Queue()
+        self.exclude_package = exclude_package
+        self.backend = backend
+        self.workers = workers or os.cpu_count()
+        self.decode_jobs = decode_jobs or config.decode_jobs
+        self.decoder = decoder
+        # 有界的文件队列，遍历文件的速度超过扫描速度时阻塞生产者，避免队列无限增长
+        self.file_queue = Queue(maxsize=config.file_queue_size)
 
     # 统一调度平台
 
     def start(self):
+        profiler = self.__start_profiler__()
+        try:
+            self.__start__()
+        finally:
+            # 扫描与嗅探均结束或者中途出错时提交扫描断点
+            if self.resume_store:
+                self.resume_store.close()
+            self.__stop_profiler__(profiler)
+
+    def __start__(self):
 
         print("[*] AI is analyzing filtering rules......")
 
         # 获取历史记录
-        self.__history_handle__()
+        with metrics.stage("history"):
+            self.__history_handle__()
 
         print("[*] The filtering rules obtained by AI are as follows: %s" %
               (set(config.filter_no)))
 
+        # 规则引擎在历史记录处理完成后统一构建一次，供所有扫描线程共享
+        self.rule_engine = RuleEngine(
+            config.filter_strs, config.filter_no, self.rules)
+        self.secret_engine = SecretEngine(config.filter_ak_map, self.entropy)
+        if cores.cache_flag:
+            self.scan_cache = ScanCache(cores.scan_cache_path, self.__rule_hash__())
+        # 只在使用--resume时记录扫描断点，默认的扫描不产生额外的数据库写入
+        if cores.resume_flag:
+            self.resume_store = ResumeStore(cores.resume_path, self.__resume_key__())
+            print("[*] Resume: %d files have been scanned, %d URLs have been sniffed" % (
+                len(self.resume_store.files), len(self.resume_store.urls)))
+        # JSONL结果在扫描过程中逐个文件写入
+        if self.output_format == "jsonl":
+            self.result_writer = JsonlWriter(cores.jsonl_result_path, self.types)
+
+        # 线程控制中心，扫描线程在反编译及遍历文件的同时开始消费文件队列
+        print(
+            "[*] =========  Searching for strings that match the rules ===============")
+        self.scan_start_time = time.perf_counter()
+        self.scan_start_cpu = time.process_time()
+        if self.backend == "process":
+            thread = threading.Thread(
+                target=self.__process_control__, args=(self.file_queue,))
+            thread.start()
+            self.thread_list.append(thread)
+        else:
+            self.__threads_control__(self.file_queue)
+
         # 任务控制中心
-        task_info = self.__tast_control__()
+        try:
+            with metrics.stage("task"):
+                task_info = self.__tast_control__()
+        except BaseException:
+            # 出错或者Ctrl+C中断时先等待扫描线程与进程池退出，再关闭扫描断点等共享资源，
+            # 否则阻塞在文件队列上的扫描线程会使进程无法退出
+            self.__stop_control__()
+            raise
+        self.__finish_control__()
+
         if len(task_info) < 1:
+            self.__stop_control__()
+            return
+
+        if task_info["shell_flag"]:
+            print('[-] \033[3;31m Error: This application has shell, the retrieval results may not be accurate, Please remove the shell and try again!')
+            self.__stop_control__()
             return
 
-        file_queue = task_info["file_queue"]
-        shell_flag = task_info["shell_flag"]
         comp_list = task_info["comp_list"]
         packagename = task_info["packagename"]
         file_identifier = task_info["file_identifier"]
         permissions = task_info["permissions"]
 
-        if shell_flag:
-            print('[-] \033[3;31m Error: This application has shell, the retrieval results may not be accurate, Please remove the shell and try again!')
-            return
-
-        # 线程控制中心
-        print(
-            "[*] =========  Searching for strings that match the rules ===============")
-        self.__threads_control__(file_queue)
-
         # 等待线程结束
-        for thread in self.thread_list:
-            thread.join()
+        self.__wait_control__(packagename, file_identifier)
 
         # 结果输出中心
         self.__print_control__(packagename, comp_list,
                                file_identifier, permissions)
 
+    def __finish_control__(self):
+        # 文件遍历完成后，为每个消费者放入一个结束标记
+        for _ in self.thread_list:
+            self.file_queue.put(None)
+
+    def __stop_control__(self):
+        # 丢弃尚未扫描的文件并重新放入结束标记，等待扫描线程退出
+        while not self.file_queue.empty():
+            self.file_queue.get()
+        self.__finish_control__()
+        self.__wait_control__()
+
+    def __wait_control__(self, packagename=None, file_identifier=None):
+        for thread in self.thread_list:
+            thread.join()
+            if isinstance(thread, ParsesThreads):
+                self.over_budget_list.extend(thread.over_budget_list)
+        if self.over_budget_list:
+            print("[-] %d files exceeded the scan time budget of %ss, their AK or SK results may be incomplete:" %
+                  (len(self.over_budget_list), config.scan_file_budget))
+            for file_path in sorted(self.over_budget_list):
+                print("[-] %s" % file_path)
+        # 扫描阶段从启动扫描线程开始，到所有扫描线程结束为止
+        metrics.add_stage("scan", time.perf_counter() - self.scan_start_time,
+                          time.process_time() - self.scan_start_cpu)
+
+        if self.scan_cache:
+            self.scan_cache.close()
+
+        if self.result_writer:
+            if file_identifier is not None:
+                self.result_writer.write_app(packagename, file_identifier)
+            self.result_writer.close()
+
     def __tast_control__(self):
         task_info = {}
         # 自动根据文件后缀名称进行修正
@@ -79,6 +189,10 @@ class BaseTask(object):
         cacar_path = cache_info["path"]
         types = cache_info["type"]
 
+        if self.result_writer:
+            self.result_writer.platform = types
+            self.result_writer.app = os.path.basename(os.path.normpath(cacar_path))
+
         if (not os.path.exists(cacar_path) and cores.download_flag):
             print(
                 "[-] File download failed! Please download the file manually and try again.")
@@ -86,23 +200,203 @@ class BaseTask(object):
 
         # 调用Android 相关处理逻辑
         if types == "Android":
-            task_info = AndroidTask(cacar_path, self.package).start()
+            task_info = AndroidTask(cacar_path, self.package, self.file_queue, self.decode_jobs,
+                                    self.exclude_package, self.decoder).start()
         # 调用iOS 相关处理逻辑
         elif types == "iOS":
-            task_info = iOSTask(cacar_path).start()
+            task_info = iOSTask(cacar_path, self.file_queue).start()
         # 调用Web 相关处理逻辑
         else:
-            task_info = WebTask(cacar_path).start()
+            task_info = WebTask(cacar_path, self.file_queue).start()
         return task_info
 
     def __threads_control__(self, file_queue):
-        for threadID in range(1, self.threads):
+        # 至少启动一个扫描线程，否则有界队列写满后生产者将一直阻塞
+        for threadID in range(1, max(self.threads, 2)):
             name = "Thread - " + str(int(threadID))
             thread = ParsesThreads(
-                threadID, name, file_queue, self.result_dict, self.types)
+                threadID, name, file_queue, self.result_dict, self.types, self.rule_engine, self.scan_cache,
+                self.__finding_handler__(), self.secret_engine, self.resume_store, self.__package_filter__())
             thread.start()
             self.thread_list.append(thread)
 
+    def __process_control__(self, file_queue):
+        # 从文件队列中按批次取出文件分发给进程池，绕开GIL对正则匹配的限制
+        batch_size = config.process_batch_size
+        state = {name: getattr(cores, name)
+                 for name in parses.process_state_names}
+
+        # 已提交尚未合并的批次，按提交顺序合并，达到上限时等待最早的批次完成
+        max_pending = self.workers * config.process_pending_batches
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=parses.init_process,
+                                 initargs=(state,)) as executor:
+            futures = deque()
+            batch = []
+            while True:
+                try:
+                    file_path = file_queue.get(timeout=0.5)
+                except Empty:
+                    # 生产者暂时没有新的文件时，先分发已经收集到的文件
+                    file_path = ""
+
+                if file_path:
+                    # 断点续扫时上次已经扫描完成的文件不再分发给子进程
+                    if self.__resume_file__(file_path):
+                        continue
+                    batch.append(file_path)
+                    if len(batch) < batch_size:
+                        continue
+
+                if batch:
+                    try:
+                        future = executor.submit(
+                            parses.parse_files, batch, self.types, self.rule_engine, self.scan_cache,
+                            self.secret_engine, self.__package_filter__())
+                    except Exception as e:
+                        # 进程池异常时丢弃本批文件并继续消费队列，避免生产者阻塞在有界队列上
+                        print("[-] Failed to dispatch %d files to the process pool: %s" % (len(batch), e))
+                        batch = []
+                    else:
+                        if self.result_writer:
+                            # 每批文件扫描完成后立即写入命中记录
+                            future.add_done_callback(self.__write_batch_findings__)
+                        if self.resume_store:
+                            future.add_done_callback(functools.partial(self.__checkpoint_batch__, batch))
+                        if self.scan_cache:
+                            # 子进程不写缓存，每批扫描完成后由主进程写入
+                            future.add_done_callback(self.__cache_batch__)
+                        futures.append(future)
+                        batch = []
+
+                # 合并已经完成的批次，释放其结果占用的内存
+                while futures and (futures[0].done() or len(futures) >= max_pending):
+                    self.__merge_future__(futures.popleft())
+
+                # 文件遍历完成后放入的结束标记
+                if file_path is None:
+                    break
+
+            while futures:
+                self.__merge_future__(futures.popleft())
+
+    def __merge_future__(self, future):
+        # 按提交顺序合并结果，保证与多线程模式输出一致
+        try:
+            result = future.result()
+        except Exception as e:
+            print("[-] Scanning a batch of files failed: %s" % e)
+            return
+        self.result_dict.update(result[0])
+        metrics.merge(result[2])
+        self.over_budget_list.extend(result[3])
+
+    def __start_profiler__(self):
+        # 可选的cProfile或pyinstrument分析，仅分析主线程
+        profile_hook = cores.profile_hook_name
+        if profile_hook == "cprofile":
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if profile_hook == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("[-] pyinstrument is not installed, please run: pip install pyinstrument")
+                return None
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        return None
+
+    def __stop_profiler__(self, profiler):
+        if profiler is not None:
+            if cores.profile_hook_name == "cprofile":
+                profiler.disable()
+                profiler.dump_stats(cores.profile_hook_path)
+            else:
+                profiler.stop()
+                with open(cores.profile_hook_path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            print("[*] For more information about the profiler, see file result: %s" % (cores.profile_hook_path))
+
+        if cores.profile_flag:
+            metrics.write_report(cores.profile_result_path)
+
+    def __finding_handler__(self):
+        if self.result_writer:
+            return self.result_writer.write_findings
+        return None
+
+    def __write_batch_findings__(self, future):
+        if future.exception() is not None:
+            return
+        for file_path, findings in future.result()[1].items():
+            self.result_writer.write_findings(file_path, findings)
+
+    def __resume_file__(self, file_path):
+        """
+        多进程模式下在主进程中恢复上次已经扫描完成的文件的结果。
+
+        返回:
+        bool: 文件上次已经扫描完成时返回True。
+        """
+        if not self.resume_store:
+            return False
+        resumed = self.resume_store.get(file_path)
+        if resumed is None:
+            return False
+        results, findings = resumed
+        if results:
+            self.result_dict[file_path] = set(results)
+        if self.result_writer and findings:
+            self.result_writer.write_findings(file_path, findings)
+        metrics.count("files_resumed")
+        return True
+
+    def __checkpoint_batch__(self, batch, future):
+        # 子进程只返回有结果的文件，批次中的其余文件按无结果记录
+        if future.exception() is not None:
+            return
+        result_dict, finding_dict = future.result()[:2]
+        self.resume_store.put_many([(file_path, result_dict.get(file_path, ()), finding_dict.get(file_path, ()))
+                                    for file_path in batch])
+
+    def __cache_batch__(self, future):
+        if future.exception() is not None:
+            return
+        self.scan_cache.apply(future.result()[4])
+
+    def __resume_key__(self):
+        # 输入、任务类型或者规则发生变化后，上次的扫描断点不再适用
+        path = self.path
+        if not (path.startswith("http://") or path.startswith("https://")):
+            path = os.path.abspath(path)
+        content = json.dumps([path, self.__rule_hash__()], ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def __rule_hash__(self, types=None):
+        # 缓存的结果与规则集、AK规则、任务类型以及DEX字符串表的包名过滤相关
+        types = types or self.types
+        content = json.dumps([self.rule_engine.fingerprint(), self.secret_engine.fingerprint(), config.macho_string_sections,
+                              types, self.__package_filter__(types)], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def __package_filter__(self, types=None):
+        """
+        -p/-e/--exclude-sdk指定的包名过滤，仅对Android应用生效。
+
+        返回:
+        tuple: (需要扫描的包名前缀列表, 需要排除的包名前缀列表)，未指定包名时返回None。
+        """
+        if (types or self.types) != "Android":
+            return None
+        prefixes = walker.package_to_prefixes(self.package)
+        exclude_prefixes = walker.package_to_prefixes(self.exclude_package)
+        if not (prefixes or exclude_prefixes):
+            return None
+        return prefixes, exclude_prefixes
+
     def __print_control__(self, packagename, comp_list, file_identifier, permissions):
         txt_result_path = cores.txt_result_path
         xls_result_path = cores.xls_result_path
@@ -111,8 +405,10 @@ class BaseTask(object):
         if self.sniffer:
             print(
                 "[*] ========= Sniffing the URL address of the search ===============")
-            NetTask(self.result_dict, self.app_history_list,
-                    self.domain_history_list, file_identifier, self.threads).start()
+            with metrics.stage("sniffer"):
+                NetTask(self.result_dict, self.app_history_list,
+                        self.domain_history_list, file_identifier, self.threads, self.sniffer_engine,
+                        self.sniffer_mode, resume_store=self.resume_store).start()
 
         if packagename:
             print("[*] ========= The package name of this APP is: ===============")
@@ -130,15 +426,16 @@ class BaseTask(object):
                 print(permission)
 
         if all_flag:
-            value_list = []
-            with open(txt_result_path, "a+", encoding='utf-8', errors='ignore') as f:
+            value_list = set()
+            with metrics.stage("output"), open(txt_result_path, "a+", encoding='utf-8', errors='ignore') as f:
                 for key, value in self.result_dict.items():
-                    f.write(key+"\r")
+                    lines = [key+"\r"]
                     for result in value:
                         if result in value_list:
                             continue
-                        value_list.append(result)
-                        f.write("\t"+result+"\r")
+                        value_list.add(result)
+                        lines.append("\t"+result+"\r")
+                    f.write("".join(lines))
                 f.close()
             print("[*] For more information about the search, see TXT file result: %s" %
                   (txt_result_path))
@@ -147,6 +444,10 @@ class BaseTask(object):
             print("[*] For more information about the search, see XLSX file result: %s" %
                   (xls_result_path))
 
+        if self.result_writer:
+            print("[*] For more information about the search, see JSONL file result: %s" %
+                  (cores.jsonl_result_path))
+
     def __history_handle__(self):
         domain_history_path = cores.domain_history_path
         app_history_path = cores.app_history_path
@@ -0,0 +1,425 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import os
+import re
+import json
+import time
+import config
+import threading
+import functools
+from queue import Empty
+import libs.core as cores
+import libs.core.parses as parses
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from libs.task.base_task import BaseTask
+from libs.task.ios_task import iOSTask
+from libs.task.web_task import WebTask
+from libs.task.net_task import NetTask
+from libs.task.android_task import AndroidTask, check_env
+from libs.task.download_task import DownloadTask
+from libs.core.rules import RuleEngine
+from libs.core.secret import SecretEngine
+from libs.core.cache import ScanCache
+from libs.core.writer import JsonlWriter
+from libs.core.metrics import metrics
+
+# 清单中可以显式指定的应用类型
+BATCH_TYPES = {"android": "Android", "ios": "iOS", "web": "Web"}
+
+
+class BatchApp(object):
+    """
+    批量扫描中的一个应用，记录该应用在下载、反编译、扫描、嗅探各个阶段的状态与结果。
+
+    BatchApp同时作为AndroidTask、iOSTask、WebTask的文件队列，放入的文件会带上所属的应用后进入共享的扫描队列，
+    扫描线程按照所属的应用写入结果。反编译结束且放入的文件全部扫描完成后调用on_scanned。
+    """
+
+    def __init__(self, index, inputs, types, app_id, file_queue, on_scanned):
+        self.index = index
+        self.inputs = inputs
+        self.path = inputs
+        self.types = types
+        self.app_id = app_id
+        self.file_queue = file_queue
+        self.on_scanned = on_scanned
+        # pending、downloading、decoding、scanning、done、shell、failed
+        self.status = "pending"
+        self.error = ""
+        self.result_dict = {}
+        self.over_budget_list = []
+        self.scan_cache = None
+        self.package_filter = None
+        # 批量扫描不支持断点续扫
+        self.resume_store = None
+        self.result_writer = None
+        self.finding_handler = None
+        self.task_info = {}
+        # 阶段 -> 耗时(秒)，扫描与反编译同时进行，扫描阶段从开始反编译计算到所有文件扫描完成
+        self.stages = {}
+        self.decode_start_time = None
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.decoded = False
+        self.scanned = False
+        self.finished = threading.Event()
+
+    def put(self, file_path):
+        with self.lock:
+            self.pending = self.pending + 1
+        self.file_queue.put((file_path, self))
+
+    def done(self, count):
+        """
+        通知有count个文件扫描完成。
+        """
+        with self.lock:
+            self.pending = self.pending - count
+        self.__check_scanned__()
+
+    def decode_done(self):
+        with self.lock:
+            self.decoded = True
+        self.__check_scanned__()
+
+    def __check_scanned__(self):
+        with self.lock:
+            if self.scanned or not self.decoded or self.pending > 0:
+                return
+            self.scanned = True
+        self.on_scanned(self)
+
+    def fail(self, stage, error):
+        self.status = "failed"
+        self.error = "%s: %s" % (stage, error)
+        print("[-] [%s] %s failed: %s" % (self.app_id, stage, error))
+
+    def summary(self, output_dir):
+        task_info = self.task_info or {}
+        return {"index": self.index, "input": self.inputs, "path": self.path, "type": self.types,
+                "app_id": self.app_id, "status": self.status, "error": self.error,
+                "packagename": task_info.get("packagename"),
+                "file_identifier": task_info.get("file_identifier", []),
+                "comp_list": task_info.get("comp_list", []),
+                "permissions": task_info.get("permissions", []),
+                "protect_list": task_info.get("protect_list", []),
+                "shell_flag": task_info.get("shell_flag", False),
+                "files": len(self.result_dict),
+                "results": sum(len(value) for value in self.result_dict.values()),
+                "over_budget": sorted(self.over_budget_list),
+                "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+                "output_dir": output_dir}
+
+
+class BatchTask(BaseTask):
+    """
+    批量扫描: 在同一个进程中扫描清单中的所有应用(本地路径或者下载地址，Android、iOS、Web可以混合)。
+
+    启动、规则构建、历史记录处理、Java/Frida环境检查只进行一次。下载、反编译、扫描、嗅探四个阶段各自使用
+    有界的共享线程池(或进程池)，并发数分别由download_jobs、decode_jobs、threads/workers、sniffer_jobs控制，
+    不同应用的不同阶段可以同时进行。每个应用的结果写入batch_result_path下以应用编号命名的目录，
+    全部完成后写入summary.json汇总结果。
+    """
+
+    def __init__(self, manifest, rules="", sniffer=True, threads=10, package="", backend="thread", workers=None,
+                 decode_jobs=None, exclude_package="", sniffer_engine="async", sniffer_mode="url",
+                 output_format="txt", entropy=False, decoder="apktool", download_jobs=None, sniffer_jobs=None):
+        BaseTask.__init__(self, "Batch", manifest, rules, sniffer, threads, package, backend, workers, decode_jobs,
+                          exclude_package, sniffer_engine, sniffer_mode, output_format, entropy, decoder)
+        self.manifest = manifest
+        self.download_jobs = download_jobs or config.batch_download_jobs
+        self.sniffer_jobs = sniffer_jobs or config.batch_sniffer_jobs
+        self.apps = []
+        # 任务类型 -> 扫描缓存，缓存的键与任务类型相关，均由self.scan_cache派生
+        self.scan_caches = {}
+        self.cache_lock = threading.Lock()
+
+    def __start__(self):
+        print("[*] AI is analyzing filtering rules......")
+        with metrics.stage("history"):
+            self.__history_handle__()
+        print("[*] The filtering rules obtained by AI are as follows: %s" % (set(config.filter_no)))
+
+        self.rule_engine = RuleEngine(config.filter_strs, config.filter_no, self.rules)
+        self.secret_engine = SecretEngine(config.filter_ak_map, self.entropy)
+
+        self.apps = self.__load_manifest__()
+        print("[*] Loaded %d apps from %s" % (len(self.apps), self.manifest))
+        if len(self.apps) == 0:
+            return
+        self.__check_env__()
+        os.makedirs(cores.batch_result_path, exist_ok=True)
+
+        print("[*] =========  Searching for strings that match the rules ===============")
+        self.scan_start_time = time.perf_counter()
+        self.scan_start_cpu = time.process_time()
+        if self.backend == "process":
+            thread = threading.Thread(target=self.__process_control__, args=(self.file_queue,))
+            thread.start()
+            self.thread_list.append(thread)
+        else:
+            self.__threads_control__(self.file_queue)
+
+        self.download_executor = ThreadPoolExecutor(max_workers=self.download_jobs)
+        self.decode_executor = ThreadPoolExecutor(max_workers=self.decode_jobs)
+        self.report_executor = ThreadPoolExecutor(max_workers=self.sniffer_jobs)
+        try:
+            for app in self.apps:
+                self.download_executor.submit(self.__download__, app)
+            for app in self.apps:
+                app.finished.wait()
+        finally:
+            self.__finish_control__()
+            for thread in self.thread_list:
+                thread.join()
+            metrics.add_stage("scan", time.perf_counter() - self.scan_start_time,
+                              time.process_time() - self.scan_start_cpu)
+            self.download_executor.shutdown()
+            self.decode_executor.shutdown()
+            self.report_executor.shutdown()
+            # 各个类型的缓存共用同一个数据库连接
+            if self.scan_cache:
+                self.scan_cache.close()
+
+        self.__print_summary__()
+
+    def __load_manifest__(self):
+        """
+        读取批量扫描清单，每行一个本地路径或者下载地址，空行以及#开头的行会被忽略。
+
+        行首可以使用android、ios、web显式指定应用类型，与路径之间使用空白字符分隔；
+        未指定时根据后缀识别: apk、hpk、dex为Android，ipa为iOS，其余为Web。
+        """
+        apps = []
+        with open(self.manifest, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                types = None
+                parts = line.split(None, 1)
+                if len(parts) == 2 and parts[0].lower() in BATCH_TYPES:
+                    types = BATCH_TYPES[parts[0].lower()]
+                    line = parts[1].strip()
+                if types is None:
+                    types = self.__detect_type__(line)
+
+                index = len(apps) + 1
+                name = os.path.basename(os.path.normpath(line.split("?")[0])) or "app"
+                app_id = "%04d_%s" % (index, re.sub(r"[^0-9A-Za-z._-]", "_", name)[:64])
+                apps.append(BatchApp(index, line, types, app_id, self.file_queue, self.__scanned__))
+        return apps
+
+    def __detect_type__(self, path):
+        suffix_name = path.split("?")[0].rstrip("/").split(".")[-1].lower()
+        if suffix_name in ("apk", "hpk", "dex"):
+            return "Android"
+        if suffix_name == "ipa":
+            return "iOS"
+        return "Web"
+
+    def __check_env__(self):
+        # Java与Frida环境只检查一次
+        android_apps = [app for app in self.apps if app.types == "Android"]
+        if android_apps:
+            check_env(self.decoder != "zip" and any(not app.inputs.endswith(".dex") for app in android_apps))
+
+    def __app_output__(self, app):
+        return os.path.join(cores.batch_result_path, app.app_id)
+
+    def __scan_cache__(self, types):
+        if not cores.cache_flag:
+            return None
+        with self.cache_lock:
+            if self.scan_cache is None:
+                self.scan_cache = ScanCache(cores.scan_cache_path, self.__rule_hash__(types))
+                self.scan_caches[types] = self.scan_cache
+            elif types not in self.scan_caches:
+                self.scan_caches[types] = self.scan_cache.derive(self.__rule_hash__(types))
+            return self.scan_caches[types]
+
+    def __download__(self, app):
+        # 本地文件直接进入反编译阶段
+        app.status = "downloading"
+        start_time = time.perf_counter()
+        try:
+            cache_info = DownloadTask().start(app.inputs, app.types)
+            app.path = cache_info["path"]
+            app.types = cache_info["type"] if cache_info["type"] in ("Android", "iOS") else "Web"
+            if not os.path.exists(app.path):
+                raise Exception("File download failed! Please download the file manually and try again.")
+        except Exception as e:
+            app.stages["download"] = time.perf_counter() - start_time
+            app.fail("download", e)
+            app.decode_done()
+            return
+        app.stages["download"] = time.perf_counter() - start_time
+        self.decode_executor.submit(self.__decode__, app)
+
+    def __decode__(self, app):
+        app.status = "decoding"
+        start_time = time.perf_counter()
+        app.decode_start_time = start_time
+        output_dir = self.__app_output__(app)
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            app.scan_cache = self.__scan_cache__(app.types)
+            app.package_filter = self.__package_filter__(app.types)
+            if self.output_format == "jsonl":
+                app.result_writer = JsonlWriter(os.path.join(output_dir, "result.jsonl"), app.types,
+                                                os.path.basename(os.path.normpath(app.path)))
+                app.finding_handler = app.result_writer.write_findings
+
+            # 反编译结果放在Bootstrapper初始化时清理的输出目录中，每个应用一个目录
+            decode_path = os.path.join(cores.output_path, app.app_id)
+            if app.types == "Android":
+                task = AndroidTask(app.path, self.package, app, 1, self.exclude_package, self.decoder,
+                                   decode_path, check_env=False)
+            elif app.types == "iOS":
+                task = iOSTask(app.path, app, decode_path)
+            else:
+                task = WebTask(app.path, app)
+            app.task_info = task.start()
+            app.status = "scanning"
+        except Exception as e:
+            app.fail("decode", e)
+        finally:
+            app.stages["decode"] = time.perf_counter() - start_time
+            app.decode_done()
+
+    def __scanned__(self, app):
+        # 应用的所有文件扫描完成后进入嗅探与结果输出阶段，由扫描线程调用，不能阻塞
+        if app.decode_start_time is not None:
+            app.stages["scan"] = time.perf_counter() - app.decode_start_time
+        self.report_executor.submit(self.__report__, app)
+
+    def __report__(self, app):
+        start_time = time.perf_counter()
+        output_dir = self.__app_output__(app)
+        try:
+            task_info = app.task_info or {}
+            file_identifier = task_info.get("file_identifier", [])
+            if app.status != "failed":
+                if task_info.get("shell_flag"):
+                    app.status = "shell"
+                    print("[-] [%s] This application has shell, the retrieval results may not be accurate." %
+                          app.app_id)
+                elif self.sniffer and app.result_dict:
+                    NetTask(app.result_dict, self.app_history_list, self.domain_history_list, file_identifier,
+                            self.threads, self.sniffer_engine, self.sniffer_mode,
+                            os.path.join(output_dir, "result.xlsx")).start()
+
+            if cores.all_flag and app.result_dict:
+                os.makedirs(output_dir, exist_ok=True)
+                self.__write_txt__(app, os.path.join(output_dir, "result.txt"))
+
+            if app.result_writer:
+                app.result_writer.write_app(task_info.get("packagename"), file_identifier)
+                app.result_writer.close()
+
+            if app.status not in ("failed", "shell"):
+                app.status = "done"
+        except Exception as e:
+            app.fail("report", e)
+        finally:
+            app.stages["report"] = time.perf_counter() - start_time
+            print("[*] [%d/%d] %s: %s, %d results" % (app.index, len(self.apps), app.app_id, app.status,
+                                                      sum(len(value) for value in app.result_dict.values())))
+            app.finished.set()
+
+    def __write_txt__(self, app, txt_path):
+        value_list = set()
+        with open(txt_path, "w", encoding='utf-8', errors='ignore') as f:
+            for key, value in app.result_dict.items():
+                lines = [key + "\r"]
+                for result in value:
+                    if result in value_list:
+                        continue
+                    value_list.add(result)
+                    lines.append("\t" + result + "\r")
+                f.write("".join(lines))
+
+    def __process_control__(self, file_queue):
+        # 多进程模式下按应用分别攒批，每批文件扫描完成后合并到所属的应用
+        batch_size = config.process_batch_size
+        state = {name: getattr(cores, name) for name in parses.process_state_names}
+
+        # 已提交尚未合并的批次数达到上限时，暂停从文件队列中取出文件
+        self.pending_batches = threading.BoundedSemaphore(self.workers * config.process_pending_batches)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=parses.init_process,
+                                 initargs=(state,)) as executor:
+            batches = {}
+            while True:
+                try:
+                    item = file_queue.get(timeout=0.5)
+                except Empty:
+                    # 生产者暂时没有新的文件时，先分发已经收集到的文件
+                    item = ""
+
+                if item:
+                    file_path, app = item
+                    batch = batches.setdefault(app, [])
+                    batch.append(file_path)
+                    if len(batch) >= batch_size:
+                        self.__submit_batch__(executor, app, batches.pop(app))
+                    continue
+
+                for app, batch in batches.items():
+                    self.__submit_batch__(executor, app, batch)
+                batches = {}
+
+                # 所有应用完成后放入的结束标记
+                if item is None:
+                    break
+
+    def __submit_batch__(self, executor, app, batch):
+        self.pending_batches.acquire()
+        try:
+            future = executor.submit(parses.parse_files, batch, app.types, self.rule_engine, app.scan_cache,
+                                     self.secret_engine, app.package_filter)
+        except Exception as e:
+            print("[-] [%s] Failed to dispatch %d files to the process pool: %s" % (app.app_id, len(batch), e))
+            self.pending_batches.release()
+            app.done(len(batch))
+            return
+        future.add_done_callback(functools.partial(self.__merge_batch__, app, len(batch)))
+
+    def __merge_batch__(self, app, count, future):
+        try:
+            result = future.result()
+            app.result_dict.update(result[0])
+            if app.finding_handler:
+                for file_path, findings in result[1].items():
+                    app.finding_handler(file_path, findings)
+            metrics.merge(result[2])
+            app.over_budget_list.extend(result[3])
+            if app.scan_cache:
+                app.scan_cache.apply(result[4])
+        except Exception as e:
+            print("[-] [%s] Scanning failed: %s" % (app.app_id, e))
+        finally:
+            self.pending_batches.release()
+            app.done(count)
+
+    def __print_summary__(self):
+        summary = {"manifest": self.manifest, "apps": [], "totals": {}}
+        for app in self.apps:
+            summary["apps"].append(app.summary(self.__app_output__(app)))
+        totals = summary["totals"]
+        totals["apps"] = len(self.apps)
+        for status in ("done", "shell", "failed"):
+            totals[status] = len([app for app in self.apps if app.status == status])
+        totals["results"] = sum(item["results"] for item in summary["apps"])
+
+        summary_path = os.path.join(cores.batch_result_path, "summary.json")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        print("[*] ========= Batch summary: %d done, %d shell, %d failed, %d results ===============" % (
+            totals["done"], totals["shell"], totals["failed"], totals["results"]))
+        for item in summary["apps"]:
+            print("[%s] %-40s %-8s %-8s %6d %s" % ("+" if item["status"] == "done" else "-", item["app_id"],
+                                                  item["type"], item["status"], item["results"], item["error"]))
+        print("[*] For more information about the batch, see summary file result: %s" % (summary_path))
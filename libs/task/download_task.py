@@ -5,6 +5,7 @@
 import os
 import re
 import time
+import uuid
 import config
 import hashlib
 from queue import Queue
@@ -15,7 +16,8 @@ from libs.core.download import DownloadThreads
 class DownloadTask(object):
 
     def start(self, path, types):
-        create_time = time.strftime("%Y%m%d%H%M%S", time.localtime())
+        # 同一秒内下载多个文件时加上随机后缀，避免文件名冲突
+        create_time = time.strftime("%Y%m%d%H%M%S", time.localtime()) + "_" + uuid.uuid4().hex[:8]
         if path.endswith("apk"):
             types = "Android"
             file_name = create_time + ".apk"
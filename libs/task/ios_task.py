@@ -9,15 +9,19 @@ import zipfile
 import binascii
 import platform
 import libs.core as cores
+import libs.core.macho as macho
+import libs.core.walker as walker
 from queue import Queue
 
 
 class iOSTask(object):
     elf_file_name = ""
 
-    def __init__(self, path):
+    def __init__(self, path, file_queue=None, output_path=None):
         self.path = path
-        self.file_queue = Queue()
+        # IPA的解压目录，批量扫描时每个应用使用单独的目录
+        self.output_path = output_path or cores.output_path
+        self.file_queue = file_queue if file_queue is not None else Queue()
         self.shell_flag = False
         self.file_identifier = []
         self.permissions = []
@@ -38,9 +42,9 @@ class iOSTask(object):
         # 判断文件是否为ipa文件
         if file_path.split(".")[-1] == 'ipa':
             # 对ipa文件进行解码
-            self.__decode_ipa__(cores.output_path)
+            self.__decode_ipa__(self.output_path)
             # 扫描解码后的ipa文件
-            self.__scanner_file_by_ipa__(cores.output_path)
+            self.__scanner_file_by_ipa__(self.output_path)
         else:
             # 判断文件是否为Mach-o文件
             if self.__get_file_header__(file_path):
@@ -96,34 +100,17 @@ class iOSTask(object):
 
     def __shell_test__(self, macho_file, hex_hand):
         """
-        检测给定的macho文件是否包含特定的加密信息，以判断是否具有特定的shell功能。
+        检测给定的macho文件是否被加密，以判断是否加壳。
 
         参数:
         - macho_file: 文件对象，指向待检测的macho文件。
         - hex_hand: int，文件内部的初始读取位置指针。
 
-        该方法通过读取和解析macho文件的特定部分，判断文件是否具有特定的加密标识，
-        从而确定文件是否包含shell功能。这一过程涉及对文件的二进制内容进行解析，并根据
-        解析结果更新类实例的属性。
+        该方法通过遍历macho文件的Load Command，读取LC_ENCRYPTION_INFO中的cryptid，
+        cryptid不为0时表示文件已被加密，并更新类实例的shell_flag属性。
         """
-        while True:
-            # 读取文件的前4字节并将其转换为十六进制字符串，用于判断文件类型
-            magic = binascii.hexlify(macho_file.read(4)).decode().upper()
-            if magic == "2C000000":
-                # 当文件类型匹配时，重置文件读取位置到指定的加密信息位置
-                macho_file.seek(hex_hand, 0)
-                # 读取并转换加密信息命令的24字节到十六进制字符串
-                encryption_info_command = binascii.hexlify(
-                    macho_file.read(24)).decode()
-                # 提取加密信息命令的最后8个字符，用于判断加密标识
-                cryptid = encryption_info_command[-8:len(
-                    encryption_info_command)]
-                if cryptid == "01000000":
-                    # 当加密标识匹配时，设置shell标志为True，表示文件包含shell功能
-                    self.shell_flag = True
-                break
-            # 如果当前文件类型不匹配，移动文件读取位置指针，继续搜索
-            hex_hand = hex_hand + 4
+        if macho.is_encrypted(macho_file.name):
+            self.shell_flag = True
 
     def __scanner_file_by_ipa__(self, output):
         """
@@ -149,37 +136,30 @@ class iOSTask(object):
 
     def __get_scanner_file__(self, scanner_dir, file_suffix):
         """
-        递归获取指定目录下的特定后缀文件。
+        遍历获取指定目录下的Mach-O文件以及特定后缀文件。
 
         :param scanner_dir: 需要扫描的目录路径
         :param file_suffix: 需要获取的文件后缀名列表
         """
-        # 获取目录下的所有文件和子目录
-        dir_or_files = os.listdir(scanner_dir)
-        for dir_file in dir_or_files:
-            # 构造完整的文件或目录路径
-            dir_file_path = os.path.join(scanner_dir, dir_file)
-            # 如果是目录，则递归调用自身
-            if os.path.isdir(dir_file_path):
-                # 如果目录名以.app结尾，提取 ELF 文件名
-                if dir_file.endswith(".app"):
-                    self.elf_file_name = dir_file.replace(".app", "")
-                self.__get_scanner_file__(dir_file_path, file_suffix)
-            else:
-                # 如果文件名与ELF文件名相同，获取文件头信息并加入处理队列
-                if self.elf_file_name == dir_file:
+        file_suffix = frozenset(file_suffix)
+        for dir_file_path in walker.walk_files(scanner_dir):
+            dir_path, dir_file = os.path.split(dir_file_path)
+            # 如果所在目录以.app结尾，提取 ELF 文件名
+            app_dir = os.path.basename(dir_path)
+            if app_dir.endswith(".app"):
+                self.elf_file_name = app_dir.replace(".app", "")
+            # 如果文件名与ELF文件名相同，获取文件头信息并加入处理队列
+            if self.elf_file_name == dir_file:
+                self.__get_file_header__(dir_file_path)
+                self.file_queue.put(dir_file_path)
+                continue
+            # 如果资源标志为真，对文件后缀进行处理
+            if cores.resource_flag:
+                _, dot, dir_file_suffix = dir_file.rpartition(".")
+                # 如果文件后缀在指定的后缀列表中，获取文件头信息并加入处理队列
+                if dot and dir_file_suffix in file_suffix:
                     self.__get_file_header__(dir_file_path)
                     self.file_queue.put(dir_file_path)
-                    continue
-                # 如果资源标志为真，对文件后缀进行处理
-                if cores.resource_flag:
-                    dir_file_suffix = dir_file.split(".")
-                    # 对有后缀的文件进行判断
-                    if len(dir_file_suffix) > 1:
-                        # 如果文件后缀在指定的后缀列表中，获取文件头信息并加入处理队列
-                        if dir_file_suffix[-1] in file_suffix:
-                            self.__get_file_header__(dir_file_path)
-                            self.file_queue.put(dir_file_path)
 
     def __decode_ipa__(self, output_path):
         """
@@ -3,52 +3,74 @@
 # Author: kelvinBen
 # Github: https://github.com/kelvinBen/AppInfoScanner
 
-import openpyxl
 import config
+import threading
 from queue import Queue
 import libs.core as cores
-from libs.core.net import NetThreads
+from urllib.parse import urlsplit
+from libs.core.net import NetThreads, normalize_url, host_url, write_probe_result
+from libs.core.resolver import DnsCache
+from libs.core.session import SnifferSession
+from libs.core.async_net import AsyncNetEngine
+from libs.core.writer import ExcelWriter
+from libs.core.metrics import metrics
+
+# 批量扫描时多个应用的NetTask并发运行，共同追加同一组历史记录文件，写入时需要加锁
+history_lock = threading.Lock()
 
 
 class NetTask(object):
-    value_list = []
-    domain_list = []
 
-    def __init__(self, result_dict, app_history_list, domain_history_list, file_identifier, threads):
+    def __init__(self, result_dict, app_history_list, domain_history_list, file_identifier, threads, engine="async",
+                 mode="url", xls_path=None, resume_store=None):
         self.result_dict = result_dict
+        # 扫描断点，上次已经嗅探过的URL直接写入保存的结果
+        self.resume_store = resume_store
+        self.resumed_rows = []
+        # 嗅探结果的输出文件，批量扫描时每个应用使用单独的文件
+        self.xls_path = xls_path or cores.xls_result_path
         self.app_history_list = app_history_list
         self.file_identifier = file_identifier
         self.domain_queue = Queue()
         self.threads = int(threads)
+        self.engine = engine
+        self.mode = mode
         self.thread_list = []
-        self.domain_history_list = domain_history_list
+        self.domain_history_list = set(domain_history_list)
+        # 使用集合去重，避免在列表中逐个比较
+        self.value_list = set()
+        self.domain_list = set()
+        self.url_set = set()
+        # 域名级别嗅探时，每个协议+域名对应的URL列表
+        self.host_dict = {}
 
     def start(self):
-        xls_result_path = cores.xls_result_path
-        workbook = openpyxl.Workbook()
-        worksheet = self.__creating_excel_header__(workbook)
-
-        self.__write_result_to_txt__()
-
-        self.__start_threads__(worksheet)
-
-        for thread in self.thread_list:
-            thread.join()
-
-        workbook.save(xls_result_path)
-
-    def __creating_excel_header__(self, workbook):
-        worksheet = workbook.create_sheet("Result", 0)
-        worksheet.cell(row=1, column=1, value="Number")
-        worksheet.cell(row=1, column=2, value="IP/URL")
-        worksheet.cell(row=1, column=3, value="Domain")
-        worksheet.cell(row=1, column=4, value="Status")
-        worksheet.cell(row=1, column=5, value="IP")
-        worksheet.cell(row=1, column=6, value="Server")
-        worksheet.cell(row=1, column=7, value="Title")
-        worksheet.cell(row=1, column=8, value="CDN")
-        worksheet.cell(row=1, column=9, value="Finger")
-        return worksheet
+        # 结果统一由写入线程写入Excel，嗅探线程不直接操作工作表
+        writer = ExcelWriter(self.xls_path, resume_store=self.resume_store)
+        writer.start()
+
+        try:
+            self.__write_result_to_txt__()
+            if self.resumed_rows:
+                print("[*] Reuse the sniffing results of %d URLs" % len(self.resumed_rows))
+            for row in self.resumed_rows:
+                writer.write_row(row)
+
+            resolver = DnsCache()
+            with metrics.stage("dns"):
+                self.__resolve_domains__(writer, resolver)
+
+            if self.engine == "async":
+                AsyncNetEngine(self.domain_queue, writer, resolver).start()
+            else:
+                session = SnifferSession(resolver=resolver)
+                self.__start_threads__(writer, session)
+
+                for thread in self.thread_list:
+                    thread.join()
+                session.close()
+        finally:
+            writer.close()
 
     def __write_result_to_txt__(self):
         append_file_flag = True
@@ -57,7 +79,7 @@ class NetTask(object):
             for result in value:
                 if result in self.value_list:
                     continue
-                self.value_list.append(result)
+                self.value_list.add(result)
 
                 if (("http://" in result) or ("https://" in result)) and ("." in result):
                     if "{" in result or "}" in result or "[" in result or "]" in result or "\\" in result or "!" in result or "," in result:
@@ -76,19 +98,18 @@ class NetTask(object):
 
                     url_suffix = result[result.rindex(".")+1:].lower()
                     if not(cores.resource_flag and url_suffix in config.sniffer_filter):
-                        self.domain_queue.put(
-                            {"domain": domain, "url_ip": result})
+                        self.__put_domain_queue__(domain, result)
 
                     for identifier in self.file_identifier:
                         if identifier in self.app_history_list:
                             if not(domain in self.domain_history_list):
-                                self.domain_list.append(domain)
+                                self.domain_list.add(domain)
                                 self.__write_content_in_file__(
                                     cores.domain_history_path, domain)
                             continue
 
                         if not(domain in self.domain_list):
-                            self.domain_list.append(domain)
+                            self.domain_list.add(domain)
                             self.__write_content_in_file__(
                                 cores.domain_history_path, domain)
 
@@ -97,14 +118,76 @@ class NetTask(object):
                                 cores.app_history_path, identifier)
                             append_file_flag = False
 
-    def __start_threads__(self, worksheet):
+        for host, urls in self.host_dict.items():
+            self.domain_queue.put({"domain": urls[0][1], "url_ip": host, "urls": urls})
+
+    def __put_domain_queue__(self, domain, url):
+        """
+        将需要嗅探的URL放入队列，规范化后相同的URL只嗅探一次。
+
+        url模式下每个URL都会被请求；host模式下同一个协议+域名只请求一次，
+        所有URL在嗅探结束后共用这一次请求得到的IP、Server、CDN信息。
+        """
+        url = normalize_url(url)
+        if url in self.url_set:
+            return
+        self.url_set.add(url)
+
+        if self.resume_store:
+            row = self.resume_store.get_url(url)
+            if row is not None:
+                self.resumed_rows.append(row)
+                return
+
+        if self.mode == "host":
+            try:
+                host = host_url(url)
+            except ValueError:
+                return
+            self.host_dict.setdefault(host, []).append((url, domain))
+            return
+
+        self.domain_queue.put({"domain": domain, "url_ip": url})
+
+    def __resolve_domains__(self, writer, resolver):
+        """
+        嗅探前并发解析队列中所有的域名。
+
+        无法解析的域名不再发起请求，直接按照超时写入结果；解析结果保存在resolver中，两种嗅探引擎建立连接时直接使用。
+        """
+        domains_list = []
+        while not self.domain_queue.empty():
+            domains_list.append(self.domain_queue.get())
+
+        host_list = []
+        for domains in domains_list:
+            try:
+                host = urlsplit(domains["url_ip"]).hostname
+            except ValueError:
+                host = None
+            host_list.append(host)
+
+        hosts = set(host for host in host_list if host)
+        print("[*] Resolving %d domains before sniffing......" % len(hosts))
+        resolved = resolver.resolve_all(hosts)
+
+        for domains, host in zip(domains_list, host_list):
+            if host:
+                ips = resolved.get(host)
+                if not ips:
+                    write_probe_result(writer, domains, "timeout")
+                    continue
+            self.domain_queue.put(domains)
+
+    def __start_threads__(self, writer, session):
         for threadID in range(0, self.threads):
             name = "Thread - " + str(threadID)
-            thread = NetThreads(threadID, name, self.domain_queue, worksheet)
+            thread = NetThreads(threadID, name, self.domain_queue, writer, session)
             thread.start()
             self.thread_list.append(thread)
 
     def __write_content_in_file__(self, file_path, content):
-        with open(file_path, "a+", encoding='utf-8', errors='ignore') as f:
-            f.write(content+"\r")
-            f.close()
+        with history_lock:
+            with open(file_path, "a+", encoding='utf-8', errors='ignore') as f:
+                f.write(content+"\r")
+                f.close()
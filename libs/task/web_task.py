@@ -6,6 +6,7 @@ import os
 import config
 import hashlib
 from queue import Queue
+import libs.core.walker as walker
 
 
 class WebTask(object):
@@ -13,9 +14,9 @@ class WebTask(object):
     value_list = []
     result_dict = {}
 
-    def __init__(self, path):
+    def __init__(self, path, file_queue=None):
         self.path = path
-        self.file_queue = Queue()
+        self.file_queue = file_queue if file_queue is not None else Queue()
         self.file_identifier = []
         self.permissions = []
 
@@ -54,27 +55,20 @@ class WebTask(object):
 
     def __get_scanner_file__(self, scanner_dir, file_suffix):
         """
-        递归扫描指定目录下的所有文件，特别是处理特定后缀的文件。
+        遍历指定目录下的所有文件，特别是处理特定后缀的文件。
 
         :param scanner_dir: 需要扫描的目录路径
         :param file_suffix: 关注的文件后缀名列表
         """
-        # 获取目录下的所有文件和子目录
-        dir_or_files = os.listdir(scanner_dir)
-        for dir_file in dir_or_files:
-            # 构造完整的文件或目录路径
-            dir_file_path = os.path.join(scanner_dir, dir_file)
-            # 如果是目录，则递归调用自身
-            if os.path.isdir(dir_file_path):
-                self.__get_scanner_file__(dir_file_path, file_suffix)
-            else:
-                # 如果文件有后缀名
-                if len(dir_file.split(".")) > 1:
-                    # 如果文件后缀名在关注的后缀名列表中
-                    if dir_file.split(".")[-1] in file_suffix:
-                        # 打开文件，计算并获取MD5值
-                        with open(dir_file_path,'rb') as f:
-                            dex_md5 = str(hashlib.md5().update(f.read()).hexdigest()).upper()
-                            self.file_identifier.append(dex_md5)
-                        # 将文件路径放入队列中
-                        self.file_queue.put(dir_file_path)
\ No newline at end of file
+        for dir_file_path in walker.walk_files(scanner_dir, file_suffix):
+            # 打开文件，计算并获取MD5值
+            md5_obj = hashlib.md5()
+            with open(dir_file_path, 'rb') as f:
+                while True:
+                    r = f.read(1024 * 1024)
+                    if not r:
+                        break
+                    md5_obj.update(r)
+            self.file_identifier.append(md5_obj.hexdigest().upper())
+            # 将文件路径放入队列中
+            self.file_queue.put(dir_file_path)
@@ -0,0 +1,173 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import time
+import threading
+import unittest
+from queue import Queue
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+from libs.core.async_net import AsyncNetEngine
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    本地嗅探目标，按照路径返回不同形式的响应，并记录每个请求使用的客户端端口。
+    """
+    protocol_version = "HTTP/1.1"
+    server_version = "StubServer/1.0"
+
+    def do_GET(self):
+        self.server.ports.append(self.client_address[1])
+        path = self.path.split("?")[0]
+        if path == "/title":
+            self.__send__(200, b"<html><title>Hello</title></html>", [("Via", "1.1 stub-cdn")])
+        elif path == "/redirect":
+            self.__send__(302, b"", [("Location", "/title")])
+        elif path == "/loop":
+            self.__send__(302, b"", [("Location", "/loop")])
+        elif path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("Content-Type", "text/html; charset=gbk")
+            self.end_headers()
+            for chunk in ["<html><ti".encode("gbk"), "tle>中文标题</title>".encode("gbk"), b"</html>"]:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        elif path == "/large":
+            self.__send__(200, b"<title>Large</title>" + b"x" * 4096)
+        elif path == "/slow":
+            time.sleep(1)
+            try:
+                self.__send__(200, b"<title>Slow</title>")
+            except (BrokenPipeError, ConnectionResetError):
+                # 嗅探引擎已经超时并关闭连接
+                pass
+        else:
+            self.__send__(404, b"<title>Not Found</title>")
+
+    def __send__(self, status, body, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ListWriter(object):
+    # 代替ExcelWriter，记录写入的结果
+    def __init__(self):
+        self.rows = {}
+
+    def write(self, url_ip, domain, result):
+        self.rows[url_ip] = result
+
+
+class AsyncNetEngineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.server.daemon_threads = True
+        cls.server.ports = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = "http://127.0.0.1:%d" % cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.ports.clear()
+        patchers = [mock.patch.object(config, "sniffer_host_interval", 0),
+                    mock.patch.object(config, "sniffer_timeout", 0.5),
+                    mock.patch.object(config, "sniffer_body_limit", 1024)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def __probe__(self, *paths):
+        domain_queue = Queue()
+        for path in paths:
+            domain_queue.put({"domain": "127.0.0.1", "url_ip": self.base + path})
+        writer = ListWriter()
+        AsyncNetEngine(domain_queue, writer).start()
+        return writer.rows
+
+    def test_status_and_title(self):
+        result = self.__probe__("/title")[self.base + "/title"]
+        self.assertEqual(200, result["status"])
+        self.assertEqual("Hello", result["title"])
+        self.assertEqual("StubServer/1.0 " + StubHandler.sys_version, result["server"])
+        self.assertEqual("1.1 stub-cdn", result["cdn"])
+        self.assertEqual("127.0.0.1", result["des_ip"])
+
+    def test_not_found(self):
+        result = self.__probe__("/missing")[self.base + "/missing"]
+        self.assertEqual(404, result["status"])
+        self.assertEqual("Not Found", result["title"])
+
+    def test_redirect(self):
+        # 返回重定向之后最终响应的信息
+        result = self.__probe__("/redirect")[self.base + "/redirect"]
+        self.assertEqual(200, result["status"])
+        self.assertEqual("Hello", result["title"])
+
+    def test_redirect_loop(self):
+        self.assertEqual("timeout", self.__probe__("/loop")[self.base + "/loop"])
+
+    def test_chunked_body_with_charset(self):
+        result = self.__probe__("/chunked")[self.base + "/chunked"]
+        self.assertEqual(200, result["status"])
+        self.assertEqual("中文标题", result["title"])
+
+    def test_body_limit(self):
+        # 超过读取上限的响应只读取开头部分，标题仍然可以提取
+        result = self.__probe__("/large")[self.base + "/large"]
+        self.assertEqual("Large", result["title"])
+
+    def test_timeout(self):
+        self.assertEqual("timeout", self.__probe__("/slow")[self.base + "/slow"])
+
+    def test_connection_refused(self):
+        domain_queue = Queue()
+        domain_queue.put({"domain": "127.0.0.1", "url_ip": "http://127.0.0.1:1/"})
+        writer = ListWriter()
+        AsyncNetEngine(domain_queue, writer).start()
+        self.assertEqual("timeout", writer.rows["http://127.0.0.1:1/"])
+
+    def test_invalid_url(self):
+        # 无效的URL不写入结果
+        domain_queue = Queue()
+        domain_queue.put({"domain": "127.0.0.1", "url_ip": "http://127.0.0.1:99999/"})
+        writer = ListWriter()
+        AsyncNetEngine(domain_queue, writer).start()
+        self.assertEqual({}, writer.rows)
+
+    def test_keep_alive(self):
+        # 并发数为1时，同一个域名的请求依次复用同一个连接
+        with mock.patch.object(config, "sniffer_concurrency", 1):
+            rows = self.__probe__("/title?a", "/chunked?b", "/title?c")
+        self.assertEqual(3, len(rows))
+        self.assertEqual(3, len(self.server.ports))
+        self.assertEqual(1, len(set(self.server.ports)))
+
+    def test_large_body_is_not_reused(self):
+        # 未读取完的响应所在的连接不能复用
+        with mock.patch.object(config, "sniffer_concurrency", 1):
+            rows = self.__probe__("/large", "/title")
+        self.assertEqual("Hello", rows[self.base + "/title"]["title"])
+        self.assertEqual(2, len(set(self.server.ports)))
+
+
+if __name__ == "__main__":
+    unittest.main()
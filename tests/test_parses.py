@@ -0,0 +1,87 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import config
+import libs.core as cores
+from libs.core.parses import ParsesThreads, string_pattern
+
+
+class ReadSegmentsTest(unittest.TestCase):
+    """
+    分块读取与整体读取的字符串匹配结果一致，字符串跨越分块边界时引号的配对不能错位。
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patchers = [mock.patch.object(config, "scan_chunk_size", 4096),
+                    mock.patch.object(config, "scan_chunk_overlap", 256),
+                    mock.patch.object(cores, "all_flag", False, create=True),
+                    mock.patch.object(cores, "profile_flag", False, create=True)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def __write__(self, content):
+        file_path = os.path.join(self.tmp_dir, "bundle.js")
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return file_path
+
+    def __chunked__(self, file_path):
+        strings = []
+        base = 0
+        for content, start, end in ParsesThreads(0, "Test", None, {}, "Web").__read_segments__(file_path):
+            strings.extend((match.group(1), base + match.start(1))
+                           for match in string_pattern.finditer(content, start, end))
+            base = base + len(content)
+        return strings
+
+    def test_string_across_boundary(self):
+        # 超过重叠窗口的内联data URI跨越分块边界，其后的URL仍然全部命中
+        urls = ["https://h%d.example.com/p" % index for index in range(50)]
+        content = "x" * 3000 + '"data:image/png;base64,' + "A" * 2000 + '"' + \
+                  "".join(';u("%s")' % url for url in urls)
+        file_path = self.__write__(content)
+
+        result_dict = {}
+        ParsesThreads(0, "Test", None, result_dict, "Web").__safe_parse__(file_path)
+        self.assertEqual(set(urls), set(result_dict[file_path]) & set(urls))
+
+    def test_string_longer_than_chunk(self):
+        # 超过一个分块的字符串被跳过，其后的字符串与偏移不受影响
+        content = "x" * 1000 + '"' + "A" * 10000 + '";u("https://a.example.com/p")\n"b"'
+        whole = [(match.group(1), match.start(1)) for match in string_pattern.finditer(content)]
+        self.assertEqual(whole[1:], self.__chunked__(self.__write__(content)))
+
+    def test_same_as_whole_file(self):
+        rnd = random.Random(0)
+        for _ in range(200):
+            parts = []
+            for _ in range(rnd.randint(1, 200)):
+                choice = rnd.random()
+                if choice < 0.4:
+                    parts.append('"%s"' % "".join(rnd.choice("ab/:x") for _ in range(rnd.randint(0, 1200))))
+                elif choice < 0.5:
+                    parts.append("\n")
+                elif choice < 0.55:
+                    parts.append('"')
+                else:
+                    parts.append("".join(rnd.choice("ab ;()") for _ in range(rnd.randint(0, 500))))
+            content = "".join(parts)
+            whole = [(match.group(1), match.start(1)) for match in string_pattern.finditer(content)]
+            self.assertEqual(whole, self.__chunked__(self.__write__(content)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: kelvinBen
+# Github: https://github.com/kelvinBen/AppInfoScanner
+import os
+import shutil
+import tempfile
+import unittest
+
+from libs.core import walker
+
+
+class WalkFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.root = os.path.join(self.directory, "root")
+        os.makedirs(os.path.join(self.root, "com", "demo"))
+        os.makedirs(os.path.join(self.directory, "outside"))
+        self.__touch__("root/a.js", "root/com/demo/Main.smali", "outside/linked.js")
+
+    def __touch__(self, *names):
+        for name in names:
+            with open(os.path.join(self.directory, name), "w") as f:
+                f.write("")
+
+    def __walk__(self, **kwargs):
+        return sorted(os.path.relpath(path, self.root) for path in walker.walk_files(self.root, **kwargs))
+
+    def test_walk(self):
+        self.assertEqual(["a.js", "com/demo/Main.smali"], self.__walk__())
+        self.assertEqual(["a.js"], self.__walk__(suffixes=["js"]))
+        self.assertEqual(["com/demo/Main.smali"], self.__walk__(prefixes=["com/demo"]))
+        self.assertEqual(["a.js"], self.__walk__(exclude_prefixes=["com"]))
+
+    def test_follow_symlinks(self):
+        os.symlink(os.path.join(self.directory, "outside"), os.path.join(self.root, "link"))
+        self.assertEqual(["a.js", "com/demo/Main.smali", "link/linked.js"], self.__walk__())
+
+    def test_symlink_loop(self):
+        # 指向上级目录的符号链接只遍历一次
+        os.symlink(self.root, os.path.join(self.root, "com", "demo", "loop"))
+        os.symlink(os.path.join(self.root, "com"), os.path.join(self.root, "com", "parent"))
+        self.assertEqual(["a.js", "com/demo/Main.smali"], self.__walk__())
+
+    def test_duplicate_symlinks(self):
+        # 多个符号链接指向同一个目录时只遍历一次
+        os.symlink(os.path.join(self.directory, "outside"), os.path.join(self.root, "link1"))
+        os.symlink(os.path.join(self.directory, "outside"), os.path.join(self.root, "link2"))
+        files = self.__walk__()
+        self.assertEqual(["a.js", "com/demo/Main.smali"], files[:2])
+        self.assertIn(files[2:], (["link1/linked.js"], ["link2/linked.js"]))
+
+    def test_broken_symlink(self):
+        os.symlink(os.path.join(self.directory, "missing"), os.path.join(self.root, "broken"))
+        self.assertEqual(["a.js", "com/demo/Main.smali"], self.__walk__(suffixes=["js", "smali"]))
+
+
+if __name__ == "__main__":
+    unittest.main()